@@ -171,6 +171,8 @@ def get_main_page():
                                                                     options=[
                                                                         {"label": "3D surface", "value": "3d_surface"},
                                                                         {"label": "Heatmap", "value": "heatmap"},
+                                                                        {"label": "Heatmap (raster, for many datasets)",
+                                                                         "value": "raster"},
                                                                     ],
                                                                     value="heatmap"
                                                                 ),
@@ -193,8 +195,21 @@ def get_main_page():
                                                                             width=6)
                                                                     ])
                                                                 ]),
+                                                                dbc.Label("Cross section"),
+                                                                dbc.Select(
+                                                                    id="profile-mode",
+                                                                    options=[
+                                                                        {"label": "Along x, at constant y (slider)",
+                                                                         "value": "y"},
+                                                                        {"label": "Along y, at constant x (slider)",
+                                                                         "value": "x"},
+                                                                        {"label": "Drawn line (draw on the map)",
+                                                                         "value": "polyline"},
+                                                                    ],
+                                                                    value="y"
+                                                                ),
                                                                 dbc.Label(
-                                                                    "Cross section slider (move cross section along y axis) in km"),
+                                                                    "Cross section slider (position of the constant coordinate) in km"),
                                                                 dcc.Slider(id='slider-gc-surface',
                                                                            min=-100,
                                                                            max=100,
@@ -221,7 +236,35 @@ def get_main_page():
                                                                     ],
                                                                     value="t"
                                                                 )]
-                                                            )
+                                                            ),
+                                                            dbc.Col([
+                                                                dbc.Label("Jump to event"),
+                                                                dcc.Dropdown(
+                                                                    id="event-picker",
+                                                                    options=[],
+                                                                    placeholder="No events loaded",
+                                                                )]
+                                                            ),
+                                                            dbc.Col([
+                                                                dbc.Label("Receiver grid variable"),
+                                                                dbc.Select(
+                                                                    id="grid-variable",
+                                                                    options=[],
+                                                                    value=""
+                                                                ),
+                                                                dbc.Label("Receivers (all if empty)"),
+                                                                dcc.Dropdown(
+                                                                    id="grid-receivers",
+                                                                    options=[],
+                                                                    value=[],
+                                                                    multi=True,
+                                                                    placeholder="All receivers",
+                                                                ),
+                                                                dbc.Button('Show receiver grid',
+                                                                           id="show-receiver-grid",
+                                                                           color="secondary",
+                                                                           style={'margin': '10px 0'}),
+                                                            ], width=12)
                                                         ],
                                                         style={"display": "none"}
                                                     ),
@@ -235,6 +278,8 @@ def get_main_page():
                                 width=3,
                             ),
                             dbc.Col([
+                                dbc.Progress(id='render-progress', value=0, striped=True, animated=True,
+                                             style={'display': 'none'}),
                                 dcc.Loading(id="ls-loading-1", children=[
                                     dcc.Graph(
                                         id='main-graph',
@@ -245,6 +290,8 @@ def get_main_page():
                                         config={'displayModeBar': True,
                                                 'displaylogo': False,
                                                 'scrollZoom': True,
+                                                # Profile lines for the cross-section graph
+                                                'modeBarButtonsToAdd': ['drawline', 'drawopenpath', 'eraseshape'],
                                                 'toImageButtonOptions': {
                                                     'format': 'png',  # one of png, svg, jpeg, webp
                                                     'filename': 'export_plots',
@@ -271,12 +318,34 @@ def get_main_page():
                                                 }
                                                 }
                                     ),
-                                ], type="default")
+                                ], type="default"),
+                                dcc.Loading(id="ls-loading-3", children=[
+                                    dcc.Graph(
+                                        id='receiver-grid',
+                                        style={'display': 'none'},
+                                        config={'displaylogo': False}
+                                    ),
+                                ], type="default"),
+                                # Full resolution of the receiver grid panel that was clicked
+                                dbc.Modal(
+                                    [
+                                        dbc.ModalHeader(dbc.ModalTitle(id='panel-title')),
+                                        dbc.ModalBody(dcc.Loading(dcc.Graph(id='panel-graph',
+                                                                            style={'height': '70vh'}))),
+                                    ],
+                                    id="panel-modal",
+                                    is_open=False,
+                                    size="xl",
+                                ),
                             ],
                                 align="start",
                                 width=9)
                         ])
                 ]),
             # store user's dataset
-            dcc.Store(id='benchmark-params')
+            dcc.Store(id='benchmark-params'),
+            # vertices of the profile line drawn on the main graph
+            dcc.Store(id='profile-line'),
+            # receiver of each trace of the receiver grid, and its variable
+            dcc.Store(id='grid-meta')
         ])
@@ -1,27 +1,75 @@
+import os
 import dash
+import diskcache
 import dash_bootstrap_components as dbc
 import app_layout
 from callbacks.callbacks import get_callbacks
 from flask_caching import Cache
-from callbacks.utils import set_cache
+from callbacks import figure_cache, metrics
+from callbacks.utils import set_cache, preload_heavy_modules, CACHE_THRESHOLD, LocalCache
+from callbacks import warmup
 
-app = dash.Dash(external_stylesheets=[dbc.themes.CERULEAN], title="DET code verification platform")
+# Local disk shared by the web process and the background callback workers
+CACHE_ROOT = os.environ.get('DET_CACHE_DIR', '/tmp/det_cache')
+
+# Heavy callbacks run in background processes. Their results are not cached by Dash: identical
+# views are served by callbacks/figure_cache.py, which also checks the dataset versions
+background_callback_manager = dash.DiskcacheManager(
+    diskcache.Cache(os.path.join(CACHE_ROOT, 'background')),
+)
+
+app = dash.Dash(external_stylesheets=[dbc.themes.CERULEAN], title="DET code verification platform",
+                background_callback_manager=background_callback_manager)
 
 server = app.server
 
-# Configure Flask-Caching with SimpleCache
+# Request timing, stage histograms and the /metrics endpoint, shared across processes on disk
+metrics.register_metrics(server, diskcache.Cache(os.path.join(CACHE_ROOT, 'metrics')))
+
+# Configure Flask-Caching on local disk so the background callback processes share it
 cache = Cache(server, config={
-    'CACHE_TYPE': 'simple',  # Use in-memory caching
+    'CACHE_TYPE': 'FileSystemCache',
+    'CACHE_DIR': os.path.join(CACHE_ROOT, 'flask'),
     'CACHE_DEFAULT_TIMEOUT': 3600,  # Cache timeout in seconds (1 hour)
-    'CACHE_THRESHOLD': 50
+    'CACHE_THRESHOLD': CACHE_THRESHOLD
 })
 
-# Pass the cache object to your utility function
-set_cache(cache)
+# Pass the cache object to your utility function, behind a per-process layer in memory
+set_cache(LocalCache(cache, default_timeout=3600))
+
+# Rendered views, gzipped on local disk and shared by every process (see callbacks/figure_cache.py)
+figure_cache.set_store(diskcache.Cache(os.path.join(CACHE_ROOT, 'figures'),
+                                       size_limit=figure_cache.FIGURE_CACHE_MAX_MB * 1024 * 1024))
 
 app.layout = app_layout.get_main_page()
 
 get_callbacks(app)
 
+
+@server.route('/healthz')
+def healthz():
+    """Readiness check: answers immediately, cache warm-up runs in the background."""
+    return {'status': 'ok', 'warmup': warmup.status()}
+
+
+def warm_up():
+    """
+    Run Dash's first-request setup and render the layout once.
+
+    Called by gunicorn in the master process (see gunicorn.conf.py) so that every forked
+    worker starts with the routes registered, the layout serialized and the heavy modules
+    (imported lazily by callbacks.utils) shared copy-on-write.
+    """
+    preload_heavy_modules()
+    with server.test_client() as client:
+        client.get('/')
+        client.get('/_dash-layout')
+        client.get('/_dash-dependencies')
+
+
 if __name__ == '__main__':
-    app.run_server(debug=False, host='0.0.0.0', port=8081)
+    # Production runs under gunicorn (see gunicorn.conf.py); this is a single process fallback
+    from waitress import serve
+    warm_up()
+    warmup.start_warmup_thread()
+    serve(server, host='0.0.0.0', port=8081, threads=int(os.environ.get('WEB_THREADS', 4)))
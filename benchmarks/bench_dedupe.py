@@ -0,0 +1,63 @@
+"""
+Duplicate-point averaging before regridding: vectorized path vs the pandas groupby it replaced.
+
+Scattered surfaces with a share of repeated nodes (as written by unstructured-mesh codes,
+once per element) are averaged both ways; the results are checked to be identical.
+
+Usage:
+    python benchmarks/bench_dedupe.py
+    python benchmarks/bench_dedupe.py --points 100000 1000000 4000000 --duplicates 0.5 --variables 4
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import fixtures
+
+
+def groupby_average(df):
+    """The previous implementation of interpolate_data(average_duplicates=True)."""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    return df[numeric_cols].groupby(["x", "y"], as_index=False).mean(numeric_only=True)
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    import regrid
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000])
+    parser.add_argument('--duplicates', type=float, default=1.0, help='repeated nodes, as a fraction of the points')
+    parser.add_argument('--variables', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    variables = tuple(['eta'] + [f"var{i}" for i in range(1, args.variables)])
+    grid = fixtures.grid_params(1001)
+    print(f"{'points':>10} {'groupby s':>10} {'vectorized s':>13} {'speed-up':>9}")
+    for n in args.points:
+        df = fixtures.scattered_surface(grid, n, variables=variables, duplicate_fraction=args.duplicates)
+        expected = groupby_average(df)
+        result = regrid.average_duplicates(df)
+        if not np.allclose(expected[result.columns].to_numpy(), result.to_numpy(), equal_nan=True):
+            print(f"Results differ for {n} points")
+            return 1
+        reference = median_time(lambda: groupby_average(df), args.repeat)
+        vectorized = median_time(lambda: regrid.average_duplicates(df), args.repeat)
+        print(f"{len(df):>10} {reference:10.3f} {vectorized:13.3f} {reference / vectorized:8.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Offline benchmarks for the data and plotting hot paths.
+
+Synthetic bp1-qd (time series) and ttpv (surface) datasets are served from a local S3
+stand-in (benchmarks/fixtures.py), then the dashboard fetchers, the ingest Lambda and the
+figure builders are timed across dataset counts and grid sizes.
+
+Usage:
+    pip install -r requirements.txt -r benchmarks/requirements.txt
+    python benchmarks/bench_hot_paths.py --quick                # small sizes, a few seconds
+    python benchmarks/bench_hot_paths.py                        # full sizes, up to 1001x1001 grids
+    python benchmarks/bench_hot_paths.py --update-baseline      # store the results as the baseline
+
+Each case reports the median of --repeat runs. Without --update-baseline, cases slower
+than the stored baseline by more than --tolerance, or missing from it, are flagged and
+the exit status is 1. Timings are machine specific: record the baseline of each profile
+with --update-baseline on the machine running the check and commit
+benchmarks/baselines/hot_paths.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import fixtures
+
+BASELINE_PATH = os.path.join(fixtures.REPO_ROOT, 'benchmarks', 'baselines', 'hot_paths.json')
+
+PROFILES = {
+    'quick': {'datasets': [1, 4], 'grids': [101, 301], 'rows': [10_000], 'scattered_points': 20_000},
+    'full': {'datasets': [1, 2, 4, 8], 'grids': [201, 501, 1001], 'rows': [10_000, 200_000],
+             'scattered_points': 500_000},
+}
+# Cases faster than this are compared with an absolute slack instead, they are mostly noise
+MIN_SECONDS = 0.005
+
+
+def median_time(fn, repeat, setup=None):
+    """Median wall time of fn over `repeat` runs; `setup` runs untimed before each of them."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def seed_bucket(s3, profile):
+    """Upload templates and synthetic public datasets for every size of the profile."""
+    import lambda_function
+    for benchmark_id in ('bp1-qd', 'ttpv1'):
+        s3.put_object(Bucket=fixtures.BUCKET, Key=f"benchmark_templates/{benchmark_id}.json",
+                      Body=json.dumps(fixtures.load_template(benchmark_id)))
+    for i in range(max(profile['datasets'])):
+        for rows in profile['rows']:
+            # Laid out like the ingest Lambda writes time series
+            fixtures.put_parquet(s3, f"public_ds/bp1-qd/code{i}_v1/fltst_dp{rows}.parquet",
+                                 fixtures.bp1_time_series(rows, seed=i),
+                                 row_group_size=lambda_function.TIME_SERIES_ROW_GROUP_ROWS)
+        for n in profile['grids']:
+            fixtures.put_parquet(s3, f"public_ds/ttpv1/code{i}_v1/tsunami_g{n}.parquet",
+                                 fixtures.surface_grid(fixtures.grid_params(n)))
+
+
+def run_cases(s3, profile, repeat):
+    import plotly.graph_objects as go
+    import lambda_function
+    from callbacks import mirror, profiles, utils
+    from callbacks.plots import main_time_plot_dynamic, main_surface_plot_dynamic_v2, cross_section_plots
+
+    bp1 = fixtures.load_template('bp1-qd')
+    ttpv1 = fixtures.load_template('ttpv1')
+    time_vars = utils.get_plots_from_json(bp1, 'time_series')
+    surface_spec = fixtures.file_spec(ttpv1, 'surface')
+    surface_var = next(var for var in surface_spec['var_list'] if var['name'] == 'eta')
+    results = {}
+
+    def record(name, fn, setup=None):
+        results[name] = median_time(fn, repeat, setup)
+        print(f"  {results[name] * 1000:10.1f} ms  {name}")
+
+    for rows in profile['rows']:
+        key = f"public_ds/bp1-qd/code0_v1/fltst_dp{rows}.parquet"
+        record(f"get_s3_dataset[timeseries,rows={rows}]", lambda: utils.get_s3_dataset(fixtures.BUCKET, key))
+        with tempfile.TemporaryDirectory() as mirror_dir:
+            # Warm local mirror: memory-mapped Arrow file, one HEAD request per validation
+            mirror.LOCAL_MIRROR_DIR, mirror.LOCAL_MIRROR_VALIDATE_SECONDS = mirror_dir, 0
+            utils.get_s3_dataset(fixtures.BUCKET, key)
+            record(f"get_s3_dataset[timeseries,rows={rows},mirror]",
+                   lambda: utils.get_s3_dataset(fixtures.BUCKET, key))
+            mirror.LOCAL_MIRROR_DIR = ''
+        # A zoom on 1% of the run
+        t = fixtures.bp1_time_series(rows)['t']
+        t0 = t.iloc[rows // 2]
+        t1 = t0 + (t.iloc[-1] - t.iloc[0]) / 100
+        record(f"get_s3_dataset_window[timeseries,rows={rows},window=1%]",
+               lambda: utils.get_s3_dataset_window(fixtures.BUCKET, key, t0, t1))
+        for k in profile['datasets']:
+            codes = [f"code{i}_v1" for i in range(k)]
+            record(f"get_df[timeseries,rows={rows},datasets={k}]",
+                   lambda: utils.get_df('?benchmark_id=bp1-qd', codes, f"fltst_dp{rows}"))
+            df = utils.get_df('?benchmark_id=bp1-qd', codes, f"fltst_dp{rows}")
+            record(f"main_time_plot_dynamic[rows={rows},datasets={k}]",
+                   lambda: main_time_plot_dynamic(df, time_vars, time_vars[0]))
+
+    for n in profile['grids']:
+        for k in profile['datasets']:
+            codes = [f"code{i}_v1" for i in range(k)]
+            record(f"get_df[surface,grid={n},datasets={k}]",
+                   lambda: utils.get_df('?benchmark_id=ttpv1', codes, f"tsunami_g{n}"))
+            df = utils.get_df('?benchmark_id=ttpv1', codes, f"tsunami_g{n}")
+            for plot_type in ('heatmap', 'raster'):
+                record(f"main_surface_plot_dynamic_v2[{plot_type},grid={n},datasets={k}]",
+                       lambda: main_surface_plot_dynamic_v2(df, go.Figure(), surface_var, plot_type, 0, False,
+                                                            None, None))
+            record(f"cross_section_plots[grid={n},datasets={k}]",
+                   lambda: cross_section_plots(df, surface_var, 0))
+            grids = {code: utils.get_surface_grid('?benchmark_id=ttpv1', code, f"tsunami_g{n}", 'eta')
+                     for code in codes}
+            diagonal = profiles.normalize_line('polyline', points=[(-9.0e4, -8.0e4), (0.0, 1.0e4), (8.5e4, 9.0e4)])
+            for line in (profiles.normalize_line('x', value=1.23e4), diagonal):
+                record(f"sample_profiles[{line[0]},grid={n},datasets={k}]",
+                       lambda: profiles.sample_profiles(grids, line))
+
+    n_points = profile['scattered_points']
+    scattered = fixtures.scattered_surface(fixtures.grid_params(max(profile['grids'])), n_points)
+    for n in profile['grids']:
+        record(f"interpolate_data[grid={n},points={n_points}]",
+               lambda: lambda_function.interpolate_data(scattered, fixtures.grid_params(n)))
+
+    def forget_upload(benchmark_pb):
+        # Without the manifest of the previous run every member is converted again, instead of
+        # taking the unchanged-member path
+        s3.delete_object(Bucket=fixtures.BUCKET, Key=f"public_ds/{benchmark_pb}/bench_v1/manifest.json")
+
+    # Ingest: one bp1-qd submission and one surface submission regridded at the largest size
+    receivers = [r.lstrip('*') for r in fixtures.file_spec(bp1, 'timeseries')['list_of_receivers']]
+    rows = min(profile['rows'])
+    bp1_zip = fixtures.build_zip({f"{r}.dat": fixtures.to_submission_text(fixtures.bp1_time_series(rows, seed=j))
+                                  for j, r in enumerate(receivers)})
+    s3.put_object(Bucket=fixtures.BUCKET, Key='upload/bp1-qd/bench_v1.zip', Body=bp1_zip)
+    record(f"process_zip[bp1-qd,receivers={len(receivers)},rows={rows}]",
+           lambda: lambda_function.process_zip(fixtures.BUCKET, 'upload/bp1-qd/bench_v1.zip', 'bp1-qd', 'bench',
+                                               'v1', {}),
+           setup=lambda: forget_upload('bp1-qd'))
+
+    n = max(profile['grids'])
+    surface_template = {**ttpv1, 'files': [{**surface_spec, 'grid': fixtures.grid_params(n)}]}
+    s3.put_object(Bucket=fixtures.BUCKET, Key=f"benchmark_templates/ttpv1-g{n}.json",
+                  Body=json.dumps(surface_template))
+    surface_zip = fixtures.build_zip({'tsunami_01.csv': fixtures.to_submission_text(scattered)})
+    s3.put_object(Bucket=fixtures.BUCKET, Key=f"upload/ttpv1-g{n}/bench_v1.zip", Body=surface_zip)
+    record(f"process_zip[surface,grid={n},points={n_points}]",
+           lambda: lambda_function.process_zip(fixtures.BUCKET, f"upload/ttpv1-g{n}/bench_v1.zip",
+                                               f"ttpv1-g{n}", 'bench', 'v1', {}),
+           setup=lambda: forget_upload(f"ttpv1-g{n}"))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            regressions.append(f"{name}: no baseline, record one with --update-baseline")
+            continue
+        allowed = max(baseline[name] * (1 + tolerance), baseline[name] + MIN_SECONDS)
+        if seconds > allowed:
+            regressions.append(f"{name}: {seconds * 1000:.1f} ms vs baseline {baseline[name] * 1000:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='small sizes only')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, as a fraction of the baseline')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+    profile_name = 'quick' if args.quick else 'full'
+    profile = PROFILES[profile_name]
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    if profile_name not in baselines and not args.update_baseline:
+        print(f"No baseline for the {profile_name} profile in {BASELINE_PATH}: "
+              "record one with --update-baseline and commit it")
+        return 1
+
+    from flask import Flask
+    from flask_caching import Cache
+    from callbacks import mirror, utils
+    # No caching: every call pays the full fetch/decode cost being measured
+    utils.set_cache(Cache(Flask(__name__), config={'CACHE_TYPE': 'NullCache'}))
+    mirror.LOCAL_MIRROR_DIR = ''
+
+    with fixtures.local_s3() as s3:
+        seed_bucket(s3, profile)
+        print(f"Running the {profile_name} profile")
+        results = run_cases(s3, profile, args.repeat)
+
+    if args.update_baseline:
+        baselines[profile_name] = results
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baselines.get(profile_name, {}), args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Speed, memory and accuracy of the regridding methods of the ingest Lambda.
+
+Scattered points are sampled from an analytic field (benchmarks/fixtures.py) and regridded
+with every method of lambda_process_uploads/regrid.py; the result is compared with the
+field evaluated on the grid nodes.
+
+Usage:
+    pip install -r lambda_process_uploads/requirements.txt
+    python benchmarks/bench_regrid.py                          # 1001x1001 grid, 500k points
+    python benchmarks/bench_regrid.py --grid 301 --points 50000
+    python benchmarks/bench_regrid.py --output regrid.json     # also write the results as JSON
+
+For each method, `cold` is the first variable (search structure built: KD-tree or Delaunay
+triangulation), `warm` the time per variable once that structure is cached (another file on
+the same mesh), and `peak_rss_mb` the peak resident memory while regridding in memory.
+`stream` rows regrid into a parquet file --block-rows grid rows at a time, as the ingest
+Lambda does. Errors ignore the grid nodes left empty (outside the convex hull for
+`linear`), whose fraction is reported as `empty`.
+
+Peak memory per stage needs a writable /proc/self/clear_refs (Linux); elsewhere it is
+the peak since the start of the process, so the streamed run goes first.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import fixtures
+
+
+def run(method, scattered, grid, variables, block_rows):
+    import regrid
+    from profiling import StageProfiler
+
+    spec = {**grid, 'method': method}
+    profiler = StageProfiler()
+    with tempfile.TemporaryDirectory() as tmp:
+        regrid._indexes.clear()
+        with profiler.stage('stream'):
+            start = time.perf_counter()
+            regrid.regrid_to_parquet(scattered, spec, os.path.join(tmp, 'out.parquet'), block_rows)
+            streamed = time.perf_counter() - start
+
+    regrid._indexes.clear()
+    with profiler.stage('regrid'):
+        start = time.perf_counter()
+        first = regrid.regrid(scattered[['x', 'y', variables[0]]], spec)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        result = regrid.regrid(scattered, spec)
+        warm = (time.perf_counter() - start) / len(variables)
+
+    expected = fixtures.analytic_field(first['x'].to_numpy(), first['y'].to_numpy())
+    error = first[variables[0]].to_numpy() - expected
+    filled = ~np.isnan(error)
+    return {
+        'cold_seconds': cold,
+        'warm_seconds_per_variable': warm,
+        'peak_rss_mb': profiler.stages['regrid']['peak_rss_mb'],
+        'stream_seconds': streamed,
+        'stream_peak_rss_mb': profiler.stages['stream']['peak_rss_mb'],
+        'rms_error': float(np.sqrt(np.mean(error[filled] ** 2))),
+        'max_error': float(np.max(np.abs(error[filled]))),
+        'empty': float(1 - filled.mean()),
+        'rows': len(result),
+    }
+
+
+def main():
+    import regrid
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grid', type=int, default=1001, help='grid nodes per axis')
+    parser.add_argument('--points', type=int, default=500_000, help='number of scattered input points')
+    parser.add_argument('--variables', type=int, default=3)
+    parser.add_argument('--methods', nargs='+', default=sorted(regrid.METHOD_OPTIONS))
+    parser.add_argument('--block-rows', type=int, default=regrid.REGRID_BLOCK_ROWS)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    grid = fixtures.grid_params(args.grid)
+    variables = tuple(['eta'] + [f"var{i}" for i in range(1, args.variables)])
+    scattered = fixtures.scattered_surface(grid, args.points, variables=variables)
+
+    print(f"{args.points} points -> {args.grid}x{args.grid} grid, {len(variables)} variable(s)")
+    print(f"{'method':>8} {'cold s':>8} {'warm s/var':>11} {'peak MB':>8} {'stream s':>9} {'stream MB':>10} "
+          f"{'rms err':>9} {'max err':>9} {'empty':>7}")
+    results = {}
+    for method in args.methods:
+        r = results[method] = run(method, scattered, grid, variables, args.block_rows)
+        print(f"{method:>8} {r['cold_seconds']:8.2f} {r['warm_seconds_per_variable']:11.3f} {r['peak_rss_mb']:8.0f} "
+              f"{r['stream_seconds']:9.2f} {r['stream_peak_rss_mb']:10.0f} "
+              f"{r['rms_error']:9.2e} {r['max_error']:9.2e} {r['empty']:7.2%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'grid': args.grid, 'points': args.points, 'block_rows': args.block_rows, 'results': results},
+                      f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Synthetic benchmark data and a local S3 stand-in for the offline benchmarks.
+
+The S3 stand-in is moto's threaded server (see benchmarks/requirements.txt). boto3 and
+awswrangler are pointed at it through AWS_ENDPOINT_URL, so the dashboard and the ingest
+Lambda code run unmodified against it.
+"""
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = 'benchmark-vv-data'
+
+# Make the dashboard and Lambda modules importable from the benchmarks
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, 'lambda_process_uploads')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def load_template(benchmark_id):
+    with open(os.path.join(REPO_ROOT, 'resources', 'benchmark_templates', f"{benchmark_id}.json")) as f:
+        return json.load(f)
+
+
+def file_spec(template, graph_type):
+    """Return the first file entry of a template with the given graph type."""
+    return next(file for file in template['files'] if file['graph_type'] == graph_type)
+
+
+def bp1_time_series(n_rows, seed=0):
+    """bp1-qd-like receiver: slow loading punctuated by periodic slip events."""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 3000 * 365.25 * 24 * 3600, n_rows)
+    cycle = (t / (150 * 365.25 * 24 * 3600)) % 1.0
+    slip_rate = np.where(cycle > 0.995, 0.5, -9.0) + rng.normal(0, 0.05, n_rows)
+    return pd.DataFrame({
+        't': t,
+        'slip': np.cumsum(10 ** slip_rate) * (t[1] - t[0]),
+        'slip_rate': slip_rate,
+        'shear_stress': 30 + np.sin(2 * np.pi * cycle),
+        'state': 8 - 2 * cycle,
+    })
+
+
+def analytic_field(x, y):
+    """Smooth field with a localized bump, used for surfaces and regridding accuracy."""
+    return np.sin(x / 2.0e4) * np.cos(y / 3.0e4) + np.exp(-((x - 2.0e4) ** 2 + y ** 2) / 1.0e8)
+
+
+def surface_grid(grid_params, variables=('eta',)):
+    """Gridded surface as written by the ingest Lambda (flat x, y and variables)."""
+    xi = np.linspace(grid_params['x']['min'], grid_params['x']['max'], grid_params['x']['n'])
+    yi = np.linspace(grid_params['y']['min'], grid_params['y']['max'], grid_params['y']['n'])
+    X, Y = np.meshgrid(xi, yi, indexing='xy')
+    out = {'x': X.ravel(), 'y': Y.ravel()}
+    for i, var in enumerate(variables):
+        out[var] = analytic_field(X.ravel() + 1.0e3 * i, Y.ravel())
+    return pd.DataFrame(out)
+
+
+def scattered_surface(grid_params, n_points, variables=('eta',), duplicate_fraction=0.0, seed=0):
+    """Unstructured surface output (random mesh nodes) as submitted by modeling groups."""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(grid_params['x']['min'], grid_params['x']['max'], n_points)
+    y = rng.uniform(grid_params['y']['min'], grid_params['y']['max'], n_points)
+    n_dup = int(n_points * duplicate_fraction)
+    if n_dup:
+        # Shared element nodes are written once per element
+        idx = rng.integers(0, n_points, n_dup)
+        x, y = np.concatenate([x, x[idx]]), np.concatenate([y, y[idx]])
+    out = {'x': x, 'y': y}
+    for i, var in enumerate(variables):
+        out[var] = analytic_field(x + 1.0e3 * i, y)
+    return pd.DataFrame(out)
+
+
+def grid_params(n, extent=1.0e5):
+    return {'x': {'min': -extent, 'max': extent, 'n': n}, 'y': {'min': -extent, 'max': extent, 'n': n}}
+
+
+def to_submission_text(df, header=None):
+    """Format a DataFrame like a modeling group's ASCII output file."""
+    lines = [f"# {key} = {value}" for key, value in (header or {}).items()]
+    lines.append(' '.join(df.columns))
+    buf = io.StringIO()
+    df.to_csv(buf, sep=' ', header=False, index=False, float_format='%.9e')
+    return '\n'.join(lines) + '\n' + buf.getvalue()
+
+
+def build_zip(members):
+    """Build an in-memory zip from {member name: text}."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return buf.getvalue()
+
+
+def put_parquet(s3, key, df, **kwargs):
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False, **kwargs)
+    s3.put_object(Bucket=BUCKET, Key=key, Body=buf.getvalue())
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def local_s3():
+    """Run a local S3 server, point boto3/awswrangler at it and yield an S3 client on the bucket."""
+    from moto.server import ThreadedMotoServer
+
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    saved = {k: os.environ.get(k) for k in ('AWS_ENDPOINT_URL', 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                                            'AWS_DEFAULT_REGION', 'TABLE_NAME')}
+    os.environ.update({
+        'AWS_ENDPOINT_URL': endpoint,
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_DEFAULT_REGION': 'us-west-2',
+        'TABLE_NAME': 'DETFileProcessingStatus',
+    })
+    try:
+        import boto3
+        import awswrangler as wr
+        wr.config.s3_endpoint_url = endpoint
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': 'us-west-2'})
+        yield s3
+    finally:
+        server.stop()
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
@@ -0,0 +1,147 @@
+"""
+Import-time audit for the dashboard and the ingest Lambda entry points.
+
+Runs each entry point under `python -X importtime` in a fresh interpreter, reports the
+slowest modules the entry point imports directly and the modules with the largest self
+time, and compares the total against a stored baseline.
+
+Usage:
+    python benchmarks/import_time.py                     # report and check against the baseline
+    python benchmarks/import_time.py --update-baseline   # store the current timings as the baseline
+
+Exits with status 1 when an entry point is slower than its baseline by more than
+--tolerance, has no baseline, or loads a module that must be imported lazily. The
+baseline is machine specific: record it with --update-baseline on the machine running
+the check and commit benchmarks/baselines/import_time.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'baselines', 'import_time.json')
+
+ENTRY_POINTS = {
+    'dashboard': {
+        'cwd': REPO_ROOT,
+        'statement': 'import app_prod',
+        'env': {'DET_CACHE_DIR': os.path.join(tempfile.gettempdir(), 'det_import_audit')},
+        # Loaded on first use only (see callbacks/utils.py)
+        'lazy': ['awswrangler', 'boto3', 'plotly.express', 'matplotlib'],
+    },
+    'lambda_process_uploads': {
+        'cwd': os.path.join(REPO_ROOT, 'lambda_process_uploads'),
+        'statement': 'import lambda_function',
+        'env': {'TABLE_NAME': 'import-audit', 'AWS_DEFAULT_REGION': 'us-west-2'},
+        'lazy': ['sklearn', 'scipy.spatial'],
+    },
+}
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into {module: (self_us, cumulative_us, depth)}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # One space after the separator, then two per nesting level
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def direct_imports(modules, parent):
+    """
+    [(cumulative_us, module)] of the modules imported by `parent` itself (depth 1 below it).
+
+    `-X importtime` lists the imports of a module before the module, so its children are the
+    depth 1 entries between the previous top-level entry and its own.
+    """
+    children = []
+    for mod, (_, cum, depth) in modules.items():
+        if depth == 0:
+            if mod == parent:
+                return children
+            children = []
+        elif depth == 1:
+            children.append((cum, mod))
+    return []
+
+
+def measure(entry, repeat):
+    """Import the entry point `repeat` times and return the median total and the last breakdown."""
+    env = {**os.environ, **entry['env'], 'PYTHONDONTWRITEBYTECODE': '1'}
+    totals, modules = [], {}
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', entry['statement']],
+                                cwd=entry['cwd'], env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"`{entry['statement']}` failed:\n{result.stderr[-2000:]}")
+        modules = parse_importtime(result.stderr)
+        # Top-level entries (depth 0) are disjoint, their cumulative times add up to the total
+        totals.append(sum(cum for _, cum, depth in modules.values() if depth == 0))
+    return statistics.median(totals), modules
+
+
+def report(name, entry, total_us, modules, top):
+    print(f"\n== {name}: {total_us / 1e6:.3f}s")
+    parent = entry['statement'].split()[-1]
+    print(f"  Imported by {parent} (cumulative):")
+    for cum, mod in sorted(direct_imports(modules, parent), reverse=True)[:top]:
+        print(f"  {cum / 1e3:9.1f} ms  {mod}")
+    print("  Slowest modules (self):")
+    by_self = sorted(((self_us, mod) for mod, (self_us, _, _) in modules.items()), reverse=True)
+    for self_us, mod in by_self[:top]:
+        print(f"  {self_us / 1e3:9.1f} ms  {mod}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown, as a fraction of the baseline')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results, failures = {}, []
+    for name, entry in ENTRY_POINTS.items():
+        total_us, modules = measure(entry, args.repeat)
+        results[name] = total_us
+        report(name, entry, total_us, modules, args.top)
+
+        eager = [mod for mod in entry['lazy'] if mod in modules]
+        if eager:
+            failures.append(f"{name}: imported at start-up but should be lazy: {', '.join(eager)}")
+        if name not in baseline:
+            failures.append(f"{name}: no baseline in {BASELINE_PATH}, record one with --update-baseline")
+        elif total_us > baseline[name] * (1 + args.tolerance):
+            failures.append(f"{name}: {total_us / 1e6:.3f}s vs baseline {baseline[name] / 1e6:.3f}s")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if failures:
+        print("\nImport-time regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Small HTTP load generator to compare dashboard serving modes.
+
+Usage:
+    # terminal 1, previous entry point (Flask development server, port 8081)
+    python -c "import app_prod; app_prod.app.run(debug=False, host='0.0.0.0', port=8081)"
+    # or the single process fallback (waitress, port 8081)
+    python app_prod.py
+    # or the production mode (gunicorn, port 8050)
+    WEB_WORKERS=2 WEB_THREADS=4 gunicorn -c gunicorn.conf.py app_prod:server
+
+    # terminal 2
+    python benchmarks/load_test.py http://127.0.0.1:8050 --concurrency 16 --requests 500 --record gunicorn-2x4
+
+By default the index page, the layout and the callback graph are requested in turn.
+A recorded callback request (copied from the browser dev tools) can be replayed with
+--callback-payload payload.json to load the figure building path as well.
+
+With --record LABEL the results are stored under that label in RESULTS_PATH, with the
+host they were measured on, so runs of the serving modes can be committed side by side.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = ['/?benchmark_id=ttpv1', '/_dash-layout', '/_dash-dependencies']
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'load_test.json')
+
+
+def timed_request(url, payload=None):
+    """Send one request and return (latency in s, response size in bytes, ok)."""
+    headers = {'Content-Type': 'application/json'} if payload is not None else {}
+    request = urllib.request.Request(url, data=payload, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            size = len(response.read())
+            ok = response.status == 200
+    except Exception as e:
+        print(f"Request to {url} failed: {e}")
+        size, ok = 0, False
+    return time.perf_counter() - start, size, ok
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)]
+
+
+def run(base_url, concurrency, n_requests, callback_payload=None):
+    if callback_payload is not None:
+        with open(callback_payload, 'rb') as f:
+            payload = f.read()
+        jobs = [(f"{base_url}/_dash-update-component", payload)] * n_requests
+    else:
+        jobs = [(f"{base_url}{DEFAULT_PATHS[i % len(DEFAULT_PATHS)]}", None) for i in range(n_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda job: timed_request(*job), jobs))
+    elapsed = time.perf_counter() - start
+
+    latencies = [r[0] for r in results if r[2]]
+    errors = sum(1 for r in results if not r[2])
+    if not latencies:
+        return {'errors': errors}
+    return {
+        'requests': n_requests,
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'latency_p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'mean_response_kb': round(statistics.mean(r[1] for r in results if r[2]) / 1024, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base_url')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--callback-payload', default=None)
+    parser.add_argument('--record', metavar='LABEL', default=None, help='store the results under this label')
+    args = parser.parse_args()
+    results = run(args.base_url.rstrip('/'), args.concurrency, args.requests, args.callback_payload)
+    print(json.dumps(results, indent=2))
+
+    if args.record:
+        recorded = {}
+        if os.path.exists(RESULTS_PATH):
+            with open(RESULTS_PATH) as f:
+                recorded = json.load(f)
+        recorded[args.record] = {
+            **results,
+            'callback_payload': os.path.basename(args.callback_payload) if args.callback_payload else None,
+            'host': f"{platform.platform()}, {os.cpu_count()} CPUs",
+            'date': datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+        }
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, 'w') as f:
+            json.dump(recorded, f, indent=4, sort_keys=True)
+        print(f"Results recorded as {args.record!r} in {RESULTS_PATH}")
@@ -1,13 +1,37 @@
+import json
+
 import dash
 import pandas as pd
 import plotly.graph_objects as go
-from callbacks.plots import main_time_plot_dynamic, main_surface_plot_dynamic_v2, cross_section_plots
+from callbacks import figure_cache, metrics, state
+from callbacks.plots import main_time_plot_dynamic, main_surface_plot_dynamic_v2, profile_plot, \
+    small_multiples_plot, receiver_panel_plot
+from callbacks.profiles import normalize_line, get_profiles, line_from_relayout
 from callbacks.utils import get_df, get_upload_df, fetch_group_names_for_benchmark, get_metadata, get_benchmark_params, \
-    get_plots_from_json
+    get_plots_from_json, time_window_from_relayout, get_event_catalog, \
+    event_window, is_receiver_available, parse_benchmark_id
 from dash import ctx, no_update, html
 
 
 def get_callbacks(app):
+    def render_profile(benchmark_id, dataset_list, receiver, plot_params, profile_mode, slider_km, line_points):
+        """Cross-section figure of the selected datasets along the chosen profile line."""
+        variable = plot_params['name']
+        if profile_mode == 'polyline':
+            x_title = "Distance along the line (m)"
+            if not line_points or len(line_points) < 2:
+                return profile_plot({}, plot_params, "Draw a line on the map to see its profile", x_title)
+            line = normalize_line('polyline', points=line_points)
+            title = f"Profile of {variable} along the drawn line"
+        else:
+            line = normalize_line(profile_mode, value=slider_km * 1000)  # switch back to m from km
+            x_title = f"{'x' if profile_mode == 'y' else 'y'} (m)"
+            title = f"Cross section of {variable} at {profile_mode}={line[1]:.0f}m"
+        profiles = get_profiles(benchmark_id, dataset_list or [], receiver, variable, line)
+        with metrics.span('build_sub_figure'):
+            return profile_plot({f"{file_name}_rec{receiver}": profile for file_name, profile in profiles.items()},
+                                plot_params, title, x_title)
+
     @app.callback(dash.dependencies.Output('main-graph', 'figure'),
                   dash.dependencies.Output('main-graph', 'style'),
                   dash.dependencies.Output('sub-graph', 'figure'),
@@ -25,29 +49,49 @@ def get_callbacks(app):
                       dash.dependencies.State('surface-plot-type', 'value'),
                       dash.dependencies.State('surface-plot-var', "value"),
                       dash.dependencies.State('time-xaxis-var', "value"),
-                      dash.dependencies.State('main-graph', 'figure'),
                       dash.dependencies.State('upload-data', "contents"),
                       dash.dependencies.State('upload-data', 'filename'),
                       dash.dependencies.State('colorbar-min', 'value'),
                       dash.dependencies.State('colorbar-max', 'value'),
-                  ]
+                      dash.dependencies.State('profile-mode', 'value'),
+                      dash.dependencies.State('profile-line', 'data'),
+                  ],
+                  background=True,
+                  progress=[dash.dependencies.Output('render-progress', 'value'),
+                            dash.dependencies.Output('render-progress', 'label')],
+                  running=[
+                      (dash.dependencies.Output('show-graphs', 'disabled'), True, False),
+                      (dash.dependencies.Output('update-graphs', 'disabled'), True, False),
+                      (dash.dependencies.Output('render-progress', 'style'), {'display': 'flex'}, {'display': 'none'}),
+                  ],
+                  # A new selection makes the running render obsolete
+                  cancel=[
+                      dash.dependencies.Input('dataset-choice', 'value'),
+                      dash.dependencies.Input('file-type-selector', 'value'),
+                      dash.dependencies.Input('receiver-selector', 'value'),
+                  ],
                   )
-    def display_plots(ds_update_clicks, graph_control_nclick, benchmark_params, file_type_name, dataset_list, receiver,
-                      benchmark_id, slider_gc_surface, surface_plot_type, surface_plot_var, x_axis_sel, current_fig, upload_data,
-                      filename, colorbar_min, colorbar_max):
+    @metrics.traced('display_plots')
+    def display_plots(set_progress, ds_update_clicks, graph_control_nclick, benchmark_params, file_type_name,
+                      dataset_list, receiver, benchmark_id, slider_gc_surface, surface_plot_type, surface_plot_var,
+                      x_axis_sel, upload_data, filename, colorbar_min, colorbar_max, profile_mode, line_points):
         """
         Update the time-series graph based on user inputs.
 
+        Runs as a background callback: S3 fetching and figure building happen in a worker
+        process while the browser polls, and progress is reported through `set_progress`.
+
         Parameters:
-        ds_update (str): JSON string of the dataset.
-        click (int): Number of times the submit button has been clicked.
-        year_start (int): Start year for the time series.
-        year_end (int): End year for the time series.
-        time_unit (str): Time unit for the x-axis.
+        set_progress (callable): Reports (percent, label) to the progress bar.
+        ds_update_clicks (int): Number of times the show graphs button has been clicked.
+        graph_control_nclick (int): Number of times the update graphs button has been clicked.
+        benchmark_params (dict): The benchmark template.
 
         Returns:
-        dict: Figure object for the time-series graph.
+        tuple: Figures and styles for the main and sub graphs.
         """
+        template_token = benchmark_params
+        benchmark_params = state.get_template(benchmark_params)
         if benchmark_params is None or file_type_name == '':
             print("benchmark_params is not loaded yet.")
             return {
@@ -63,41 +107,256 @@ def get_callbacks(app):
         plot_type = next((file['graph_type'] for file in benchmark_params['files'] if file['name'] == file_type_name),
                          None)
         plots_list = get_plots_from_json(benchmark_params, file_type_name)
+
+        # Views of published datasets only are shared between users (an upload is private)
+        cacheable = (ds_update_clicks is not None or graph_control_nclick is not None) and upload_data is None
+        if cacheable:
+            if plot_type == 'surface':
+                options = dict(surface_plot_type=surface_plot_type, surface_plot_var=surface_plot_var,
+                               slider=slider_gc_surface, colorbar_min=colorbar_min, colorbar_max=colorbar_max,
+                               profile_mode=profile_mode,
+                               line_points=line_points if profile_mode == 'polyline' else None)
+            else:
+                options = dict(x_axis=x_axis_sel)
+            spec = figure_cache.view_spec(benchmark_id, template_token, file_type_name, plot_type, dataset_list,
+                                          receiver, **options)
+            cached = figure_cache.get(spec)
+            if cached is not None:
+                set_progress((100, "Rendering"))
+                return tuple(cached)
+
         if ds_update_clicks is not None or graph_control_nclick is not None:
-            selected_df = get_df(benchmark_id, dataset_list, receiver)
+            set_progress((10, "Fetching data"))
+            with metrics.span('fetch'):
+                selected_df = get_df(benchmark_id, dataset_list, receiver)
             # suface 1 file upload not supported for now due to interpolations needs
             if plot_type != 'surface':
-                upload_df = get_upload_df(upload_data, filename, plots_list)
+                with metrics.span('parse_upload'):
+                    upload_df = get_upload_df(upload_data, filename, plots_list)
             else:
                 upload_df = None
             if upload_df is not None:
                 list_df.append(upload_df)
             if selected_df is not None:
                 list_df.append(selected_df)
-            if len(list_df) > 0:
-                ds_update = pd.concat(list_df)
-            else:
-                ds_update = pd.DataFrame()
+            with metrics.span('concat'):
+                if len(list_df) > 0:
+                    ds_update = pd.concat(list_df)
+                else:
+                    ds_update = pd.DataFrame()
         else:
             ds_update = pd.DataFrame()
 
+        set_progress((60, "Building figures"))
         if plot_type == 'surface':
             fig = go.Figure()
             slider_only = False
             plot_params = [item for item in plots_list if item['name'] == surface_plot_var][0]
             cross_section_value = slider_gc_surface*1000 #switch back to m from km
-            main_graph, main_graph_style = main_surface_plot_dynamic_v2(ds_update, fig, plot_params, surface_plot_type,
-                                                                      cross_section_value, slider_only, colorbar_min, colorbar_max)
-            sub_graph = cross_section_plots(ds_update, plot_params, cross_section_value)
+            with metrics.span('build_main_figure', plot_type=surface_plot_type):
+                main_graph, main_graph_style = main_surface_plot_dynamic_v2(ds_update, fig, plot_params, surface_plot_type,
+                                                                          cross_section_value, slider_only, colorbar_min, colorbar_max)
+            sub_graph = render_profile(benchmark_id, dataset_list, receiver, plot_params, profile_mode,
+                                       slider_gc_surface, line_points)
             sub_graph_style = {'display': 'block'}
         else:
             x_axis = next((item for item in plots_list if item['name'] == x_axis_sel), plots_list[0])
 
-            main_graph, main_graph_style = main_time_plot_dynamic(ds_update, plots_list, x_axis)
+            with metrics.span('build_main_figure', plot_type='timeseries'):
+                main_graph, main_graph_style = main_time_plot_dynamic(ds_update, plots_list, x_axis)
             sub_graph = go.Figure()
             sub_graph_style = {'display': 'none'}
 
-        return main_graph, main_graph_style, sub_graph, sub_graph_style
+        set_progress((100, "Rendering"))
+        outputs = main_graph, main_graph_style, sub_graph, sub_graph_style
+        if cacheable:
+            figure_cache.put(spec, outputs)
+        return outputs
+
+    def render_time_window(t_window, benchmark_params, file_type_name, dataset_list, receiver, benchmark_id,
+                           upload_data, filename):
+        """Time-series figure against `t` for the rows in `t_window` only (all of them if None)."""
+        plots_list = get_plots_from_json(benchmark_params, file_type_name)
+        list_df = []
+        with metrics.span('fetch', window='zoom' if t_window else 'full'):
+            selected_df = get_df(benchmark_id, dataset_list, receiver, t_window)
+        with metrics.span('parse_upload'):
+            upload_df = get_upload_df(upload_data, filename, plots_list)
+        if upload_df is not None:
+            if t_window is not None:
+                upload_df = upload_df[(upload_df['t'] >= t_window[0]) & (upload_df['t'] <= t_window[1])]
+            list_df.append(upload_df)
+        if selected_df is not None:
+            list_df.append(selected_df)
+        if not list_df:
+            return no_update
+
+        x_axis = next(item for item in plots_list if item['name'] == 't')
+        with metrics.span('build_main_figure', plot_type='timeseries'):
+            main_graph, _ = main_time_plot_dynamic(pd.concat(list_df), plots_list, x_axis)
+        if t_window is not None:
+            main_graph.update_xaxes(range=list(t_window))
+        return main_graph
+
+    def graph_type(benchmark_params, file_type_name):
+        if benchmark_params is None:
+            return None
+        return next((file['graph_type'] for file in benchmark_params['files'] if file['name'] == file_type_name),
+                    None)
+
+    @app.callback(
+        dash.dependencies.Output('main-graph', 'figure', allow_duplicate=True),
+        dash.dependencies.Input('main-graph', 'relayoutData'),
+        [
+            dash.dependencies.State('show-graphs', 'n_clicks'),
+            dash.dependencies.State('update-graphs', 'n_clicks'),
+            dash.dependencies.State('benchmark-params', 'data'),
+            dash.dependencies.State('file-type-selector', 'value'),
+            dash.dependencies.State('dataset-choice', 'value'),
+            dash.dependencies.State('receiver-selector', 'value'),
+            dash.dependencies.State('url', 'search'),
+            dash.dependencies.State('time-xaxis-var', 'value'),
+            dash.dependencies.State('upload-data', 'contents'),
+            dash.dependencies.State('upload-data', 'filename'),
+        ],
+        prevent_initial_call=True
+    )
+    @metrics.traced('zoom_time_window')
+    def zoom_time_window(relayout_data, ds_update_clicks, graph_control_nclick, benchmark_params, file_type_name,
+                         dataset_list, receiver, benchmark_id, x_axis_sel, upload_data, filename):
+        """
+        Redraw the time series with only the zoomed time window.
+
+        Only the row groups overlapping the window are read from S3, so zooming into a few
+        events of a long run stays cheap. Resetting the axes redraws the full series from
+        the cache.
+        """
+        benchmark_params = state.get_template(benchmark_params)
+        if not relayout_data or (ds_update_clicks is None and graph_control_nclick is None):
+            return no_update
+        if graph_type(benchmark_params, file_type_name) != 'timeseries' or x_axis_sel != 't':
+            return no_update
+
+        if any(key.endswith('.autorange') for key in relayout_data):
+            t_window = None
+        else:
+            t_window = time_window_from_relayout(relayout_data)
+            if t_window is None:
+                return no_update
+        return render_time_window(t_window, benchmark_params, file_type_name, dataset_list, receiver, benchmark_id,
+                                  upload_data, filename)
+
+    @app.callback(
+        dash.dependencies.Output('event-picker', 'options'),
+        dash.dependencies.Output('event-picker', 'value'),
+        dash.dependencies.Output('event-picker', 'placeholder'),
+        [
+            dash.dependencies.Input('show-graphs', 'n_clicks'),
+            dash.dependencies.Input('update-graphs', 'n_clicks'),
+        ],
+        [
+            dash.dependencies.State('benchmark-params', 'data'),
+            dash.dependencies.State('file-type-selector', 'value'),
+            dash.dependencies.State('dataset-choice', 'value'),
+            dash.dependencies.State('receiver-selector', 'value'),
+            dash.dependencies.State('url', 'search'),
+        ],
+        prevent_initial_call=True
+    )
+    def update_event_picker(ds_update_clicks, graph_control_nclick, benchmark_params, file_type_name, dataset_list,
+                            receiver, benchmark_id):
+        """List the events detected at ingest for the displayed datasets and receiver."""
+        benchmark_params = state.get_template(benchmark_params)
+        if graph_type(benchmark_params, file_type_name) != 'timeseries' or not dataset_list or not receiver:
+            return [], None, "No events loaded"
+        options = []
+        for file_name in dataset_list:
+            catalog = get_event_catalog(benchmark_id, file_name, receiver)
+            if catalog is None:
+                continue
+            for event in catalog['events']:
+                years = event['onset'] / (365.25 * 24 * 3600)
+                options.append({
+                    'label': f"{file_name}: t = {years:.2f} yr, {event['duration']:.0f} s, "
+                             f"peak {catalog['variable']} {event['peak']:.2f}",
+                    'value': json.dumps(event_window(event)),
+                })
+        return options, None, f"{len(options)} event(s)" if options else "No events found"
+
+    @app.callback(
+        dash.dependencies.Output('main-graph', 'figure', allow_duplicate=True),
+        dash.dependencies.Input('event-picker', 'value'),
+        [
+            dash.dependencies.State('benchmark-params', 'data'),
+            dash.dependencies.State('file-type-selector', 'value'),
+            dash.dependencies.State('dataset-choice', 'value'),
+            dash.dependencies.State('receiver-selector', 'value'),
+            dash.dependencies.State('url', 'search'),
+            dash.dependencies.State('upload-data', 'contents'),
+            dash.dependencies.State('upload-data', 'filename'),
+        ],
+        prevent_initial_call=True
+    )
+    @metrics.traced('jump_to_event')
+    def jump_to_event(event_value, benchmark_params, file_type_name, dataset_list, receiver, benchmark_id,
+                      upload_data, filename):
+        """Show the time window around the picked event, reading only that window."""
+        benchmark_params = state.get_template(benchmark_params)
+        if not event_value or graph_type(benchmark_params, file_type_name) != 'timeseries':
+            return no_update
+        t_window = tuple(json.loads(event_value))
+        return render_time_window(t_window, benchmark_params, file_type_name, dataset_list, receiver, benchmark_id,
+                                  upload_data, filename)
+
+    @app.callback(
+        dash.dependencies.Output('sub-graph', 'figure', allow_duplicate=True),
+        dash.dependencies.Output('profile-line', 'data'),
+        [
+            dash.dependencies.Input('profile-mode', 'value'),
+            dash.dependencies.Input('slider-gc-surface', 'value'),
+            dash.dependencies.Input('main-graph', 'relayoutData'),
+        ],
+        [
+            dash.dependencies.State('show-graphs', 'n_clicks'),
+            dash.dependencies.State('update-graphs', 'n_clicks'),
+            dash.dependencies.State('benchmark-params', 'data'),
+            dash.dependencies.State('file-type-selector', 'value'),
+            dash.dependencies.State('dataset-choice', 'value'),
+            dash.dependencies.State('receiver-selector', 'value'),
+            dash.dependencies.State('url', 'search'),
+            dash.dependencies.State('surface-plot-var', 'value'),
+            dash.dependencies.State('profile-line', 'data'),
+        ],
+        prevent_initial_call=True
+    )
+    @metrics.traced('update_profile')
+    def update_profile(profile_mode, slider_gc_surface, relayout_data, ds_update_clicks, graph_control_nclick,
+                       benchmark_params, file_type_name, dataset_list, receiver, benchmark_id, surface_plot_var,
+                       line_points):
+        """
+        Redraw the cross-section graph when the profile line changes, without re-rendering the map.
+
+        Profiles are sampled from the cached grids, and cached per dataset and line, so
+        moving the slider or a drawn line stays interactive on large grids.
+        """
+        benchmark_params = state.get_template(benchmark_params)
+        if ctx.triggered_id == 'main-graph':
+            drawn = line_from_relayout(relayout_data or {})
+            if drawn is None:
+                return no_update, no_update
+            line_points = drawn
+            if profile_mode != 'polyline':
+                return no_update, line_points
+
+        if (ds_update_clicks is None and graph_control_nclick is None) or \
+                graph_type(benchmark_params, file_type_name) != 'surface':
+            return no_update, line_points
+        plots_list = get_plots_from_json(benchmark_params, file_type_name)
+        plot_params = next((item for item in plots_list if item['name'] == surface_plot_var), None)
+        if plot_params is None:
+            return no_update, line_points
+        return render_profile(benchmark_id, dataset_list, receiver, plot_params, profile_mode, slider_gc_surface,
+                              line_points), line_points
 
     ### Callback 1: Generate Links Based on Dataset Choice and Benchmark ID
     @app.callback(
@@ -201,7 +460,8 @@ def get_callbacks(app):
         """
         try:
             benchmark_params = get_benchmark_params(search)
-            return benchmark_params, no_update
+            # Only a token goes to the browser, the template stays in server memory (see callbacks/state.py)
+            return state.template_token(parse_benchmark_id(search), benchmark_params), no_update
         except Exception as e:
             print(f"Error fetching benchmark params: {e}")
             return None, 'https://cascadiaquakes.org/det/'
@@ -221,6 +481,7 @@ def get_callbacks(app):
         Returns:
         list: List of available files type.
         """
+        benchmark_params = state.get_template(benchmark_params)
         if benchmark_params is None:
             return no_update
         list_files = [file['name'] for file in benchmark_params['files']]
@@ -235,28 +496,46 @@ def get_callbacks(app):
          dash.dependencies.Output('time-xaxis-var', 'value')
          ],
 
-        [dash.dependencies.Input('file-type-selector', 'value')],
-        [dash.dependencies.State('benchmark-params', 'data')]
+        [dash.dependencies.Input('file-type-selector', 'value'),
+         dash.dependencies.Input('dataset-choice', 'value')],
+        [dash.dependencies.State('benchmark-params', 'data'),
+         dash.dependencies.State('receiver-selector', 'value'),
+         dash.dependencies.State('url', 'search')]
     )
-    def update_receiver_selector(file_selected, benchmark_params):
+    def update_receiver_selector(file_selected, dataset_list, benchmark_params, receiver, benchmark_id):
         """
         Update the file type selector based on the benchmark_params.
 
+        Receivers not yet published for any of the selected datasets (a submission still
+        being processed) are listed but disabled.
+
         Parameters:
         benchmark_params (list): List of available files type.
 
         Returns:
         list: List of available receivers.
         """
+        benchmark_params = state.get_template(benchmark_params)
         if benchmark_params is None:
             return no_update
         if file_selected is None:
             return no_update
         for file in benchmark_params['files']:
             if file['name'] == file_selected:
+                receivers = file['list_of_receivers']
+                available = [r for r in receivers if not dataset_list or any(
+                    is_receiver_available('benchmark-vv-data', parse_benchmark_id(benchmark_id), file_name, r)
+                    for file_name in dataset_list)]
+                options = [{'label': r if r in available else f"{r} (processing)", 'value': r,
+                            'disabled': r not in available} for r in receivers]
+                first = available[0] if available else receivers[0]
+                if ctx.triggered_id == 'dataset-choice':
+                    # Only the availability changed: keep the receiver unless it is missing
+                    return options, receiver if receiver in available else first, \
+                        no_update, no_update, no_update, no_update
                 list_vars = [var['name'] for var in get_plots_from_json(benchmark_params, file_selected)]
                 # returning list vars for file type selected + time (t) for the time series
-                return file['list_of_receivers'], file['list_of_receivers'][0], list_vars, list_vars[-1], list_vars+['t'], 't'
+                return options, first, list_vars, list_vars[-1], list_vars+['t'], 't'
         return no_update
 
     @app.callback(
@@ -266,6 +545,7 @@ def get_callbacks(app):
         [dash.dependencies.State('benchmark-params', 'data')]
     )
     def update_graph_control(file_selected, benchmark_params):
+        benchmark_params = state.get_template(benchmark_params)
         graph_type = ''
         if benchmark_params is None:
             return no_update
@@ -280,3 +560,85 @@ def get_callbacks(app):
         else:
             return {"display": "none"}, {"display": "block"}
 
+
+    @app.callback(
+        dash.dependencies.Output('grid-variable', 'options'),
+        dash.dependencies.Output('grid-variable', 'value'),
+        dash.dependencies.Output('grid-receivers', 'options'),
+        dash.dependencies.Output('grid-receivers', 'value'),
+        [dash.dependencies.Input('file-type-selector', 'value')],
+        [dash.dependencies.State('benchmark-params', 'data')]
+    )
+    def update_grid_controls(file_selected, benchmark_params):
+        """Variables and receivers of the selected file type, for the receiver grid."""
+        benchmark_params = state.get_template(benchmark_params)
+        if benchmark_params is None or file_selected is None:
+            return no_update
+        for file in benchmark_params['files']:
+            if file['name'] == file_selected:
+                list_vars = [var['name'] for var in get_plots_from_json(benchmark_params, file_selected)
+                             if var['name'] != 't']
+                return list_vars, list_vars[0] if list_vars else '', file['list_of_receivers'], []
+        return no_update
+
+    @app.callback(
+        dash.dependencies.Output('receiver-grid', 'figure'),
+        dash.dependencies.Output('receiver-grid', 'style'),
+        dash.dependencies.Output('grid-meta', 'data'),
+        dash.dependencies.Input('show-receiver-grid', 'n_clicks'),
+        dash.dependencies.State('benchmark-params', 'data'),
+        dash.dependencies.State('file-type-selector', 'value'),
+        dash.dependencies.State('dataset-choice', 'value'),
+        dash.dependencies.State('grid-variable', 'value'),
+        dash.dependencies.State('grid-receivers', 'value'),
+        dash.dependencies.State('url', 'search'),
+        prevent_initial_call=True
+    )
+    def show_receiver_grid(n_clicks, benchmark_params, file_type_name, dataset_list, variable, grid_receivers,
+                           benchmark_id):
+        """
+        Show one variable for all (or the chosen) receivers of the selected datasets, one panel each.
+
+        Every receiver x dataset pair is fetched in one batch and each line is downsampled;
+        the full resolution of a panel is only loaded when it is clicked (see expand_panel).
+        """
+        benchmark_params = state.get_template(benchmark_params)
+        if graph_type(benchmark_params, file_type_name) != 'timeseries' or not dataset_list or not variable:
+            return go.Figure(), {'display': 'none'}, None
+        file_spec = next(file for file in benchmark_params['files'] if file['name'] == file_type_name)
+        receivers = grid_receivers or file_spec['list_of_receivers']
+        variable_dict = next(var for var in get_plots_from_json(benchmark_params, file_type_name)
+                             if var['name'] == variable)
+        with metrics.span('receiver_grid'):
+            df = get_df(benchmark_id, dataset_list, list(receivers), file_type_name=file_type_name)
+            if df is None:
+                return go.Figure(), {'display': 'none'}, None
+            fig, trace_receivers = small_multiples_plot(df, variable_dict, receivers)
+        return fig, {'width': '100%'}, {'receivers': trace_receivers, 'variable': variable}
+
+    @app.callback(
+        dash.dependencies.Output('panel-graph', 'figure'),
+        dash.dependencies.Output('panel-title', 'children'),
+        dash.dependencies.Output('panel-modal', 'is_open'),
+        dash.dependencies.Input('receiver-grid', 'clickData'),
+        dash.dependencies.State('grid-meta', 'data'),
+        dash.dependencies.State('benchmark-params', 'data'),
+        dash.dependencies.State('file-type-selector', 'value'),
+        dash.dependencies.State('dataset-choice', 'value'),
+        dash.dependencies.State('url', 'search'),
+        prevent_initial_call=True
+    )
+    def expand_panel(click_data, grid_meta, benchmark_params, file_type_name, dataset_list, benchmark_id):
+        """Open the clicked receiver grid panel at full resolution."""
+        benchmark_params = state.get_template(benchmark_params)
+        if not click_data or not grid_meta or benchmark_params is None:
+            return no_update, no_update, no_update
+        receiver = grid_meta['receivers'][click_data['points'][0]['curveNumber']]
+        variable_dict = next(var for var in get_plots_from_json(benchmark_params, file_type_name)
+                             if var['name'] == grid_meta['variable'])
+        df = get_df(benchmark_id, dataset_list, receiver)
+        if df is None:
+            return no_update, no_update, no_update
+        df = df.assign(dataset_name=df['dataset_name'].str.removesuffix(f"_rec{receiver}"))
+        title = f"{receiver}: {variable_dict['description']} ({variable_dict['unit']})"
+        return receiver_panel_plot(df, variable_dict, title), title, True
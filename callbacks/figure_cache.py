@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+import json
+import os
+
+from callbacks import metrics
+
+# Bump when the figure builders change, so figures rendered by the previous code are not served
+FIGURE_CACHE_VERSION = 2
+# Seconds a rendered view is kept, and size cap of the store (least recently stored evicted first)
+FIGURE_CACHE_SECONDS = int(os.environ.get('FIGURE_CACHE_SECONDS', 24 * 3600))
+FIGURE_CACHE_MAX_MB = int(os.environ.get('FIGURE_CACHE_MAX_MB', 1024))
+
+# diskcache.Cache shared by the workers and background callback processes, see set_store
+_store = None
+
+
+def set_store(store):
+    """Set the store of the rendered views; without one the cache is disabled."""
+    global _store
+    _store = store
+
+
+def view_spec(benchmark_id, template_token, file_type_name, plot_type, dataset_list, receiver, **options):
+    """
+    Normalized description of a rendered view, the key of its cached figures.
+
+    Options that do not change the figure are passed as None by the caller and dropped,
+    and floats are rounded. Dataset order is kept, it sets the line colours. Each dataset
+    comes with its version (see utils.get_dataset_version) and the template with its token
+    digest, so a republished dataset or template is rendered again.
+    """
+    from callbacks.utils import parse_benchmark_id, get_dataset_version
+
+    benchmark_pb = parse_benchmark_id(benchmark_id)
+    return {
+        'version': FIGURE_CACHE_VERSION,
+        'benchmark': benchmark_pb,
+        'template': template_token,
+        'file_type': file_type_name,
+        'plot_type': plot_type,
+        'receiver': receiver,
+        'datasets': [[name, get_dataset_version(benchmark_pb, name)] for name in dataset_list or []],
+        'options': {name: round(value, 6) if isinstance(value, float) else value
+                    for name, value in sorted(options.items()) if value is not None},
+    }
+
+
+def _key(spec):
+    return 'figure_' + hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get(spec):
+    """Cached outputs of a view (figures as plotly JSON dicts), or None."""
+    if _store is None:
+        return None
+    blob = _store.get(_key(spec))
+    if blob is None:
+        metrics.inc('det_figure_cache_requests_total', result='miss')
+        return None
+    metrics.inc('det_figure_cache_requests_total', result='hit')
+    return json.loads(gzip.decompress(blob))
+
+
+def put(spec, outputs):
+    """Store the outputs of a view, serialized to JSON and gzipped."""
+    if _store is None:
+        return
+    import plotly.utils
+
+    with metrics.span('store_figure'):
+        blob = gzip.compress(json.dumps(outputs, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'), compresslevel=6)
+        _store.set(_key(spec), blob, expire=FIGURE_CACHE_SECONDS)
+    metrics.observe('det_figure_cache_bytes', len(blob))
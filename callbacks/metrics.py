@@ -0,0 +1,222 @@
+import contextlib
+import functools
+import hmac
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, request
+
+# Histogram buckets by unit, chosen from the metric name suffix
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8)
+
+# Sums are stored as integers (the shared store only increments integers): seconds in microseconds
+SUM_SCALE = {'seconds': 1_000_000, 'bytes': 1}
+
+# Bearer token that gives access to /metrics through the load balancer (unset: no access). Direct
+# requests to the task from inside the VPC (no X-Forwarded-For) are always answered
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Requests slower than this many seconds are logged with their stage breakdown (disabled if unset)
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 0)) or None
+
+# Store shared by all processes (web workers and background callback jobs), e.g. a diskcache.Cache
+_store = None
+# Increments not yet flushed to the shared store: {(name, labels, field): delta}
+_pending = defaultdict(int)
+_pending_lock = threading.Lock()
+_trace = threading.local()
+# Functions run at the end of every traced callback, see on_trace_end
+_trace_end_hooks = []
+
+
+def set_metrics_store(store):
+    """Share the metrics of every process through `store` (needs `incr`, `transact` and `iterkeys`)."""
+    global _store
+    _store = store
+
+
+def on_trace_end(func):
+    """Run `func` at the end of every traced callback, e.g. to flush other per-process counts."""
+    _trace_end_hooks.append(func)
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _unit(name):
+    return 'seconds' if name.endswith('_seconds') else 'bytes'
+
+
+def _buckets(name):
+    return TIME_BUCKETS if _unit(name) == 'seconds' else SIZE_BUCKETS
+
+
+def inc(name, value=1, **labels):
+    """Increment a counter."""
+    with _pending_lock:
+        _pending[(name, _labels_key(labels), 'value')] += int(value)
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram (seconds or bytes, from the name suffix)."""
+    labels = _labels_key(labels)
+    bucket = next((le for le in _buckets(name) if value <= le), '+Inf')
+    with _pending_lock:
+        _pending[(name, labels, f"le={bucket}")] += 1
+        _pending[(name, labels, 'count')] += 1
+        _pending[(name, labels, 'sum')] += int(round(value * SUM_SCALE[_unit(name)]))
+
+
+def flush():
+    """Push the increments of this process to the shared store."""
+    if _store is None:
+        # Without a shared store the increments stay local
+        return
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    with _store.transact():
+        for (name, labels, field), delta in pending.items():
+            _store.incr(('metric', name, labels, field), delta, default=0)
+
+
+def _snapshot():
+    if _store is None:
+        with _pending_lock:
+            return dict(_pending)
+    flush()
+    return {key[1:]: _store.get(key, 0) for key in _store.iterkeys()
+            if isinstance(key, tuple) and key[0] == 'metric'}
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format."""
+    by_metric = defaultdict(lambda: defaultdict(dict))
+    for (name, labels, field), value in _snapshot().items():
+        by_metric[name][labels][field] = value
+
+    lines = []
+    for name in sorted(by_metric):
+        series = by_metric[name]
+        is_histogram = any('count' in fields for fields in series.values())
+        lines.append(f"# TYPE {name} {'histogram' if is_histogram else 'counter'}")
+        for labels, fields in sorted(series.items()):
+            if not is_histogram:
+                lines.append(f"{name}{_format_labels(labels)} {fields.get('value', 0)}")
+                continue
+            cumulative = 0
+            for le in _buckets(name):
+                cumulative += fields.get(f"le={le}", 0)
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {fields.get('count', 0)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {fields.get('sum', 0) / SUM_SCALE[_unit(name)]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {fields.get('count', 0)}")
+    return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def span(stage, **labels):
+    """Time a stage into `det_stage_seconds` and the current trace, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('det_stage_seconds', elapsed, stage=stage, **labels)
+        stages = getattr(_trace, 'stages', None)
+        if stages is not None:
+            stages.append((stage, elapsed))
+
+
+@contextlib.contextmanager
+def trace(name):
+    """
+    Time a whole callback, collecting the spans it runs.
+
+    The total goes to `det_callback_seconds`; callbacks slower than SLOW_REQUEST_SECONDS are
+    logged with their stage breakdown. Metrics are flushed at the end, and the
+    on_trace_end hooks run, so short-lived background callback processes do not lose them.
+    """
+    _trace.stages = []
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stages, _trace.stages = _trace.stages, None
+        observe('det_callback_seconds', elapsed, callback=name)
+        if SLOW_REQUEST_SECONDS is not None and elapsed > SLOW_REQUEST_SECONDS:
+            breakdown = ', '.join(f"{stage}={seconds:.3f}s" for stage, seconds in stages)
+            print(f"Slow callback {name}: {elapsed:.3f}s ({breakdown})")
+        flush()
+        for hook in _trace_end_hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Trace end hook {hook.__name__} failed: {e}")
+
+
+def traced(name):
+    """Decorator form of `trace`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def metrics_allowed(headers):
+    """
+    Whether a /metrics request may be answered.
+
+    The load balancer adds X-Forwarded-For to every request it forwards: those need the
+    METRICS_TOKEN bearer token, while scrapes sent straight to the task have none.
+    """
+    if 'X-Forwarded-For' not in headers:
+        return True
+    if METRICS_TOKEN is None:
+        return False
+    return hmac.compare_digest(headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}")
+
+
+def register_metrics(server, store=None):
+    """Time every request, record callback response sizes and expose /metrics on the Flask server."""
+    if store is not None:
+        set_metrics_store(store)
+
+    @server.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None and request.path != '/metrics':
+            # Only Dash's own routes get their own series, to bound the label cardinality
+            path = request.path if request.path.startswith('/_dash') or request.path in ('/', '/healthz') else 'other'
+            observe('det_http_request_seconds', time.perf_counter() - start, path=path)
+            if request.path == '/_dash-update-component' and not response.direct_passthrough:
+                observe('det_response_bytes', len(response.get_data()))
+            flush()
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        if not metrics_allowed(request.headers):
+            return 'Not Found', 404
+        return render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
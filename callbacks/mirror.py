@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import time
+
+from callbacks import metrics
+
+# Decoded datasets are mirrored as uncompressed Arrow IPC (Feather v2) files in this
+# directory, shared by all processes of the task; an empty value disables the mirror
+LOCAL_MIRROR_DIR = os.environ.get('LOCAL_MIRROR_DIR',
+                                  os.path.join(os.environ.get('DET_CACHE_DIR', '/tmp/det_cache'), 'mirror'))
+# Size cap of the mirror, least recently read files are evicted first
+LOCAL_MIRROR_MAX_MB = int(os.environ.get('LOCAL_MIRROR_MAX_MB', 4096))
+# Seconds a mirrored file is trusted before its S3 ETag is checked again
+LOCAL_MIRROR_VALIDATE_SECONDS = int(os.environ.get('LOCAL_MIRROR_VALIDATE_SECONDS', 60))
+
+DATA_SUFFIX = '.arrow'
+# The modification time of the meta file is the time of the last validation
+META_SUFFIX = '.json'
+# Schema metadata key of the S3 ETag a mirrored file was loaded at: kept in the data file
+# itself, so a reader never pairs a file with the ETag of another version
+ETAG_KEY = b'det_mirror_etag'
+
+
+def enabled():
+    return bool(LOCAL_MIRROR_DIR)
+
+
+def _base_path(bucket_name, s3_key):
+    name = hashlib.sha1(f"{bucket_name}/{s3_key}".encode('utf-8')).hexdigest()
+    return os.path.join(LOCAL_MIRROR_DIR, name)
+
+
+def _remove(base_path):
+    for suffix in (DATA_SUFFIX, META_SUFFIX):
+        try:
+            os.remove(base_path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _open(base_path):
+    """Memory-map a mirrored file, as an Arrow table; numeric columns are not copied."""
+    from pyarrow import feather
+    table = feather.read_table(base_path + DATA_SUFFIX, memory_map=True)
+    # Mark the file as recently used, for the LRU eviction
+    os.utime(base_path + DATA_SUFFIX)
+    return table
+
+
+def _write(base_path, df, etag, bucket_name, s3_key):
+    import pyarrow as pa
+    from pyarrow import feather
+    os.makedirs(LOCAL_MIRROR_DIR, exist_ok=True)
+    # Written aside then renamed, so other processes never map a partial file
+    tmp_suffix = f".{os.getpid()}.tmp"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), ETAG_KEY: etag.encode('utf-8')})
+    # Uncompressed, or the reads could not be zero-copy
+    feather.write_feather(table, base_path + DATA_SUFFIX + tmp_suffix, compression='uncompressed')
+    with open(base_path + META_SUFFIX + tmp_suffix, 'w') as f:
+        json.dump({'bucket': bucket_name, 'key': s3_key}, f)
+    os.replace(base_path + DATA_SUFFIX + tmp_suffix, base_path + DATA_SUFFIX)
+    # Validated now: replaced after the data, so a fresh meta file never comes before its data
+    os.replace(base_path + META_SUFFIX + tmp_suffix, base_path + META_SUFFIX)
+
+
+def evict(max_bytes=None):
+    """Delete the least recently read files until the mirror fits in `max_bytes` (LOCAL_MIRROR_MAX_MB by default)."""
+    max_bytes = LOCAL_MIRROR_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    entries = []
+    try:
+        with os.scandir(LOCAL_MIRROR_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(DATA_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path[:-len(DATA_SUFFIX)]))
+    except FileNotFoundError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, base_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        # Processes that still map the file keep reading it, the space is freed when they are done
+        _remove(base_path)
+        total -= size
+        metrics.inc('det_mirror_evictions_total')
+
+
+def read_through(bucket_name, s3_key, load, head_etag):
+    """
+    Return the dataset at s3://bucket_name/s3_key from the local mirror, loading it on a miss.
+
+    Parameters:
+    load (callable): Reads and decodes the dataset from S3, returns a DataFrame or None.
+    head_etag (callable): Returns the current ETag of the S3 object.
+
+    A mirrored file is served as is for LOCAL_MIRROR_VALIDATE_SECONDS after its last
+    validation, then checked against the ETag of the object (a HEAD request) and reloaded
+    if the object changed. The ETag compared is the one stored in the data file's schema.
+    """
+    if not enabled():
+        return load()
+
+    base_path = _base_path(bucket_name, s3_key)
+    etag = None
+    try:
+        validated = os.path.getmtime(base_path + META_SUFFIX)
+        if time.time() - validated < LOCAL_MIRROR_VALIDATE_SECONDS:
+            table = _open(base_path)
+            metrics.inc('det_mirror_requests_total', result='hit')
+            return table.to_pandas(split_blocks=True)
+        etag = head_etag()
+        table = _open(base_path)
+        if etag.encode('utf-8') == (table.schema.metadata or {}).get(ETAG_KEY):
+            os.utime(base_path + META_SUFFIX)
+            metrics.inc('det_mirror_requests_total', result='revalidated')
+            return table.to_pandas(split_blocks=True)
+        metrics.inc('det_mirror_requests_total', result='stale')
+        del table
+        _remove(base_path)
+    except (FileNotFoundError, ValueError, KeyError):
+        metrics.inc('det_mirror_requests_total', result='miss')
+    except OSError as e:
+        print(f"Local mirror unreadable for {s3_key}: {e}")
+        metrics.inc('det_mirror_requests_total', result='miss')
+
+    # The ETag is taken before the read: if the object changes in between, the next
+    # validation sees a mismatch and reloads it
+    if etag is None:
+        etag = head_etag()
+    df = load()
+    if df is not None:
+        try:
+            _write(base_path, df, etag, bucket_name, s3_key)
+            evict()
+        except OSError as e:
+            # A full or read-only disk only costs the mirror, the dataset is still served
+            print(f"Could not mirror {s3_key}: {e}")
+    return df
@@ -1,9 +1,84 @@
 
+import base64
+import io
+
 from callbacks.utils import generate_color_mapping
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 import numpy as np
 
+# Raster mode: approximate on-screen width (px) shared by the subplot columns, and the
+# resolution of the invisible mesh holding the hover values over the images.
+RASTER_TARGET_PX = 1200
+RASTER_HOVER_CELLS = 100
+# Receiver grid: points kept per trace of a panel, and panels per row
+SMALL_MULTIPLE_POINTS = 400
+SMALL_MULTIPLE_COLUMNS = 4
+
+
+def _downsample_indices(n, target):
+    """Return at most `target` evenly spaced indices into an axis of length n."""
+    if n <= target:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, target).round().astype(int))
+
+
+def minmax_downsample(x, y, n_points):
+    """
+    Reduce a series sorted along x to about n_points points, keeping its peaks.
+
+    The series is cut in n_points // 2 buckets of consecutive samples and the minimum and
+    maximum of each bucket are kept, so spikes survive, unlike with a plain stride.
+    """
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_points:
+        return x, y
+    n_buckets = max(n_points // 2, 1)
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+    missing = np.isnan(buckets)
+    offsets = np.arange(n_buckets) * size
+    low = np.where(missing, np.inf, buckets).argmin(axis=1) + offsets
+    high = np.where(missing, -np.inf, buckets).argmax(axis=1) + offsets
+    keep = np.unique(np.concatenate([low, high, [0, n - 1]]))
+    keep = keep[keep < n]
+    return x[keep], y[keep]
+
+
+def rasterize_grid(x, y, z, vmin, vmax, max_px=RASTER_TARGET_PX, colorscale='RdBu_r'):
+    """
+    Colour-map a gridded array to a PNG sized for the screen instead of the grid.
+
+    Parameters:
+    x (np.ndarray): Sorted x coordinates of the grid columns.
+    y (np.ndarray): Sorted y coordinates of the grid rows.
+    z (np.ndarray): 2D array of shape (len(y), len(x)).
+    vmin, vmax (float): Colour limits, shared across subplots.
+    max_px (int): Maximum number of pixels along each axis.
+
+    Returns:
+    tuple: (data URI of the PNG, [x0, x1], [y0, y1]) where the ranges are the pixel edges.
+    """
+    # Imported lazily: only the raster mode needs matplotlib
+    from matplotlib import image as mpimg
+
+    ix = _downsample_indices(len(x), max_px)
+    iy = _downsample_indices(len(y), max_px)
+    x_s, y_s = x[ix], y[iy]
+    z_s = z[np.ix_(iy, ix)]
+
+    buf = io.BytesIO()
+    mpimg.imsave(buf, z_s, cmap=colorscale, vmin=vmin, vmax=vmax, origin='lower', format='png')
+    uri = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode('ascii')
+
+    # Pixels are centred on the sampled grid nodes, so the image spans half a pixel beyond them
+    dx = (x_s[-1] - x_s[0]) / (len(x_s) - 1) if len(x_s) > 1 else 1.0
+    dy = (y_s[-1] - y_s[0]) / (len(y_s) - 1) if len(y_s) > 1 else 1.0
+    return uri, [x_s[0] - dx / 2, x_s[-1] + dx / 2], [y_s[0] - dy / 2, y_s[-1] + dy / 2]
+
 
 def main_time_plot_dynamic(df, variable_list, x_axis=dict({'name':'t', 'unit':'s', 'description':'Time'})):
     """
@@ -102,7 +177,7 @@ def main_surface_plot_dynamic_v2(df, old_fig, variable_dict, plot_type="3d_surfa
     df (pd.DataFrame): DataFrame containing the dataset.
     old_fig (go.Figure): Previous figure state (for partial updates).
     variable_dict (dict): Dictionary with keys 'name', 'unit', and 'description'.
-    plot_type (str): Type of plot ("3d_surface" or "heatmap").
+    plot_type (str): Type of plot ("3d_surface", "heatmap" or "raster").
     slider (int): Current slider position (index for cross-section).
     slider_only (bool): If True, only update the cross-section, otherwise regenerate the figure.
 
@@ -143,7 +218,7 @@ def main_surface_plot_dynamic_v2(df, old_fig, variable_dict, plot_type="3d_surfa
             row = (i // num_cols) + 1
             col = (i % num_cols) + 1
             dataset_df = df[df['dataset_name'] == dataset_name]
-            slider_idx = dataset_df.loc[(df['y'] - slider).abs().idxmin(), 'y']
+            slider_idx = dataset_df.loc[(dataset_df['y'] - slider).abs().idxmin(), 'y']
 
             x_unique = dataset_df['x'].unique()
             y_unique = dataset_df['y'].unique()
@@ -209,6 +284,53 @@ def main_surface_plot_dynamic_v2(df, old_fig, variable_dict, plot_type="3d_surfa
                     yaxis_key: dict(title='y (m)')
                 })
 
+            elif plot_type == "raster":
+                # The array is colour-mapped server side; the browser only receives a screen-sized PNG
+                # pivot() sorts its axes, so the coordinates are sorted to match v_disp_2d
+                img_uri, x_range, y_range = rasterize_grid(np.sort(x_unique), np.sort(y_unique), v_disp_2d,
+                                                           colorbar_min, colorbar_max,
+                                                           max_px=RASTER_TARGET_PX // num_cols)
+                fig.add_layout_image(dict(
+                    source=img_uri,
+                    xref="x", yref="y",
+                    x=x_range[0], y=y_range[1],
+                    sizex=x_range[1] - x_range[0], sizey=y_range[1] - y_range[0],
+                    xanchor="left", yanchor="top",
+                    sizing="stretch",
+                    layer="below"
+                ), row=row, col=col)
+
+                # Invisible coarse mesh: sets the axis ranges and answers hovers in the browser. Its
+                # cells sit on a subset of the grid nodes and carry their values, so a hover shows
+                # the value of the closest of those nodes without a request to the server
+                hx = _downsample_indices(len(x_unique), RASTER_HOVER_CELLS)
+                hy = _downsample_indices(len(y_unique), RASTER_HOVER_CELLS)
+                fig.add_trace(go.Heatmap(
+                    x=np.sort(x_unique)[hx],
+                    y=np.sort(y_unique)[hy],
+                    z=v_disp_2d[np.ix_(hy, hx)].astype(np.float32),
+                    opacity=0,
+                    showscale=False,
+                    name=dataset_name,
+                    hovertemplate=(f"x: %{{x:.0f}} m<br>y: %{{y:.0f}} m<br>{variable_dict['name']} = %{{z:.6g}}"
+                                   f"<extra>{dataset_name}</extra>")
+                ), row=row, col=col)
+
+                fig.add_trace(go.Scatter(
+                    x=[x_unique.min(), x_unique.max()],
+                    y=[slider_idx, slider_idx],
+                    mode='lines',
+                    line=dict(color='black', width=1),
+                    showlegend=False
+                ), row=row, col=col)
+
+                xaxis_key = f'xaxis{i + 1}' if i > 0 else 'xaxis'
+                yaxis_key = f'yaxis{i + 1}' if i > 0 else 'yaxis'
+                fig.update_layout({
+                    xaxis_key: dict(title='x (m)', scaleanchor=f"y{i + 1}" if i > 0 else "y"),
+                    yaxis_key: dict(title='y (m)')
+                })
+
         # Global layout updates
         if plot_type == "3d_surface":
             fig.update_layout(
@@ -222,6 +344,29 @@ def main_surface_plot_dynamic_v2(df, old_fig, variable_dict, plot_type="3d_surfa
             )
             fig.update_xaxes(matches='x')
             fig.update_yaxes(matches='y')
+        elif plot_type == "raster":
+            # Images carry no colour bar, so a single empty marker trace draws the shared one
+            fig.add_trace(go.Scatter(
+                x=[None],
+                y=[None],
+                mode='markers',
+                showlegend=False,
+                hoverinfo='skip',
+                marker=dict(
+                    colorscale='RdBu_r',
+                    cmin=colorbar_min,
+                    cmax=colorbar_max,
+                    color=[colorbar_min],
+                    showscale=True,
+                    colorbar=dict(title=f"{variable_dict['name']} ({variable_dict['unit']})")
+                )
+            ))
+            fig.update_layout(
+                title=f"Raster heatmap of x vs y colored by {variable_dict['name']} [{variable_dict['unit']}] (Re gridded Data)",
+                template='plotly_white'
+            )
+            fig.update_xaxes(matches='x', showgrid=False, zeroline=False)
+            fig.update_yaxes(matches='y', showgrid=False, zeroline=False)
     except Exception as e:
         num_rows = 1
         print(f"Error plotting dataset: {e}")
@@ -285,3 +430,97 @@ def cross_section_plots(df, variable_dict, slider=0):
                           legendgroup="code_name"),
             )
     return fig
+
+
+def profile_plot(profiles, variable_dict, title, x_title):
+    """
+    Plot sampled profiles, one line per dataset.
+
+    Parameters:
+    profiles (dict): {dataset name: (distance, values)} as returned by profiles.get_profiles.
+    variable_dict (dict): Dictionary with keys 'name' and 'unit'.
+    title (str): Figure title.
+    x_title (str): Title of the x axis.
+    """
+    fig = go.Figure()
+    for dataset, (distance, values) in profiles.items():
+        fig.add_trace(go.Scattergl(
+            x=distance,
+            y=values,
+            mode='lines',
+            name=dataset,
+            line=dict(width=2)
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title=f"{variable_dict['name']} ({variable_dict['unit']})",
+        legend_title="Dataset Name",
+        template="plotly_white"
+    )
+    return fig
+
+
+def small_multiples_plot(df, variable_dict, receivers, x_axis='t', n_points=SMALL_MULTIPLE_POINTS,
+                         columns=SMALL_MULTIPLE_COLUMNS):
+    """
+    Plot one variable for many receivers, one small panel per receiver and a line per dataset.
+
+    Parameters:
+    df (pd.DataFrame): Rows of every receiver, with 'receiver' and 'dataset_name' columns.
+    variable_dict (dict): Dictionary with keys 'name', 'unit' and 'description'.
+    receivers (list): Receivers in panel order.
+    n_points (int): Points kept per line (see minmax_downsample).
+
+    Returns:
+    tuple: The figure, and the receiver of each trace (to find the panel that was clicked).
+    """
+    by_receiver = dict(tuple(df.groupby('receiver', sort=False)))
+    receivers = [r for r in receivers if r in by_receiver]
+    num_rows = max(-(-len(receivers) // columns), 1)
+    fig = make_subplots(
+        rows=num_rows, cols=columns, shared_xaxes=True, subplot_titles=receivers,
+        vertical_spacing=min(0.08, 0.3 / num_rows), horizontal_spacing=0.04
+    )
+    color_mapping = generate_color_mapping(sorted(df['dataset_name'].unique()))
+    trace_receivers = []
+    shown = set()
+    for idx, receiver in enumerate(receivers):
+        for dataset_name, group in by_receiver[receiver].groupby('dataset_name'):
+            x, y = minmax_downsample(group[x_axis].to_numpy(), group[variable_dict['name']].to_numpy(), n_points)
+            fig.add_trace(
+                go.Scattergl(x=x, y=y, mode='lines', name=dataset_name, legendgroup=dataset_name,
+                             line=dict(color=color_mapping[dataset_name], width=1),
+                             showlegend=dataset_name not in shown),
+                row=idx // columns + 1, col=idx % columns + 1
+            )
+            shown.add(dataset_name)
+            trace_receivers.append(receiver)
+    fig.update_annotations(font_size=11)
+    fig.update_layout(
+        title=f"{variable_dict['description']} ({variable_dict['unit']}), click a panel to expand it",
+        height=max(400, 200 * num_rows),
+        margin=dict(l=40, r=20, t=80, b=40),
+        template="plotly_white"
+    )
+    return fig, trace_receivers
+
+
+def receiver_panel_plot(df, variable_dict, title, x_axis='t'):
+    """Full-resolution plot of one variable of one receiver, a line per dataset."""
+    fig = go.Figure()
+    for dataset_name, group in df.groupby('dataset_name'):
+        fig.add_trace(go.Scattergl(
+            x=group[x_axis],
+            y=group[variable_dict['name']],
+            mode='lines',
+            name=dataset_name
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_axis,
+        yaxis_title=f"{variable_dict['name']} ({variable_dict['unit']})",
+        legend_title="Dataset Name",
+        template="plotly_white"
+    )
+    return fig
@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from callbacks import metrics
+from callbacks import utils
+
+# Samples along a drawn polyline (cuts at constant x or y use the grid nodes)
+PROFILE_SAMPLES = 1001
+# Line coordinates are rounded to this many decimals (in m) before being used as cache keys
+LINE_DECIMALS = 0
+# Seconds a sampled profile stays in the shared cache
+PROFILE_TIMEOUT = 3600
+# Grids kept unpickled in each process, so dragging a line does not reload them every time
+PROFILE_GRID_CACHE_SIZE = int(os.environ.get('PROFILE_GRID_CACHE_SIZE', 8))
+PROFILE_GRID_CACHE_SECONDS = 300
+
+_grid_lock = threading.Lock()
+# {(benchmark_id, file_name, version, receiver, variable): (loaded_at, grid)}, least recently used first
+_recent_grids = OrderedDict()
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def normalize_line(mode, value=None, points=None):
+    """
+    Hashable description of a profile line, used in cache keys.
+
+    mode 'x' or 'y' cuts at a constant `value` of that coordinate; mode 'polyline' follows
+    `points`, a sequence of (x, y) vertices.
+    """
+    if mode in ('x', 'y'):
+        return mode, round(float(value), LINE_DECIMALS)
+    return 'polyline', tuple((round(float(x), LINE_DECIMALS), round(float(y), LINE_DECIMALS)) for x, y in points)
+
+
+def line_samples(line, x_nodes, y_nodes, n_samples=PROFILE_SAMPLES):
+    """Return (distance, xs, ys): the sampling positions along a line and their abscissa for plotting."""
+    kind = line[0]
+    if kind == 'y':
+        return x_nodes, x_nodes, np.full(len(x_nodes), line[1], dtype=float)
+    if kind == 'x':
+        return y_nodes, np.full(len(y_nodes), line[1], dtype=float), y_nodes
+    vertices = np.asarray(line[1], dtype=float)
+    cumulative = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(vertices, axis=0).T))])
+    distance = np.linspace(0.0, cumulative[-1], n_samples)
+    return distance, np.interp(distance, cumulative, vertices[:, 0]), np.interp(distance, cumulative, vertices[:, 1])
+
+
+def bilinear(x_nodes, y_nodes, z, xs, ys):
+    """
+    Bilinear interpolation of gridded values at the points (xs, ys).
+
+    `z` has shape (..., len(y_nodes), len(x_nodes)), so several grids on the same nodes
+    are sampled at once. Points outside the grid are NaN.
+    """
+    ix = np.clip(np.searchsorted(x_nodes, xs, side='right') - 1, 0, len(x_nodes) - 2)
+    iy = np.clip(np.searchsorted(y_nodes, ys, side='right') - 1, 0, len(y_nodes) - 2)
+    tx = (xs - x_nodes[ix]) / (x_nodes[ix + 1] - x_nodes[ix])
+    ty = (ys - y_nodes[iy]) / (y_nodes[iy + 1] - y_nodes[iy])
+    values = (z[..., iy, ix] * (1 - tx) * (1 - ty) + z[..., iy, ix + 1] * tx * (1 - ty)
+              + z[..., iy + 1, ix] * (1 - tx) * ty + z[..., iy + 1, ix + 1] * tx * ty)
+    outside = (xs < x_nodes[0]) | (xs > x_nodes[-1]) | (ys < y_nodes[0]) | (ys > y_nodes[-1])
+    values[..., outside] = np.nan
+    return values
+
+
+def sample_profiles(grids, line, n_samples=PROFILE_SAMPLES):
+    """
+    Sample every grid along a line.
+
+    Grids sharing the same nodes (the usual case, the grid comes from the template) are
+    stacked and interpolated in one pass.
+
+    Parameters:
+    grids (dict): {name: (x, y, z)} as returned by get_surface_grid.
+    line (tuple): A line from normalize_line.
+
+    Returns:
+    dict: {name: (distance, values)}.
+    """
+    layouts = {}
+    for name, (x_nodes, y_nodes, z) in grids.items():
+        layout = layouts.setdefault((x_nodes.tobytes(), y_nodes.tobytes()), (x_nodes, y_nodes, []))
+        layout[2].append((name, z))
+
+    profiles = {}
+    for x_nodes, y_nodes, members in layouts.values():
+        distance, xs, ys = line_samples(line, x_nodes, y_nodes, n_samples)
+        values = bilinear(x_nodes, y_nodes, np.stack([z for _, z in members]), xs, ys)
+        for (name, _), row in zip(members, values):
+            profiles[name] = (distance, row)
+    return profiles
+
+
+def _get_grid(benchmark_id, file_name, version, receiver, variable):
+    """get_surface_grid, with the last few grids of each dataset version kept in process memory."""
+    key = (utils.parse_benchmark_id(benchmark_id), file_name, version, receiver, variable)
+    with _grid_lock:
+        entry = _recent_grids.get(key)
+        if entry is not None and time.monotonic() - entry[0] < PROFILE_GRID_CACHE_SECONDS:
+            _recent_grids.move_to_end(key)
+            return entry[1]
+    grid = utils.get_surface_grid(benchmark_id, file_name, receiver, variable)
+    if grid is not None:
+        with _grid_lock:
+            _recent_grids[key] = (time.monotonic(), grid)
+            _recent_grids.move_to_end(key)
+            while len(_recent_grids) > PROFILE_GRID_CACHE_SIZE:
+                _recent_grids.popitem(last=False)
+    return grid
+
+
+def get_profiles(benchmark_id, file_names, receiver, variable, line):
+    """
+    Profiles of a variable along a line for several datasets.
+
+    The profiles of a request are cached together, under the line and the version of
+    every dataset (see utils.get_dataset_version): a request takes one entry of the shared
+    cache whatever the number of datasets, and a republished dataset is sampled again.
+
+    Returns:
+    dict: {file_name: (distance, values)}, without the datasets that could not be loaded.
+    """
+    benchmark = utils.parse_benchmark_id(benchmark_id)
+    versions = [(file_name, utils.get_dataset_version(benchmark, file_name)) for file_name in file_names]
+    cache_key = f"profiles_{benchmark}_{receiver}_{variable}_{line}_{versions}"
+    profiles = utils.cache.get(cache_key)
+    if profiles is not None:
+        metrics.inc('det_cache_requests_total', result='hit', function='get_profiles')
+        return profiles
+    metrics.inc('det_cache_requests_total', result='miss', function='get_profiles')
+
+    grids = {}
+    for file_name, version in versions:
+        grid = _get_grid(benchmark_id, file_name, version, receiver, variable)
+        if grid is not None:
+            grids[file_name] = grid
+    with metrics.span('sample_profiles'):
+        sampled = sample_profiles(grids, line)
+    profiles = {file_name: sampled[file_name] for file_name in file_names if file_name in sampled}
+    # Datasets that could not be loaded are tried again by the next request
+    if len(profiles) == len(versions):
+        utils.cache.set(cache_key, profiles, timeout=PROFILE_TIMEOUT)
+    return profiles
+
+
+def _shape_points(shape):
+    if shape.get('type') == 'line':
+        return [(shape['x0'], shape['y0']), (shape['x1'], shape['y1'])]
+    if shape.get('type') == 'path':
+        numbers = [float(n) for n in _NUMBER.findall(shape.get('path', ''))]
+        return list(zip(numbers[0::2], numbers[1::2]))
+    return None
+
+
+def line_from_relayout(relayout_data):
+    """
+    Vertices of the profile line drawn (or edited) on the main graph.
+
+    Returns None when the event is not about drawn shapes, and an empty list when they
+    were all erased. Only the last drawn line or open path is used.
+    """
+    if 'shapes' in relayout_data:
+        lines = [points for points in map(_shape_points, relayout_data['shapes']) if points]
+        return lines[-1] if lines else []
+    # Moving or resizing a shape only reports the changed attributes
+    edited = {}
+    for key, value in relayout_data.items():
+        match = re.fullmatch(r'shapes\[\d+\]\.(\w+)', key)
+        if match is not None:
+            edited[match.group(1)] = value
+    if 'path' in edited:
+        return _shape_points({'type': 'path', 'path': edited['path']})
+    if {'x0', 'y0', 'x1', 'y1'} <= edited.keys():
+        return _shape_points({'type': 'line', **edited})
+    return None
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from callbacks import metrics
+
+# Objects kept in process memory for the tokens held by the browser's dcc.Store
+STATE_STORE_SIZE = int(os.environ.get('STATE_STORE_SIZE', 256))
+
+_lock = threading.Lock()
+# {token: value}, least recently used first
+_objects = OrderedDict()
+# {kind: function(key) -> value}, to rebuild a value this process does not hold
+_loaders = {}
+
+
+def register_loader(kind, loader):
+    """Set how values of a kind are rebuilt from their key, e.g. in another worker or after a restart."""
+    _loaders[kind] = loader
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def put(kind, key, value):
+    """
+    Keep `value` in this process and return its token, to be stored client side instead.
+
+    The token holds the kind and key, to reload the value in any process, and a digest of
+    the value, so a changed value gives a new token and fires the callbacks depending on it.
+    """
+    token = f"{kind}:{key}:{_digest(value)}"
+    with _lock:
+        _objects[token] = value
+        _objects.move_to_end(token)
+        while len(_objects) > STATE_STORE_SIZE:
+            _objects.popitem(last=False)
+    return token
+
+
+def get(token):
+    """
+    Value of a token, reloaded with the loader of its kind if this process does not hold it.
+
+    None if the value cannot be reloaded, or if what is reloaded no longer matches the
+    token's digest (e.g. a template republished since the page was loaded): callers treat
+    it as not loaded yet.
+    """
+    if token is None:
+        return None
+    with _lock:
+        if token in _objects:
+            _objects.move_to_end(token)
+            metrics.inc('det_state_requests_total', result='hit')
+            return _objects[token]
+    metrics.inc('det_state_requests_total', result='miss')
+    kind, rest = token.split(':', 1)
+    key, digest = rest.rsplit(':', 1)
+    try:
+        value = _loaders[kind](key)
+    except Exception as e:
+        print(f"Could not reload {token}: {e}")
+        metrics.inc('det_state_requests_total', result='error')
+        return None
+    if _digest(value) != digest:
+        print(f"{kind} {key} changed since {token} was issued")
+        metrics.inc('det_state_requests_total', result='stale')
+        return None
+    with _lock:
+        _objects[token] = value
+        while len(_objects) > STATE_STORE_SIZE:
+            _objects.popitem(last=False)
+    return value
+
+
+def template_token(benchmark_id, template):
+    """Token of a benchmark template, for the benchmark-params store."""
+    return put('template', benchmark_id, template)
+
+
+def get_template(token):
+    """Benchmark template of a benchmark-params token (None while it is not loaded)."""
+    return get(token)
+
+
+def _load_template(benchmark_id):
+    from callbacks.utils import get_benchmark_params
+    return get_benchmark_params(f"?benchmark_id={benchmark_id}")
+
+
+register_loader('template', _load_template)
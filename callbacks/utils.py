@@ -1,29 +1,260 @@
 import base64
+import contextlib
+import fnmatch
+import hashlib
 import json
+import os
+import re
+import threading
 import urllib
-import plotly.express as px
-import boto3
+from collections import Counter, OrderedDict
 import pandas as pd
 import io
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
-import awswrangler as wr
 from dash import html
+from callbacks import metrics, mirror
+
+try:
+    import fcntl
+except ImportError:  # Windows: fetches are only coalesced within a process
+    fcntl = None
+
+# boto3, awswrangler and plotly's colour tables are imported on first use to keep the
+# dashboard's import (and each worker's cold start) light
 
 # Global variable to store the cache object
 cache = None
+# Entries the Flask cache on disk holds before it prunes (CACHE_THRESHOLD of app_prod and app_dev)
+CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD', 500))
+# Entries each process keeps in memory in front of it, see LocalCache
+LOCAL_CACHE_ENTRIES = int(os.environ.get('LOCAL_CACHE_ENTRIES', 50))
 
 def set_cache(cache_obj):
     """Set the cache object for use in this module."""
     global cache
     cache = cache_obj
 
-def memoize(timeout=None):
+
+class _Entry:
+    """Value stored in the shared cache by LocalCache, with its expiry time."""
+    __slots__ = ('expires', 'value')
+
+    def __init__(self, expires, value):
+        self.expires, self.value = expires, value
+
+
+class LocalCache:
+    """
+    In-process LRU layer in front of the Flask cache shared on disk.
+
+    Hits are served from memory, without reading and unpickling the entry from disk; misses
+    fall back to the shared cache, so results fetched by another worker or a background job
+    are found. Entries are stored in the shared cache with their expiry time, so a copy
+    kept in memory expires with the shared one.
+    """
+
+    def __init__(self, shared, max_entries=None, default_timeout=3600):
+        self.shared = shared
+        self.max_entries = LOCAL_CACHE_ENTRIES if max_entries is None else max_entries
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        # {key: (expires, value)}, least recently used first
+        self._items = OrderedDict()
+
+    def _keep(self, key, expires, value):
+        with self._lock:
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if item[0] > time.time():
+                    self._items.move_to_end(key)
+                    return item[1]
+                del self._items[key]
+        entry = self.shared.get(key)
+        if not isinstance(entry, _Entry):
+            # Missing, or written without this layer
+            return None
+        self._keep(key, entry.expires, entry.value)
+        return entry.value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        # As in Flask-Caching, 0 never expires
+        expires = time.time() + timeout if timeout else float('inf')
+        self.shared.set(key, _Entry(expires, value), timeout=timeout)
+        self._keep(key, expires, value)
+
+# Memoized functions by name, so cached calls can be replayed (see callbacks/warmup.py)
+memoized_functions = {}
+
+# Calls to the memoized functions marked replay=True, counted per process to find the most
+# requested datasets
+_access_lock = threading.Lock()
+_access_counts = Counter()
+_access_log_paused = threading.local()
+
+
+def record_access(func_name, args, kwargs):
+    """Count a call to a memoized function, unless the current thread is warming the cache."""
+    if getattr(_access_log_paused, 'value', False):
+        return
+    with _access_lock:
+        _access_counts[(func_name, args, tuple(sorted(kwargs.items())))] += 1
+
+
+def pop_access_counts():
+    """Return and reset the access counts recorded since the last call."""
+    with _access_lock:
+        counts = dict(_access_counts)
+        _access_counts.clear()
+    return counts
+
+
+def pause_access_log(paused=True):
+    """Stop (or resume) recording accesses made from the current thread."""
+    _access_log_paused.value = paused
+
+
+# Concurrent misses of the same key wait for a single fetch: a lock per key within a process,
+# and lock files on the cache disk across the gunicorn workers and background processes
+SINGLE_FLIGHT_DIR = os.path.join(os.environ.get('DET_CACHE_DIR', '/tmp/det_cache'), 'locks')
+# Seconds a caller waits for the fetch in flight before fetching on its own
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.environ.get('SINGLE_FLIGHT_WAIT_SECONDS', 120))
+# Lock files unused for this many seconds are removed, at most once per interval per process
+SINGLE_FLIGHT_LOCK_TTL_SECONDS = float(os.environ.get('SINGLE_FLIGHT_LOCK_TTL_SECONDS', 24 * 3600))
+
+# Seconds a None result (a failed fetch) is cached: the callers that waited for it get None
+# instead of fetching again one after the other
+FAILURE_CACHE_SECONDS = int(os.environ.get('FAILURE_CACHE_SECONDS', 30))
+
+_flights_lock = threading.Lock()
+# {cache key: [lock, number of callers holding or waiting for it]}
+_flights = {}
+_last_lock_prune = None
+
+
+def _lock_path(cache_key):
+    """
+    Lock file of a key. Each key has its own file: a memoized function calling another one
+    holds the outer key while locking the inner one, and a file shared by both would block
+    the process on its own lock.
+    """
+    digest = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+    return os.path.join(SINGLE_FLIGHT_DIR, digest[:2], f"{digest}.lock")
+
+
+def prune_lock_files(max_age=None):
+    """Remove the lock files not used for `max_age` seconds and not held; returns how many were removed."""
+    max_age = SINGLE_FLIGHT_LOCK_TTL_SECONDS if max_age is None else max_age
+    cutoff, removed = time.time() - max_age, 0
+    for root, _, files in os.walk(SINGLE_FLIGHT_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                with open(path, 'a') as f:
+                    # A held file is in use; a file opened but not yet locked by another
+                    # caller can still go, which at worst lets two callers fetch the key
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+    return removed
+
+
+def _maybe_prune_lock_files():
+    global _last_lock_prune
+    now = time.monotonic()
+    with _flights_lock:
+        if _last_lock_prune is not None and now - _last_lock_prune < SINGLE_FLIGHT_LOCK_TTL_SECONDS:
+            return
+        _last_lock_prune = now
+    threading.Thread(target=prune_lock_files, daemon=True).start()
+
+
+def _lock_file(cache_key, deadline):
+    """Open and lock the file of a key; None if it is not held before the deadline."""
+    path = _lock_path(cache_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(path, 'a')
+    while True:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.utime(path)  # Marks the file as used for prune_lock_files
+            return f
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                f.close()
+                return None
+            time.sleep(0.05)
+
+
+@contextlib.contextmanager
+def single_flight(cache_key, wait=None):
+    """
+    Hold the fetch of a key: other threads and processes entering with the same key wait.
+
+    Yields False if the wait timed out; the caller then fetches without holding the key.
+    """
+    deadline = time.monotonic() + (SINGLE_FLIGHT_WAIT_SECONDS if wait is None else wait)
+    with _flights_lock:
+        flight = _flights.setdefault(cache_key, [threading.Lock(), 0])
+        flight[1] += 1
+    held = flight[0].acquire(timeout=max(deadline - time.monotonic(), 0))
+    acquired, lock_file = held, None
+    try:
+        if held and fcntl is not None:
+            try:
+                _maybe_prune_lock_files()
+                lock_file = _lock_file(cache_key, deadline)
+                acquired = lock_file is not None
+            except OSError as e:
+                # No usable lock directory: coalesce within this process only
+                print(f"Cannot lock {cache_key} across processes: {e}")
+        yield acquired
+    finally:
+        if lock_file is not None:
+            lock_file.close()  # Releases the flock
+        if held:
+            flight[0].release()
+        with _flights_lock:
+            flight[1] -= 1
+            if flight[1] == 0:
+                del _flights[cache_key]
+
+
+class _NoResult:
+    """Cached in place of a None result, which the cache cannot tell from a miss."""
+
+
+def memoize(timeout=None, replay=False):
+    """
+    Cache the results of a function in the Flask cache for `timeout` seconds.
+
+    A None result is cached for FAILURE_CACHE_SECONDS only, so a failed fetch is retried soon
+    but the callers coalesced behind it do not each fetch again.
+
+    With replay=True the calls are counted, and the most requested ones are fetched again
+    by the cache warm-up (see callbacks/warmup.py).
+    """
     def decorator(func):
         def wrapper(*args, **kwargs):
             if cache is None:
                 raise ValueError("Cache object is not initialized. Call set_cache() first.")
 
+            if replay:
+                record_access(func.__name__, args, kwargs)
+
             # Generate a cache key based on the function name and arguments
             cache_key = f"{func.__name__}_{str(args)}_{str(kwargs)}"
 
@@ -31,18 +262,71 @@ def memoize(timeout=None):
             cached_data = cache.get(cache_key)
             if cached_data is not None:
                 print(f"Retrieving data from cache for key: {cache_key}")
-                return cached_data
-
-            # If not in cache, fetch the data and cache it
-            print(f"Fetching data from S3 for key: {cache_key}")
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout=timeout)
-            return result
+                metrics.inc('det_cache_requests_total', result='hit', function=func.__name__)
+                return None if isinstance(cached_data, _NoResult) else cached_data
+            metrics.inc('det_cache_requests_total', result='miss', function=func.__name__)
+
+            with single_flight(cache_key) as held:
+                if not held:
+                    metrics.inc('det_single_flight_total', result='timeout', function=func.__name__)
+                else:
+                    # Fetched by the caller we waited for
+                    cached_data = cache.get(cache_key)
+                    if cached_data is not None:
+                        metrics.inc('det_single_flight_total', result='coalesced', function=func.__name__)
+                        return None if isinstance(cached_data, _NoResult) else cached_data
+                    metrics.inc('det_single_flight_total', result='leader', function=func.__name__)
+
+                # If not in cache, fetch the data and cache it
+                print(f"Fetching data from S3 for key: {cache_key}")
+                result = func(*args, **kwargs)
+                if result is None:
+                    failure_timeout = FAILURE_CACHE_SECONDS if timeout is None else min(timeout, FAILURE_CACHE_SECONDS)
+                    cache.set(cache_key, _NoResult(), timeout=failure_timeout)
+                else:
+                    cache.set(cache_key, result, timeout=timeout)
+                return result
+        memoized_functions[func.__name__] = wrapper
         return wrapper
     return decorator
 
-# Create a global S3 client for reuse across function calls
-s3_client = boto3.client('s3')
+# Global S3 client, created on first use and reused across function calls
+s3_client = None
+# Arrow S3 filesystem for row-group level reads, created on first use as well
+arrow_s3 = None
+
+
+def get_s3_client():
+    """Return the shared S3 client, creating it on first use."""
+    global s3_client
+    if s3_client is None:
+        import boto3
+        s3_client = boto3.client('s3')
+    return s3_client
+
+
+def get_arrow_s3():
+    """Return the shared pyarrow S3 filesystem, creating it on first use."""
+    global arrow_s3
+    if arrow_s3 is None:
+        from pyarrow import fs
+        region = os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION') or 'us-west-2'
+        arrow_s3 = fs.S3FileSystem(region=region, endpoint_override=os.environ.get('AWS_ENDPOINT_URL'))
+    return arrow_s3
+
+
+def reset_clients():
+    """Drop the AWS clients, to be called in each process after a fork."""
+    global s3_client, arrow_s3
+    s3_client = None
+    arrow_s3 = None
+
+
+def preload_heavy_modules():
+    """Import the lazily loaded modules now, e.g. in a gunicorn master before forking workers."""
+    import boto3  # noqa: F401
+    import awswrangler  # noqa: F401
+    import plotly.colors  # noqa: F401
 
 # Helper function to parse the benchmark_id from the URL
 def parse_benchmark_id(search):
@@ -50,11 +334,47 @@ def parse_benchmark_id(search):
     return query_params.get('benchmark_id', [''])[0]  # Return first value or empty string
 
 
-@memoize(timeout=3600)  # Cache for 1h
+def read_s3_object(bucket_name, s3_key):
+    """Read a whole S3 object, recording its size and latency."""
+    start = time.perf_counter()
+    body = get_s3_client().get_object(Bucket=bucket_name, Key=s3_key)['Body'].read()
+    metrics.observe('det_s3_get_seconds', time.perf_counter() - start)
+    metrics.observe('det_s3_get_bytes', len(body))
+    return body
+
+
+def head_etag(bucket_name, s3_key):
+    """Current ETag of an S3 object."""
+    return get_s3_client().head_object(Bucket=bucket_name, Key=s3_key)['ETag']
+
+
+@memoize(timeout=3600, replay=True)  # Cache for 1h
 def get_s3_dataset(bucket_name, s3_key):
-    """Fetch a single S3 object and return a DataFrame."""
+    """
+    Fetch a single S3 object and return a DataFrame, through the local mirror (see callbacks/mirror.py).
+
+    A wildcard receiver key (bp1-qd templates, e.g. ".../*fltst_dp000.parquet") is first
+    resolved to the published objects it matches, which are concatenated as the awswrangler
+    wildcard read did; HEAD requests and the mirror only ever see concrete keys.
+    """
     try:
-        df = wr.s3.read_parquet(f"s3://{bucket_name}/{s3_key}")
+        keys = resolve_receiver_keys(bucket_name, s3_key)
+        if not keys:
+            print(f"No published object matches {s3_key}")
+            return None
+
+        def read(key):
+            def load():
+                import awswrangler as wr
+                with metrics.span('s3_read_parquet'):
+                    return wr.s3.read_parquet(f"s3://{bucket_name}/{key}")
+
+            with metrics.span('read_dataset'):
+                return mirror.read_through(bucket_name, key, load, lambda: head_etag(bucket_name, key))
+
+        frames = [read(key) for key in keys]
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        metrics.observe('det_dataset_bytes', int(df.memory_usage(deep=True).sum()))
         return df
 
     except Exception as e:
@@ -62,6 +382,200 @@ def get_s3_dataset(bucket_name, s3_key):
         return None
 
 
+def select_row_groups(metadata, column, t0, t1):
+    """Indices of the row groups whose `column` statistics overlap [t0, t1] (all of them without statistics)."""
+    column_index = metadata.schema.to_arrow_schema().get_field_index(column)
+    if column_index < 0:
+        return list(range(metadata.num_row_groups))
+    selected = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(column_index).statistics
+        if stats is None or not stats.has_min_max or (stats.min <= t1 and stats.max >= t0):
+            selected.append(i)
+    return selected
+
+
+@memoize(timeout=3600)  # Cache for 1h
+def get_s3_dataset_window(bucket_name, s3_key, t0, t1, column='t'):
+    """
+    Fetch the rows of a single S3 object with `column` in [t0, t1].
+
+    Only the footer and the row groups overlapping the window are read. Time series are
+    written sorted by time in small row groups (see lambda_process_uploads), so a zoomed
+    window costs a few row groups instead of the whole file; files without useful
+    statistics are read whole and filtered. Wildcard receiver keys are resolved to the
+    published objects first, as in get_s3_dataset.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        keys = resolve_receiver_keys(bucket_name, s3_key)
+        if not keys:
+            print(f"No published object matches {s3_key}")
+            return None
+        tables = []
+        with metrics.span('s3_read_window'):
+            for key in keys:
+                with get_arrow_s3().open_input_file(f"{bucket_name}/{key}") as f:
+                    parquet_file = pq.ParquetFile(f)
+                    row_groups = select_row_groups(parquet_file.metadata, column, t0, t1)
+                    tables.append(parquet_file.read_row_groups(row_groups))
+                metrics.inc('det_row_groups_total', len(row_groups), result='read')
+                metrics.inc('det_row_groups_total', parquet_file.metadata.num_row_groups - len(row_groups),
+                            result='skipped')
+        df = pa.concat_tables(tables).to_pandas()
+        df = df[(df[column] >= t0) & (df[column] <= t1)].reset_index(drop=True)
+        metrics.observe('det_dataset_bytes', int(df.memory_usage(deep=True).sum()))
+        return df
+
+    except Exception as e:
+        print(f"Error fetching {s3_key} for [{t0}, {t1}]: {e}")
+        return None
+
+
+# Consolidated files written at ingest (lambda_process_uploads/compaction.py): one per submission
+# and file type, with a receiver column and a footer index of each receiver's row groups
+RECEIVER_INDEX_KEY = b"det_receivers"
+
+
+def compact_key(benchmark_pb, file_name, file_type_name):
+    """S3 key of the consolidated parquet file of a dataset and template file type."""
+    name = re.sub(r"[^a-z0-9]+", "_", file_type_name.lower()).strip("_")
+    return f"public_ds/{benchmark_pb}/{file_name}/compact/{name}.parquet"
+
+
+@memoize(timeout=3600)  # Cache for 1h
+def get_s3_receivers(bucket_name, s3_key, receivers):
+    """
+    Load some receivers of a consolidated parquet file, as {receiver: DataFrame}.
+
+    Their row groups are looked up in the footer index and read together with
+    pre-buffering, so pyarrow coalesces the byte ranges into one plan of concurrent ranged
+    GETs instead of one object per receiver. Receivers can be wildcard patterns, as in the
+    templates; those without a match are left out. None if the file cannot be read
+    (submissions ingested before consolidation).
+    """
+    try:
+        import pyarrow.parquet as pq
+        with metrics.span('s3_read_receivers'):
+            with get_arrow_s3().open_input_file(f"{bucket_name}/{s3_key}") as f:
+                parquet_file = pq.ParquetFile(f, pre_buffer=True)
+                index = json.loads(parquet_file.schema_arrow.metadata[RECEIVER_INDEX_KEY])
+                matches = {receiver: sorted(fnmatch.filter(index, receiver)) for receiver in receivers}
+                row_groups = sorted({g for found in matches.values() for name in found for g in index[name]})
+                table = parquet_file.read_row_groups(row_groups)
+        metrics.inc('det_row_groups_total', len(row_groups), result='read')
+        metrics.inc('det_row_groups_total', parquet_file.metadata.num_row_groups - len(row_groups), result='skipped')
+        df = table.to_pandas()
+        groups = {name: group.drop(columns='receiver') for name, group in df.groupby('receiver', sort=False)}
+        frames = {}
+        for receiver, found in matches.items():
+            found = [groups[name] for name in found if name in groups]
+            if found:
+                frames[receiver] = pd.concat(found, ignore_index=True)
+        metrics.observe('det_dataset_bytes', int(df.memory_usage(deep=True).sum()))
+        return frames
+
+    except Exception as e:
+        print(f"Error fetching receivers {receivers} from {s3_key}: {e}")
+        return None
+
+
+def get_receivers(bucket_name, benchmark_pb, file_name, file_type_name, receivers):
+    """
+    {receiver: DataFrame} for several receivers of a dataset: from its consolidated file when
+    there is one, else one object per receiver.
+    """
+    frames = get_s3_receivers(bucket_name, compact_key(benchmark_pb, file_name, file_type_name), tuple(receivers))
+    if frames is None:
+        frames = {}
+        for receiver in receivers:
+            df = get_s3_dataset(bucket_name, f"public_ds/{benchmark_pb}/{file_name}/{receiver}.parquet")
+            if df is not None:
+                frames[receiver] = df
+    return frames
+
+
+# Time shown on each side of an event when jumping to it: its duration, at least this many seconds
+EVENT_MIN_PADDING_SECONDS = 10.0
+
+
+@memoize(timeout=3600)  # Cache for 1h
+def get_event_catalog(benchmark_id, file_name, receiver):
+    """
+    Event catalog written at ingest for one receiver of a dataset, or None if there is none.
+
+    The ingest names catalogs after the published receiver (the member's basename), so a
+    wildcard template receiver is resolved first.
+    """
+    benchmark_pb = parse_benchmark_id(benchmark_id)
+    matches = resolve_receivers('benchmark-vv-data', benchmark_pb, file_name, receiver)
+    if not matches:
+        print(f"No published receiver of {file_name} matches {receiver}")
+        return None
+    s3_key = f"public_ds/{benchmark_pb}/{file_name}/events/{matches[0]}.json"
+    try:
+        return json.loads(read_s3_object('benchmark-vv-data', s3_key))
+    except Exception as e:
+        print(f"No event catalog at {s3_key}: {e}")
+        return None
+
+
+def event_window(event):
+    """Time window showing an event with some of the interseismic period around it."""
+    padding = max(event['duration'], EVENT_MIN_PADDING_SECONDS)
+    return event['onset'] - padding, event['end'] + padding
+
+
+def time_window_from_relayout(relayout_data):
+    """
+    Return the (start, end) x range of a zoom event on the time-series subplots, or None.
+
+    The subplots share their x axis, so the range may be reported for any of them.
+    """
+    bounds = {}
+    for key, value in (relayout_data or {}).items():
+        match = re.fullmatch(r'xaxis\d*\.range(?:\[(\d)\])?', key)
+        if match is None:
+            continue
+        if match.group(1) is None:
+            bounds = {'0': value[0], '1': value[1]}
+        else:
+            bounds[match.group(1)] = value
+        if len(bounds) == 2:
+            break
+    if len(bounds) != 2:
+        return None
+    try:
+        start, end = float(bounds['0']), float(bounds['1'])
+    except (TypeError, ValueError):
+        return None
+    return min(start, end), max(start, end)
+
+
+@memoize(timeout=3600, replay=True)  # Cache for 1h
+def get_surface_grid(benchmark_id, file_name, receiver, variable):
+    """
+    Pivot a gridded surface dataset into arrays for on-demand value lookups.
+
+    Parameters:
+    benchmark_id (str): The benchmark ID (or URL search string).
+    file_name (str): The dataset (code) name.
+    receiver (str): The receiver (file) name.
+    variable (str): The variable to pivot.
+
+    Returns:
+    tuple: (x, y, z) with sorted x and y coordinates and z of shape (len(y), len(x)), or None.
+    """
+    s3_key = f"public_ds/{parse_benchmark_id(benchmark_id)}/{file_name}/{receiver}.parquet"
+    df = get_s3_dataset('benchmark-vv-data', s3_key)
+    if df is None:
+        return None
+    with metrics.span('pivot'):
+        grid = df.pivot(index="y", columns="x", values=variable)
+    return grid.columns.to_numpy(), grid.index.to_numpy(), grid.to_numpy()
+
+
 def convert_seconds_to_time(seconds):
     """
     Convert a time duration from seconds to years, days, hours, and seconds.
@@ -79,6 +593,7 @@ def convert_seconds_to_time(seconds):
     return years, days, hours, seconds
 
 
+@memoize(timeout=30)  # Short: submissions show up while they are being processed
 def fetch_group_names_for_benchmark(benchmark_id):
     try:
         bucket_name = "benchmark-vv-data"
@@ -86,11 +601,12 @@ def fetch_group_names_for_benchmark(benchmark_id):
 
         print(f"getting data for benchmark {benchmark_id}")
 
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name,
-            Prefix=prefix,
-            Delimiter="/"  # <- this groups by folder
-        )
+        with metrics.span('s3_list'):
+            response = get_s3_client().list_objects_v2(
+                Bucket=bucket_name,
+                Prefix=prefix,
+                Delimiter="/"  # <- this groups by folder
+            )
 
         group_names = []
         if "CommonPrefixes" in response:
@@ -107,6 +623,68 @@ def fetch_group_names_for_benchmark(benchmark_id):
     return result
 
 
+@memoize(timeout=30)  # Short: receivers are published one by one while a submission is processed
+def get_available_receivers(bucket_name, benchmark_pb, dataset_name):
+    """Receivers already published for a dataset, from a listing of its folder; None if it cannot be listed."""
+    try:
+        receivers = []
+        paginator = get_s3_client().get_paginator('list_objects_v2')
+        with metrics.span('s3_list'):
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=f"public_ds/{benchmark_pb}/{dataset_name}/",
+                                           Delimiter="/"):
+                for item in page.get("Contents", []):
+                    name = item["Key"].rsplit("/", 1)[-1]
+                    if name.endswith(".parquet"):
+                        receivers.append(name[:-len(".parquet")])
+        return sorted(receivers)
+    except Exception as e:
+        print(f"Error listing receivers of {dataset_name}: {e}")
+        return None
+
+
+@memoize(timeout=30)  # Short: a republished dataset must not be served stale figures for long
+def get_dataset_version(benchmark_pb, dataset_name):
+    """Version of a dataset: the ETag of its manifest, rewritten whenever a file is published; None if absent."""
+    for name in ("manifest.json", "metadata.json"):
+        try:
+            return head_etag('benchmark-vv-data', f"public_ds/{benchmark_pb}/{dataset_name}/{name}")
+        except Exception:
+            continue
+    return None
+
+
+def is_receiver_pattern(receiver):
+    """Whether a template receiver is a wildcard pattern rather than a file name."""
+    return any(char in str(receiver) for char in '*?[')
+
+
+def resolve_receivers(bucket_name, benchmark_pb, dataset_name, receiver):
+    """Published receiver names matching a template receiver, which can be a wildcard pattern."""
+    if not is_receiver_pattern(receiver):
+        return [str(receiver)]
+    return fnmatch.filter(get_available_receivers(bucket_name, benchmark_pb, dataset_name) or [], str(receiver))
+
+
+def resolve_receiver_keys(bucket_name, s3_key):
+    """Concrete keys of a receiver object key public_ds/<benchmark>/<dataset>/<receiver>.parquet."""
+    folder, name = s3_key.rsplit('/', 1)
+    if not is_receiver_pattern(name):
+        return [s3_key]
+    _, benchmark_pb, dataset_name = folder.split('/')
+    receiver = name[:-len('.parquet')] if name.endswith('.parquet') else name
+    return [f"{folder}/{match}.parquet" for match in resolve_receivers(bucket_name, benchmark_pb, dataset_name, receiver)]
+
+
+def is_receiver_available(bucket_name, benchmark_pb, dataset_name, receiver):
+    """
+    Whether a receiver is published for a dataset (assumed so if the listing fails).
+
+    Template receivers can be wildcard patterns (e.g. "*fltst_dp000"), matched as S3 keys are.
+    """
+    receivers = get_available_receivers(bucket_name, benchmark_pb, dataset_name)
+    return receivers is None or bool(fnmatch.filter(receivers, str(receiver)))
+
+
 def get_plots_from_json(json_data, file_name):
     """
     Generate a list of variables to plot against time from the provided JSON.
@@ -159,8 +737,14 @@ def get_upload_df(data, filename, var_list):
         return None
 
 
-async def fetch_data_concurrently(bucket_name, benchmark_id, list_df, receiver):
-    """Fetch data concurrently from S3."""
+async def fetch_data_concurrently(bucket_name, benchmark_id, list_df, receiver, t_window=None, file_type_name=None):
+    """
+    Fetch data concurrently from S3, only the rows with `t` in `t_window` if given.
+
+    With a list of receivers (and the template `file_type_name`), every receiver x dataset
+    pair is fetched in one batch, a single read per dataset when it has a consolidated file;
+    the rows then have the dataset in `dataset_name` and the receiver in `receiver`.
+    """
     all_data = []
 
     # Use a ThreadPoolExecutor to handle blocking I/O with pandas
@@ -168,14 +752,34 @@ async def fetch_data_concurrently(bucket_name, benchmark_id, list_df, receiver):
         loop = asyncio.get_event_loop()
         tasks = []
 
+        if isinstance(receiver, (list, tuple)):
+            for file_name in list_df:
+                receivers = [r for r in receiver if is_receiver_available(bucket_name, benchmark_id, file_name, r)]
+                if len(receivers) < len(receiver):
+                    metrics.inc('det_missing_receivers_total', len(receiver) - len(receivers))
+                tasks.append(loop.run_in_executor(executor, get_receivers, bucket_name, benchmark_id, file_name,
+                                                  file_type_name, receivers))
+            results = await asyncio.gather(*tasks)
+            for file_name, frames in zip(list_df, results):
+                for name, tmp_df in frames.items():
+                    all_data.append(tmp_df.assign(dataset_name=file_name, receiver=name))
+            return pd.concat(all_data, ignore_index=True) if all_data else None
+
+        # Receivers not published yet (submission still processing) are skipped, not fetched
+        available = [file_name for file_name in list_df
+                     if is_receiver_available(bucket_name, benchmark_id, file_name, receiver)]
+        if len(available) < len(list_df):
+            metrics.inc('det_missing_receivers_total', len(list_df) - len(available))
+        list_df = available
+
         # Prepare S3 fetch tasks for all dataset-depth combinations
         for file_name in list_df:
             s3_key = f"public_ds/{benchmark_id}/{file_name}/{receiver}.parquet"
-            tasks.append(
-                loop.run_in_executor(
-                    executor, get_s3_dataset, 'benchmark-vv-data', s3_key
-                )
-            )
+            if t_window is None:
+                task = loop.run_in_executor(executor, get_s3_dataset, bucket_name, s3_key)
+            else:
+                task = loop.run_in_executor(executor, get_s3_dataset_window, bucket_name, s3_key, *t_window)
+            tasks.append(task)
 
         # Collect results as they complete
         results = await asyncio.gather(*tasks)
@@ -190,11 +794,16 @@ async def fetch_data_concurrently(bucket_name, benchmark_id, list_df, receiver):
 
 
 
-def get_df(benchmark_id, list_df, receiver):
-    """Get a concatenated DataFrame from a list of datasets and depths."""
+def get_df(benchmark_id, list_df, receiver, t_window=None, file_type_name=None):
+    """
+    Get a concatenated DataFrame from a list of datasets and depths, optionally limited to a time window.
+
+    `receiver` can be a list of receivers, fetched in one batch (see fetch_data_concurrently).
+    """
     if list_df and receiver:
         return asyncio.run(
-            fetch_data_concurrently('benchmark-vv-data', parse_benchmark_id(benchmark_id), list_df, receiver))
+            fetch_data_concurrently('benchmark-vv-data', parse_benchmark_id(benchmark_id), list_df, receiver,
+                                    t_window, file_type_name))
     else:
         return None
 
@@ -210,7 +819,8 @@ def generate_color_mapping(datasets):
     dict: A dictionary mapping dataset names to colors.
     """
     color_mapping = {}
-    colors = px.colors.qualitative.D3
+    from plotly.colors import qualitative
+    colors = qualitative.D3
     for i, dataset in enumerate(datasets):
         color_mapping[dataset] = colors[i % len(colors)]
     return color_mapping
@@ -230,8 +840,7 @@ def get_metadata(benchmark_id, dataset_name):
     try:
         bucket_name = 'benchmark-vv-data'
         s3_key = f"public_ds/{parse_benchmark_id(benchmark_id)}/{dataset_name}/metadata.json"
-        response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
-        metadata = response['Body'].read().decode('utf-8')
+        metadata = read_s3_object(bucket_name, s3_key).decode('utf-8')
         return render_json(json.loads(metadata))
     except Exception as e:
         print(f"Error fetching metadata: {e}")
@@ -259,6 +868,7 @@ def render_json(data):
         return html.Span(str(data))
 
 
+@memoize(timeout=3600)  # Cache for 1h
 def get_benchmark_params(search):
     """
     Get benchmark parameters from metadata.
@@ -270,8 +880,7 @@ def get_benchmark_params(search):
         bucket_name = 'benchmark-vv-data'
         template_key = f"benchmark_templates/{benchmark_id}.json"
         # Fetch the JSON file from S3
-        response = s3_client.get_object(Bucket=bucket_name, Key=template_key)
-        template_content = response['Body'].read().decode('utf-8')
+        template_content = read_s3_object(bucket_name, template_key).decode('utf-8')
         template = json.loads(template_content)
         return template
     except Exception as e:
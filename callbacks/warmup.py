@@ -0,0 +1,231 @@
+import contextlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from callbacks import metrics, utils
+
+try:
+    import fcntl
+except ImportError:  # Windows: the access log is not locked
+    fcntl = None
+
+# Benchmarks whose templates are always prefetched
+WARMUP_BENCHMARKS = [b for b in os.environ.get('WARMUP_BENCHMARKS', 'bp1-qd,ttpv1,ttpv2').split(',') if b]
+# Seconds between two warm-up rounds
+WARMUP_INTERVAL = int(os.environ.get('WARMUP_INTERVAL', 1800))
+# Memory budget for the prefetched datasets, in MB
+WARMUP_MEMORY_MB = int(os.environ.get('WARMUP_MEMORY_MB', 2048))
+# Number of most requested calls replayed at each round, capped well below the entries the
+# Flask cache and the process running the round hold, so a round does not evict what users
+# are reading
+WARMUP_TOP_N = min(int(os.environ.get('WARMUP_TOP_N', 20)),
+                   min(utils.CACHE_THRESHOLD, utils.LOCAL_CACHE_ENTRIES) // 2)
+# Seconds between two flushes of the per-process access counts to the shared log
+ACCESS_LOG_FLUSH_INTERVAL = 60
+
+# Access counts shared by the workers, in their own file rather than in the Flask cache: the
+# cache would count the log against its threshold and could prune it
+ACCESS_LOG_PATH = os.path.join(os.environ.get('DET_CACHE_DIR', '/tmp/det_cache'), 'warmup', 'access_log.pickle')
+# Calls kept in the log, the most requested first; counts are halved at every round so calls
+# no longer requested make room for new ones
+ACCESS_LOG_MAX_ENTRIES = 200
+
+# Time of the last round, in a file locked by the process running a round
+ROUND_LOCK_NAME = 'round.lock'
+
+_status = {'state': 'idle', 'last_run': None, 'prefetched': 0, 'bytes': 0}
+
+
+def status():
+    """Return the state of the last warm-up round (exposed by the health check)."""
+    return dict(_status)
+
+
+def result_size(result):
+    """Approximate in-memory size of a memoized result in bytes."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(result_size(item) for item in result)
+    return 0
+
+
+@contextlib.contextmanager
+def access_log(write=False):
+    """
+    Open the shared access log, {(func_name, args, kwargs): {'count': n, 'bytes': size}}.
+
+    The file is locked for the whole block, so the read-modify-write of concurrent workers
+    does not lose counts. With write=True the log, trimmed to ACCESS_LOG_MAX_ENTRIES, is
+    saved at the end of the block.
+    """
+    os.makedirs(os.path.dirname(ACCESS_LOG_PATH), exist_ok=True)
+    with open(ACCESS_LOG_PATH, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+        f.seek(0)
+        data = f.read()
+        try:
+            log = pickle.loads(data) if data else {}
+        except Exception as e:
+            print(f"Warm-up: resetting the unreadable access log: {e}")
+            log = {}
+        yield log
+        if write:
+            kept = sorted(log.items(), key=lambda item: item[1]['count'], reverse=True)[:ACCESS_LOG_MAX_ENTRIES]
+            f.truncate(0)
+            f.write(pickle.dumps(dict(kept)))
+
+
+def flush_access_log():
+    """
+    Merge this process's access counts into the log shared by all workers.
+
+    Runs at the end of every traced callback as well (see metrics.on_trace_end): background
+    callbacks fetch their datasets in job processes that the warm-up loop never flushes.
+    """
+    counts = utils.pop_access_counts()
+    if not counts:
+        return
+    with access_log(write=True) as log:
+        for call, count in counts.items():
+            entry = log.setdefault(call, {'count': 0, 'bytes': None})
+            entry['count'] += count
+
+
+metrics.on_trace_end(flush_access_log)
+
+
+def most_requested(n):
+    """Return the n most requested memoized calls as ((func_name, args, kwargs), entry) pairs."""
+    with access_log() as log:
+        return sorted(log.items(), key=lambda item: item[1]['count'], reverse=True)[:n]
+
+
+def warm_up_once(benchmarks=None, memory_budget_mb=WARMUP_MEMORY_MB, top_n=WARMUP_TOP_N):
+    """
+    Prefetch templates and the most requested datasets and surface grids into the cache.
+
+    The budget is checked before each fetch, against the size the result had at the
+    previous round: a call known to exceed what is left is skipped, and the round stops
+    once the budget is used.
+
+    Parameters:
+    benchmarks (list): Benchmark IDs whose template is prefetched.
+    memory_budget_mb (int): Stop prefetching popular calls once their results reach this size.
+    top_n (int): Number of most requested calls considered.
+
+    Returns:
+    dict: Number of calls replayed and the total size of their results.
+    """
+    benchmarks = WARMUP_BENCHMARKS if benchmarks is None else benchmarks
+    budget = memory_budget_mb * 1024 * 1024
+    prefetched, used, sizes = 0, 0, {}
+    # Replayed calls must not count as user accesses
+    utils.pause_access_log()
+    try:
+        for benchmark in benchmarks:
+            try:
+                utils.get_benchmark_params(f"?benchmark_id={benchmark}")
+                prefetched += 1
+            except ValueError as e:
+                print(f"Warm-up: skipping template for {benchmark}: {e}")
+
+        for call, entry in most_requested(top_n):
+            func_name, args, kwargs = call
+            func = utils.memoized_functions.get(func_name)
+            if func is None:
+                continue
+            if used >= budget:
+                print(f"Warm-up: memory budget of {memory_budget_mb} MB reached")
+                break
+            if entry['bytes'] is not None and used + entry['bytes'] > budget:
+                continue
+            sizes[call] = result_size(func(*args, **dict(kwargs)))
+            used += sizes[call]
+            prefetched += 1
+    finally:
+        utils.pause_access_log(False)
+
+    with access_log(write=True) as log:
+        for call, entry in log.items():
+            entry['count'] /= 2
+            entry['bytes'] = sizes.get(call, entry['bytes'])
+    return {'prefetched': prefetched, 'bytes': used}
+
+
+@contextlib.contextmanager
+def round_lock(interval):
+    """
+    Yield True in the one process that runs the current round.
+
+    The round file is locked while a round runs and holds the time the last one started:
+    other processes skip the round while it is locked or if it started less than half an
+    interval ago.
+    """
+    if fcntl is None:
+        yield True
+        return
+    path = os.path.join(os.path.dirname(ACCESS_LOG_PATH), ROUND_LOCK_NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        f.seek(0)
+        try:
+            last_round = float(f.read() or 0)
+        except ValueError:
+            last_round = 0
+        if time.time() - last_round < interval / 2:
+            yield False
+            return
+        f.truncate(0)
+        f.write(str(time.time()))
+        f.flush()
+        yield True
+
+
+def run_round(interval):
+    """Run a warm-up round unless another process ran one recently; returns whether it ran."""
+    # Only one process per task runs a round; the cache on disk is shared by all of them
+    with round_lock(interval) as claimed:
+        if not claimed:
+            return False
+        _status['state'] = 'running'
+        start = time.time()
+        _status.update(warm_up_once())
+        _status['last_run'] = start
+        _status['state'] = 'idle'
+        print(f"Warm-up round done in {time.time() - start:.1f}s: {_status}")
+        return True
+
+
+def _warmup_loop(interval):
+    next_round = 0
+    while True:
+        try:
+            flush_access_log()
+            if time.time() >= next_round:
+                next_round = time.time() + interval
+                run_round(interval)
+        except Exception as e:
+            _status['state'] = 'failed'
+            print(f"Warm-up round failed: {e}")
+        time.sleep(min(interval, ACCESS_LOG_FLUSH_INTERVAL))
+
+
+def start_warmup_thread(interval=WARMUP_INTERVAL):
+    """Start warming the cache in a daemon thread, so startup and health checks are never blocked."""
+    thread = threading.Thread(target=_warmup_loop, args=(interval,), name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -1,11 +1,13 @@
 from aws_cdk import (
     Stack,
     Duration,
+    Size,
     aws_ec2 as ec2,
     aws_ecr as ecr,
     aws_iam as iam,
     aws_ecs as ecs,
     aws_ecs_patterns as ecs_patterns,
+    aws_elasticloadbalancingv2 as elbv2,
     aws_s3 as s3,
     aws_lambda as _lambda,
     aws_dynamodb as dynamodb,
@@ -152,6 +154,16 @@ class DashboardStack(Stack):
             public_load_balancer=True,
             **fargate_kwargs,
         )
+        # Cheap readiness endpoint, answered while the cache warm-up runs in the background
+        fargate_service.target_group.configure_health_check(path="/healthz")
+        # Metrics are scraped from inside the VPC, straight from the tasks: the public
+        # listener never forwards them
+        fargate_service.listener.add_action(
+            "HideMetrics",
+            priority=1,
+            conditions=[elbv2.ListenerCondition.path_patterns(["/metrics"])],
+            action=elbv2.ListenerAction.fixed_response(404, content_type="text/plain", message_body="Not Found"),
+        )
 
         CfnOutput(
             self,
@@ -182,11 +194,29 @@ class DashboardStack(Stack):
         )
         s3_bucket.grant_read(lambda_role, "upload/*")
         s3_bucket.grant_read(lambda_role, "benchmark_templates/*")
+        # Read access to public_ds lets resubmissions compare against the previous manifest
+        s3_bucket.grant_read(lambda_role, "public_ds/*")
+        lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["s3:ListBucket"],
+                resources=[s3_bucket.bucket_arn],
+                conditions={"StringLike": {"s3:prefix": "public_ds/*"}},
+            )
+        )
         s3_bucket.grant_put(lambda_role, "public_ds/*")
+        # Plan and map results of the Step Functions backend, read and deleted by the reduce step
+        s3_bucket.grant_read_write(lambda_role, "jobs/*")
+        s3_bucket.grant_delete(lambda_role, "jobs/*")
 
-        # DynamoDB (existing table)
-        table = dynamodb.Table.from_table_name(
-            self, "DETFileProcessingStatusTable", table_name="DETFileProcessingStatus"
+        # DynamoDB (existing table). The status API lists recent uploads from a global secondary
+        # index (partition key userId, sort key timestamp, all attributes projected)
+        recent_index_name = "userId-timestamp-index"
+        table = dynamodb.Table.from_table_attributes(
+            self,
+            "DETFileProcessingStatusTable",
+            table_name="DETFileProcessingStatus",
+            global_indexes=[recent_index_name],
         )
         table.grant_read_write_data(lambda_role)
 
@@ -207,6 +237,8 @@ class DashboardStack(Stack):
             ),
             timeout=Duration.minutes(8),
             memory_size=8192,
+            # Room for a consolidated parquet file per file type (reduce step)
+            ephemeral_storage_size=Size.gibibytes(2),
             environment={"TABLE_NAME": table.table_name},
             role=lambda_role,
             **lambda_kwargs,  # <– only sets a name on the test stack
@@ -260,13 +292,54 @@ def handler(event, context):
         store_event_step = sfn.Pass(
             self, "StoreOriginalEvent", parameters={"originalEvent": sfn.JsonPath.entire_payload}
         )
-        process_task = tasks.LambdaInvoke(
+        # Plan / map / reduce: the plan step checks the zip and lists its members, the Map
+        # state converts them in parallel invocations, the reduce step publishes the manifest
+        plan_task = tasks.LambdaInvoke(
+            self,
+            "PlanFiles",
+            lambda_function=process_uploads,
+            payload=sfn.TaskInput.from_object(
+                {"step": "plan", "s3Event": sfn.JsonPath.string_at("$.originalEvent")}
+            ),
+            payload_response_only=True,
+            result_path="$.plan",
+        )
+        map_task = tasks.LambdaInvoke(
             self,
             "ProcessFile",
             lambda_function=process_uploads,
+            payload_response_only=True,
+        )
+        # Distributed Map: the tasks are read from the plan object in S3, and each item only
+        # carries its task and the job id, the job itself is loaded by the iteration
+        map_files = sfn.DistributedMap(
+            self,
+            "ProcessFiles",
+            item_reader=sfn.S3JsonItemReader(
+                bucket=s3_bucket, key=sfn.JsonPath.string_at("$.plan.tasks_key")
+            ),
+            max_concurrency=20,
+            item_selector={
+                "step": "map",
+                "job_id.$": "$.plan.job_id",
+                "task.$": "$$.Map.Item.Value",
+            },
+            # Map results are written to S3 by each iteration, the state output stays small
+            result_path=sfn.JsonPath.DISCARD,
+        )
+        map_files.item_processor(map_task)
+        reduce_task = tasks.LambdaInvoke(
+            self,
+            "PublishManifest",
+            lambda_function=process_uploads,
             payload=sfn.TaskInput.from_object(
-                {"s3Event": sfn.JsonPath.string_at("$.originalEvent")}
+                {
+                    "step": "reduce",
+                    "job_id": sfn.JsonPath.string_at("$.plan.job_id"),
+                    "stages": sfn.JsonPath.object_at("$.plan.stages"),
+                }
             ),
+            payload_response_only=True,
             result_path="$.lambdaResult",
         )
         handle_failure_task = tasks.LambdaInvoke(
@@ -280,16 +353,21 @@ def handler(event, context):
                 }
             ),
         )
-        definition = store_event_step.next(
-            process_task.add_catch(
-                handle_failure_task, errors=["States.ALL"], result_path="$.errorInfo"
-            )
+        for task in (plan_task, map_files, reduce_task):
+            task.add_catch(handle_failure_task, errors=["States.ALL"], result_path="$.errorInfo")
+        definition = store_event_step.next(plan_task).next(
+            sfn.Choice(self, "PlanSucceeded")
+            # A rejected submission already has its failed status, written by the plan step
+            .when(sfn.Condition.boolean_equals("$.plan.failed", True), sfn.Succeed(self, "SubmissionRejected"))
+            .otherwise(map_files.next(reduce_task))
         )
         state_machine = sfn.StateMachine(
-            self, "FileProcessingStateMachine", definition=definition, timeout=Duration.minutes(10)
+            self, "FileProcessingStateMachine", definition=definition, timeout=Duration.minutes(60)
         )
         process_uploads.grant_invoke(state_machine)
         notify_fail.grant_invoke(state_machine)
+        # The Map state's item reader reads the tasks of the plan
+        s3_bucket.grant_read(state_machine, "jobs/*")
 
         # EventBridge rule for S3 upload
         rule = events.Rule(
@@ -313,7 +391,7 @@ def handler(event, context):
             runtime=_lambda.Runtime.PYTHON_3_9,
             handler="handler.lambda_handler",
             code=_lambda.Code.from_asset("./lambda_status_check"),
-            environment={"TABLE_NAME": table.table_name},
+            environment={"TABLE_NAME": table.table_name, "RECENT_INDEX_NAME": recent_index_name},
             timeout=Duration.seconds(10),
             memory_size=256,
             role=lambda_role,
@@ -326,7 +404,7 @@ def handler(event, context):
             default_cors_preflight_options={
                 "allow_origins": ["https://det-uploader.cascadiaquakes.org"],
                 "allow_methods": ["GET", "OPTIONS"],
-                "allow_headers": ["Content-Type", "Authorization"],
+                "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
             },
         )
         status_resource = api.root.add_resource("status")
@@ -0,0 +1,49 @@
+"""
+Gunicorn settings for the production dashboard.
+
+Usage: gunicorn -c gunicorn.conf.py app_prod:server
+
+All values can be overridden through environment variables so the Fargate task
+definition can size the server without rebuilding the image.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+
+# One process per vCPU sidesteps the GIL for figure building; threads cover S3 waits
+workers = int(os.environ.get('WEB_WORKERS', 2))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# Import the app (dash, pandas, pyarrow, plotly...) once in the master, before forking
+preload_app = True
+
+# Recycle workers gracefully to bound memory growth from cached DataFrames
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Longer than the ALB idle timeout (60 s) so the load balancer always closes idle connections first
+keepalive = 75
+
+accesslog = '-'
+
+
+def on_starting(server):
+    """Warm the preloaded app in the master so forked workers inherit a ready server."""
+    import app_prod
+    app_prod.warm_up()
+
+
+def post_fork(server, worker):
+    """Give each worker its own AWS clients (boto3 clients are not fork safe) and start the cache warm-up."""
+    from callbacks import utils, warmup
+    utils.reset_clients()
+    warmup.start_warmup_thread()
+
+
+def worker_exit(server, worker):
+    """Keep the access counts of recycled workers."""
+    from callbacks import warmup
+    warmup.flush_access_log()
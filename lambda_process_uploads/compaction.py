@@ -0,0 +1,65 @@
+import json
+import re
+
+# Footer key of the receiver index of a consolidated file: {receiver: [row group indices]}
+RECEIVER_INDEX_KEY = b"det_receivers"
+RECEIVER_COLUMN = "receiver"
+
+
+def compact_name(file_type_name):
+    """Object name of the consolidated parquet file of a template file type, e.g. "body_elastic_seafloor.parquet"."""
+    return re.sub(r"[^a-z0-9]+", "_", file_type_name.lower()).strip("_") + ".parquet"
+
+
+def unify_schemas(schemas):
+    """
+    Schema every source is cast to: a column read as different numeric types in different
+    files (e.g. int64 where a receiver only has whole values, double elsewhere) is float64.
+    """
+    import pyarrow as pa
+
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+    for i, field in enumerate(schema):
+        types = {s.field(field.name).type for s in schemas if field.name in s.names}
+        if len(types) > 1 and all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+            schema = schema.set(i, field.with_type(pa.float64()))
+    return schema
+
+
+def compact(sources, output_path, filesystem=None):
+    """
+    Consolidate the parquet files of several receivers into one, with a receiver column.
+
+    `sources` is a list of (receiver, path) pairs. Each source row group is copied as a row
+    group of the output, so a receiver's rows are contiguous and memory holds one row group
+    at a time; time series of up to 20k rows are a single row group. Sources are cast to
+    their unified schema (see unify_schemas). The footer maps each
+    receiver to its row groups, so any subset of receivers is read without a scan.
+
+    Returns the receiver index.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    files = [(receiver, pq.ParquetFile(path, filesystem=filesystem)) for receiver, path in sources]
+    index, n_groups = {}, 0
+    for receiver, parquet_file in files:
+        index[receiver] = list(range(n_groups, n_groups + parquet_file.num_row_groups))
+        n_groups += parquet_file.num_row_groups
+
+    # pandas metadata of the sources does not list the receiver column, the index replaces it
+    source_schema = unify_schemas([parquet_file.schema_arrow for _, parquet_file in files])
+    metadata = {k: v for k, v in (source_schema.metadata or {}).items() if k != b"pandas"}
+    metadata[RECEIVER_INDEX_KEY] = json.dumps(index).encode("utf-8")
+    schema = source_schema.append(pa.field(RECEIVER_COLUMN, pa.string())).with_metadata(metadata)
+
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for receiver, parquet_file in files:
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i)
+                table = table.append_column(RECEIVER_COLUMN,
+                                            pa.array(np.full(table.num_rows, receiver, dtype=object), pa.string()))
+                # Empty row groups are written too, the index counts them
+                writer.write_table(table.cast(schema), row_group_size=max(table.num_rows, 1))
+    return index
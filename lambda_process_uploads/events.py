@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def detect_events(t, values, threshold, min_duration=0.0):
+    """
+    Find the intervals where `values` is at or above `threshold`, in one vectorized pass.
+
+    `t` must be sorted. Each event is a dict with its onset and end times, duration, and
+    the time and value of its peak. Events shorter than `min_duration` are dropped. NaN
+    samples are below any threshold: they end an event, and never become a peak.
+    """
+    t = np.asarray(t, dtype=float)
+    values = np.asarray(values, dtype=float)
+    above = values >= threshold
+    if not above.any():
+        return []
+
+    # +1 where an event starts, -1 just after it ends
+    edges = np.diff(above.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+
+    # Peak of each event: the segments from one start to the next also hold the samples
+    # below the threshold (NaN included), masked so they can neither be the maximum nor
+    # turn it into NaN
+    peaks = np.maximum.reduceat(np.where(above, values, -np.inf), starts)
+    event_ids = np.cumsum(edges[:-1] == 1) - 1
+    at_peak = np.flatnonzero(above & (values == peaks[np.maximum(event_ids, 0)]))
+    # First sample reaching the peak, per event
+    _, first = np.unique(event_ids[at_peak], return_index=True)
+    peak_index = at_peak[first]
+
+    onset, end = t[starts], t[ends]
+    keep = (end - onset) >= min_duration
+    return [
+        {
+            "onset": float(onset[i]),
+            "end": float(end[i]),
+            "duration": float(end[i] - onset[i]),
+            "peak_time": float(t[peak_index[i]]),
+            "peak": float(peaks[i]),
+        }
+        for i in np.flatnonzero(keep)
+    ]
+
+
+def event_catalog(df, spec):
+    """Event catalog of a time series for the `events` block of a template file spec."""
+    variable = spec.get("variable", "slip_rate")
+    threshold = spec["threshold"]
+    events = detect_events(df["t"].to_numpy(), df[variable].to_numpy(), threshold, spec.get("min_duration", 0.0))
+    return {"variable": variable, "threshold": threshold, "events": events}
@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+from concurrent import futures
+
+# Backend used by process_zip when none is given: "serial" or "process"
+DEFAULT_EXECUTOR = os.environ.get("EXECUTOR", "serial")
+
+
+class SerialExecutor:
+    """Run the map tasks one after the other in this process (the single-Lambda path)."""
+
+    def map(self, fn, job, tasks, on_result=None):
+        results = []
+        for task in tasks:
+            result = fn(job, task)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+        return results
+
+
+class ProcessPoolExecutor:
+    """
+    Run the map tasks in a local pool of processes, for tests and local runs.
+
+    Processes are spawned, not forked, so each worker creates its own AWS clients. Not
+    for use inside Lambda, which has no /dev/shm for multiprocessing.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def map(self, fn, job, tasks, on_result=None):
+        results = []
+        context = multiprocessing.get_context("spawn")
+        with futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            pending = [pool.submit(fn, job, task) for task in tasks]
+            for future in futures.as_completed(pending):
+                result = future.result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+        return results
+
+
+EXECUTORS = {
+    "serial": SerialExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+def get_executor(name=None):
+    """
+    Executor backend by name.
+
+    The Step Functions backend is not an executor object: the state machine runs the plan,
+    map and reduce steps as separate Lambda invocations (see lambda_function.handler).
+    """
+    name = name or DEFAULT_EXECUTOR
+    if name not in EXECUTORS:
+        raise ValueError(f"Unknown executor {name!r}, expected one of {sorted(EXECUTORS)}")
+    return EXECUTORS[name]()
@@ -1,5 +1,9 @@
 import os
 import json
+import hashlib
+import random
+import time
+import uuid
 import warnings
 import zipfile
 from datetime import datetime
@@ -7,16 +11,83 @@ from datetime import datetime
 import boto3
 import pandas as pd
 from io import StringIO, BytesIO
-
-from sklearn.neighbors import KDTree
-import numpy as np
 from botocore.exceptions import NoCredentialsError, ClientError
 
-# Initialize AWS clients
-s3 = boto3.client("s3")
-dynamodb = boto3.resource("dynamodb")
-table_name = os.environ["TABLE_NAME"]
-table = dynamodb.Table(table_name)
+import compaction
+import executors
+import preflight
+import regrid
+import s3_range
+from events import event_catalog
+from profiling import StageProfiler
+
+# AWS clients, created on first use and reused across warm invocations
+_s3 = None
+_table = None
+_arrow_s3 = None
+
+
+def get_s3():
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client("s3")
+    return _s3
+
+
+def get_arrow_s3():
+    """pyarrow S3 filesystem, to read published parquet files by row group."""
+    global _arrow_s3
+    if _arrow_s3 is None:
+        from pyarrow import fs
+        # Same endpoint as boto3, e.g. the local S3 stand-in of the benchmarks
+        _arrow_s3 = fs.S3FileSystem(region=os.environ.get("AWS_REGION", "us-west-2"),
+                                    endpoint_override=os.environ.get("AWS_ENDPOINT_URL"))
+    return _arrow_s3
+
+
+def get_table():
+    global _table
+    if _table is None:
+        _table = boto3.resource("dynamodb").Table(os.environ["TABLE_NAME"])
+    return _table
+
+
+# Part of every member digest: bump it when the conversion itself changes so resubmissions
+# are fully reprocessed
+PIPELINE_VERSION = "2"
+# Template fields that change the output of a member
+OUTPUT_SPEC_FIELDS = ("var_list", "grid", "graph_type", "events")
+# Rows per parquet row group for time series: the dashboard reads only the row groups of a
+# zoomed time window, using their min/max statistics
+TIME_SERIES_ROW_GROUP_ROWS = 20_000
+# Conditional writes of the partial manifest and metadata, before giving up on conflicts, and the
+# backoff between them: full jitter, doubling from PUBLISH_BACKOFF_SECONDS up to PUBLISH_BACKOFF_MAX_SECONDS
+PUBLISH_ATTEMPTS = 10
+PUBLISH_BACKOFF_SECONDS = 0.1
+PUBLISH_BACKOFF_MAX_SECONDS = 5.0
+
+
+def member_digest(content, file_spec):
+    """Content address of a zip member: its bytes plus everything in the template that shapes its output."""
+    digest = hashlib.sha256()
+    digest.update(PIPELINE_VERSION.encode("utf-8"))
+    digest.update(json.dumps({k: file_spec.get(k) for k in OUTPUT_SPEC_FIELDS}, sort_keys=True).encode("utf-8"))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def load_manifest(s3, manifest_key):
+    """Load the member digests of the previous upload of a submission, if any."""
+    try:
+        response = s3.get_object(Bucket="benchmark-vv-data", Key=manifest_key)
+        return json.loads(response['Body'].read().decode('utf-8'))
+    except ClientError as e:
+        # Without s3:ListBucket a missing key is reported as AccessDenied
+        if e.response['Error']['Code'] in ("NoSuchKey", "404", "AccessDenied", "403"):
+            print(f"No previous manifest at {manifest_key}, processing every file")
+            return {"files": {}}
+        raise
+
 
 def convert_seconds_to_time(seconds):
     years = seconds / (365.25 * 24 * 3600)
@@ -48,8 +119,15 @@ def extract_header(file_header, prefix, content):
     return file_header
 
 
-def interpolate_data(df, grid_params, k=3, power=1.0, average_duplicates=True):
-    """Regrid all numeric variables in df using k-NN inverse distance weighting (IDW).
+def unique_points(df, grid_params, average_duplicates=True):
+    """Numeric columns of df with duplicated (x, y) points averaged (see regrid.average_duplicates)."""
+    if average_duplicates:
+        return regrid.average_duplicates(df, grid_params.get("dedupe_tolerance", 0.0))
+    return df
+
+
+def interpolate_data(df, grid_params, k=None, power=None, average_duplicates=True):
+    """Regrid all numeric variables in df on the template grid (see regrid.py).
 
     Parameters
     ----------
@@ -58,236 +136,664 @@ def interpolate_data(df, grid_params, k=3, power=1.0, average_duplicates=True):
     grid_params : dict
         {
           "x": {"min": ..., "max": ..., "n": ...},
-          "y": {"min": ..., "max": ..., "n": ...}
+          "y": {"min": ..., "max": ..., "n": ...},
+          "method": "nearest" | "idw" | "linear",   # optional, "idw" by default
+          "k": ..., "power": ...,                   # optional IDW options
+          "dedupe_tolerance": ...,                  # optional, in m, points closer are averaged
+          "block_rows": ...                         # optional, grid rows per parquet row group
         }
     k : int
-        Number of neighbors for weighting.
+        Number of neighbors for IDW, overrides the template.
     power : float
-        IDW power parameter. Set to 0 for uniform averaging of neighbors.
+        IDW power parameter, overrides the template. Set to 0 for uniform averaging of neighbors.
     average_duplicates : bool
-        If True, average duplicate (x,y) rows before building the tree.
+        If True, average duplicate (x,y) rows before regridding.
     """
-    print("Applying interpolation with IDW (k={}, power={})".format(k, power))
-    x_min, x_max, x_n = grid_params["x"]["min"], grid_params["x"]["max"], grid_params["x"]["n"]
-    y_min, y_max, y_n = grid_params["y"]["min"], grid_params["y"]["max"], grid_params["y"]["n"]
     print(grid_params)
+    return regrid.regrid(unique_points(df, grid_params, average_duplicates), grid_params, k=k, power=power)
 
-    # Average duplicate (x,y) points
-    if average_duplicates:
-        # only average numeric columns; non-numerics are dropped
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        if "x" not in numeric_cols: numeric_cols.append("x")
-        if "y" not in numeric_cols: numeric_cols.append("y")
-        dfu = (df[numeric_cols]
-               .groupby(["x", "y"], as_index=False)
-               .mean(numeric_only=True))
-    else:
-        dfu = df.copy()
-
-    # Build query grid
-    xi = np.linspace(x_min, x_max, x_n)
-    yi = np.linspace(y_min, y_max, y_n)
-    X, Y = np.meshgrid(xi, yi, indexing="xy")
-    grid_points = np.column_stack([X.ravel(), Y.ravel()])
-
-    # KDTree on unique points
-    pts = dfu[["x", "y"]].to_numpy()
-    n_pts = len(pts)
-    if n_pts == 0:
-        raise ValueError("No input points to interpolate.")
-
-    k_eff = min(k, n_pts)  # in case dataset smaller than k
-    tree = KDTree(pts)
-    dist, ind = tree.query(grid_points, k=k_eff)
-
-    # Prepare variables to interpolate (numeric, excluding x,y)
-    all_numeric = dfu.select_dtypes(include=[np.number]).columns.tolist()
-    variables = [c for c in all_numeric if c not in ("x", "y")]
-    if not variables:
-        raise ValueError("No numeric variables (besides x,y) found to interpolate.")
-
-        # Compute weights (IDW or uniform if power==0)
-    if power == 0:
-        # uniform weights across k neighbors
-        weights = np.full_like(dist, 1.0 / dist.shape[1], dtype=float)
-    else:
-        # IDW weights; handle exact matches by setting that weight to 1
-        with np.errstate(divide='ignore'):
-            w = 1.0 / (np.power(dist, power) + 1e-12)
-        # If any distance is effectively zero for a row, make that neighbor carry full weight
-        zero_rows = np.any(dist < 1e-12, axis=1)
-        if np.any(zero_rows):
-            # For rows with zeros, zero all weights then set zeros to 1 (if multiple zeros, they’ll share equally)
-            w[zero_rows] = 0.0
-            zero_mask = dist[zero_rows] < 1e-12
-            # Normalize per-row among the zero-distance neighbors (could be >1 if duplicates landed exactly on grid)
-            w[zero_rows] = zero_mask / zero_mask.sum(axis=1, keepdims=True)
-        # Normalize remaining rows
-        row_sums = w.sum(axis=1, keepdims=True)
-        # Safeguard in case of any weird numerical issue
-        row_sums[row_sums == 0] = 1.0
-        weights = w / row_sums
-
-    # Interpolate each variable with the weights
-    out = {}
-    for var in variables:
-        print(f"Interpolating {var} (k={k_eff}, power={power})")
-        vals = dfu[var].to_numpy()
-        # Gather neighbor values for each grid point and apply weights
-        neigh_vals = vals[ind]  # shape (n_grid, k_eff)
-        out[var] = np.sum(weights * neigh_vals, axis=1)
-
-    # Return flat DataFrame like your original (x,y alongside all variables)
-    out["x"] = grid_points[:, 0]
-    out["y"] = grid_points[:, 1]
-    interpolated_df = pd.DataFrame(out)
-
-    return interpolated_df
-
-
-def process_zip(bucket_name, zip_key, benchmark_pb, code_name, version, user_metadata=None, **kwargs):
-    output_folder = f"/tmp/{code_name}_{version}/"
-    os.makedirs(output_folder, exist_ok=True)
 
-    file_list = []
-    file_header = {}  # Now accumulates header per prefix
+def interpolate_to_parquet(df, grid_params, output_path, block_rows=None, average_duplicates=True):
+    """Like interpolate_data, but streamed to a parquet file with one row group per block of grid rows."""
+    print(grid_params)
+    regrid.regrid_to_parquet(unique_points(df, grid_params, average_duplicates), grid_params, output_path,
+                             block_rows)
+
 
-    # Download and unzip the file
-    zip_obj = s3.get_object(Bucket=bucket_name, Key=zip_key)
-    # Load the JSON template
+def load_template(s3, bucket_name, benchmark_pb):
     template_key = f"benchmark_templates/{benchmark_pb}.json"
     try:
         response = s3.get_object(Bucket=bucket_name, Key=template_key)
-        template_content = response['Body'].read().decode('utf-8')
-        template = json.loads(template_content)
+        template = json.loads(response['Body'].read().decode('utf-8'))
         print("template loaded successfully")
+        return template
     except Exception as e:
         raise ValueError(f"Error loading template {template_key}: {e}")
 
-    with zipfile.ZipFile(BytesIO(zip_obj['Body'].read())) as zip_obj:
+
+# Small zips downloaded by this process, so the map tasks of a job download them once
+_zip_cache = {}
+
+
+def open_zip(s3, job, buffer_size=s3_range.DEFAULT_BUFFER_SIZE):
+    """Open the submission zip of a job: downloaded once when small, read with ranged GETs when large."""
+    if job["zip_size"] >= s3_range.RANGE_READ_MIN_BYTES:
+        return zipfile.ZipFile(s3_range.open_object(s3, job["bucket"], job["zip_key"], size=job["zip_size"],
+                                                    buffer_size=buffer_size))
+    key = (job["bucket"], job["zip_key"], job["zip_etag"])
+    if key not in _zip_cache:
+        _zip_cache.clear()
+        _zip_cache[key] = s3.get_object(Bucket=job["bucket"], Key=job["zip_key"])['Body'].read()
+    return zipfile.ZipFile(BytesIO(_zip_cache[key]))
+
+
+def plan_zip(bucket_name, zip_key, benchmark_pb, code_name, version, user_metadata=None, profiler=None,
+             on_preflight=None):
+    """
+    Plan step: match the zip members against the template and check them (see preflight.py).
+
+    Only the zip directory and the first KB of each member are read. Invalid members are
+    skipped and a ValueError is raised if none is valid.
+
+    Returns (job, tasks): the job holds everything the map and reduce steps share, and
+    there is one task per valid member, with its entry in the previous manifest.
+    """
+    profiler = profiler or StageProfiler()
+    s3 = get_s3()
+    with profiler.stage("download"):
+        template = load_template(s3, bucket_name, benchmark_pb)
+        head = s3.head_object(Bucket=bucket_name, Key=zip_key)
+
+    job = {
+        "bucket": bucket_name,
+        "zip_key": zip_key,
+        "zip_size": head["ContentLength"],
+        "zip_etag": head["ETag"],
+        "benchmark_pb": benchmark_pb,
+        "code_name": code_name,
+        "version": version,
+        "output_prefix": f"public_ds/{benchmark_pb}/{code_name}_{version}/",
+        "user_metadata": user_metadata or {},
+        "template": template,
+    }
+
+    # Member digests of the previous upload of this submission: unchanged members are skipped
+    manifest = load_manifest(s3, job["output_prefix"] + "manifest.json")
+
+    with profiler.stage("download"):
+        zip_obj = open_zip(s3, job, buffer_size=64 * 1024)
+    with zip_obj:
         zip_file_list = zip_obj.namelist()
-        for file_info in template['files']:
-            prefix = file_info['prefix']
-            file_type = file_info['file_type']
-            expected_structure = file_info
 
-            # Find matching files, even if they're in subdirectories
+        # Find matching files, even if they're in subdirectories
+        matches = []
+        for spec_index, file_info in enumerate(template['files']):
             matching_files = [
                 f for f in zip_file_list
-                if os.path.basename(f).startswith(prefix) and f.endswith(f".{file_type}")
+                if os.path.basename(f).startswith(file_info['prefix']) and f.endswith(f".{file_info['file_type']}")
             ]
-            print(f"number of matching files for {prefix} {len(matching_files)}")
-            for file_name in matching_files:
-                # Read and validate file
-                with zip_obj.open(file_name) as file:
-                    file_content = file.read().decode('utf-8')
-
-                    # Only extract header once per prefix (e.g., first matching file)
-                    if prefix not in file_header:
-                        file_header = extract_header(file_header, prefix, file_content)
-
-                    df = pd.read_csv(StringIO(file_content), comment='#', sep='\s+')
-
-                    # Validate columns
-                    var_list = expected_structure['var_list']
-                    expected_columns = [var['name'].lower() for var in
-                                        var_list]  # Convert expected columns to lowercase
-                    df_columns_lowercase = [col.lower() for col in df.columns]  # Convert actual columns to lowercase
-
-                    if df_columns_lowercase != expected_columns:
-                        warnings.warn(
-                            f"File {os.path.basename(file_name)} does not match the expected structure. Expected columns: {expected_columns}, found columns: {df_columns_lowercase}")
-                        continue
-
-                    # Force DataFrame column names to lowercase
-                    df.columns = df.columns.str.lower()
-
-                    if "grid" in expected_structure:
-                        df = interpolate_data(df, expected_structure['grid'])
-                    # Save as Parquet
-                    output_path = os.path.join(output_folder,
-                                               f"{os.path.splitext(os.path.basename(file_name))[0]}.parquet")
+            print(f"number of matching files for {file_info['prefix']} {len(matching_files)}")
+            matches.extend((spec_index, file_name) for file_name in matching_files)
+
+        # Check every member from its first few KB before any full parse, so a bad
+        # submission fails in seconds
+        with profiler.stage("preflight"):
+            reports = preflight.check_members(zip_obj, [(template['files'][i], name) for i, name in matches])
+    if on_preflight is not None:
+        on_preflight(preflight.summarize(reports))
+    for report in reports:
+        if not report["valid"]:
+            warnings.warn(f"File {os.path.basename(report['file'])} skipped: {report['error']}")
+    if not any(report["valid"] for report in reports):
+        errors = "; ".join(f"{os.path.basename(r['file'])}: {r['error']}" for r in reports[:5])
+        raise ValueError(f"No valid file in {os.path.basename(zip_key)} "
+                         f"({len(matches)} matching the template{', ' + errors if errors else ''})")
+
+    tasks = [
+        {"index": index, "member": file_name, "spec": spec_index, "previous": manifest["files"].get(file_name, {})}
+        for index, ((spec_index, file_name), report) in enumerate(
+            (match, report) for match, report in zip(matches, reports) if report["valid"])
+    ]
+    job["n_tasks"] = len(tasks)
+    job["job_id"] = f"{benchmark_pb}/{os.path.basename(zip_key)}/{uuid.uuid4().hex}"
+    return job, tasks
+
+
+def map_member(job, task):
+    """
+    Map step: convert one zip member to parquet and publish it, unless it is unchanged.
+
+    Runs in any process (or Lambda invocation) on its own. Returns the member's header,
+    its manifest entry (None if the file turned out invalid), whether it was unchanged and
+    the stage timings.
+    """
+    profiler = StageProfiler()
+    s3 = get_s3()
+    expected_structure = job["template"]["files"][task["spec"]]
+    file_name = task["member"]
+    prefix = expected_structure['prefix']
+    user_metadata = job["user_metadata"]
+    output_folder = f"/tmp/{job['code_name']}_{job['version']}/"
+    os.makedirs(output_folder, exist_ok=True)
+    output_name = f"{os.path.splitext(os.path.basename(file_name))[0]}.parquet"
+    target_key = job["output_prefix"] + output_name
+    result = {"index": task["index"], "file": file_name, "spec": task["spec"], "prefix": prefix, "header": None,
+              "manifest_entry": None, "unchanged": False}
+
+    # Read and validate file
+    with profiler.stage("unzip"):
+        with open_zip(s3, job, buffer_size=8 * 1024 * 1024) as zip_obj, zip_obj.open(file_name) as file:
+            file_bytes = file.read()
+
+    with profiler.stage("hash"):
+        digest = member_digest(file_bytes, expected_structure)
+        previous = task["previous"]
+        unchanged = previous.get("hash") == digest and previous.get("output_key") == target_key
+
+    if unchanged:
+        # Same bytes and same template: the published output is still valid
+        result.update(header=extract_header({}, prefix, file_bytes.decode('utf-8'))[prefix],
+                      manifest_entry=previous, unchanged=True, stages=profiler.as_dict())
+        return result
+
+    with profiler.stage("parse"):
+        file_content = file_bytes.decode('utf-8')
+        del file_bytes
+        result["header"] = extract_header({}, prefix, file_content)[prefix]
+        df = pd.read_csv(StringIO(file_content), comment='#', sep='\s+')
+        del file_content
+
+    with profiler.stage("validate"):
+        # Validate columns
+        var_list = expected_structure['var_list']
+        expected_columns = [var['name'].lower() for var in
+                            var_list]  # Convert expected columns to lowercase
+        df_columns_lowercase = [col.lower() for col in df.columns]  # Convert actual columns to lowercase
+
+        valid = df_columns_lowercase == expected_columns
+        if not valid:
+            warnings.warn(
+                f"File {os.path.basename(file_name)} does not match the expected structure. Expected columns: {expected_columns}, found columns: {df_columns_lowercase}")
+        else:
+            # Force DataFrame column names to lowercase
+            df.columns = df.columns.str.lower()
+
+    if valid:
+        output_path = os.path.join(output_folder, output_name)
+        events_key = None
+        if "grid" in expected_structure:
+            # Regridded block by block straight into parquet row groups, so the memory
+            # needed does not grow with the grid resolution
+            with profiler.stage("interpolate"):
+                interpolate_to_parquet(df, expected_structure['grid'], output_path)
+        else:
+            is_time_series = expected_structure['graph_type'] == 'timeseries' and 't' in df.columns
+            if is_time_series:
+                # Sorted by time, so each row group covers a narrow time range
+                df = df.sort_values('t', kind='stable')
+            if is_time_series and "events" in expected_structure:
+                with profiler.stage("events"):
+                    catalog = event_catalog(df, expected_structure["events"])
+                    events_key = f"{job['output_prefix']}events/{os.path.splitext(output_name)[0]}.json"
+                    print(f"{len(catalog['events'])} event(s) found in {file_name}")
+            # Save as Parquet
+            with profiler.stage("write"):
+                if is_time_series:
+                    df.to_parquet(output_path, index=False, row_group_size=TIME_SERIES_ROW_GROUP_ROWS,
+                                  write_statistics=True)
+                else:
                     df.to_parquet(output_path, index=False)
+        del df
+
+        # Upload the Parquet file to the main bucket with the benchmark_pb structure
+        with profiler.stage("upload"):
+            s3.upload_file(output_path, "benchmark-vv-data", target_key, ExtraArgs={"Metadata": user_metadata})
+            if events_key is not None:
+                s3.put_object(Bucket="benchmark-vv-data", Key=events_key, Body=json.dumps(catalog),
+                              ContentType="application/json", Metadata=user_metadata)
+        result["manifest_entry"] = {"hash": digest, "output_key": target_key}
+        if events_key is not None:
+            result["manifest_entry"]["events_key"] = events_key
+        os.remove(output_path)
+
+    result["stages"] = profiler.as_dict()
+    return result
+
+
+def update_json(s3, key, update, metadata=None, attempts=PUBLISH_ATTEMPTS):
+    """
+    Read-modify-write a JSON object shared by concurrent map tasks.
+
+    `update` gets the current document (None if missing) and returns the new one. The write
+    is conditional on the ETag read (or on the object still missing) and retried on conflict
+    after a jittered exponential backoff, so the concurrent Map iterations spread out.
+    """
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(random.uniform(0, min(PUBLISH_BACKOFF_MAX_SECONDS, PUBLISH_BACKOFF_SECONDS * 2 ** attempt)))
+        try:
+            response = s3.get_object(Bucket="benchmark-vv-data", Key=key)
+            document = json.loads(response['Body'].read().decode('utf-8'))
+            condition = {"IfMatch": response["ETag"]}
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ("NoSuchKey", "404"):
+                raise
+            document, condition = None, {"IfNoneMatch": "*"}
+        try:
+            s3.put_object(Bucket="benchmark-vv-data", Key=key, Body=json.dumps(update(document), indent=4),
+                          Metadata=metadata or {}, **condition)
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise
+    raise RuntimeError(f"Could not update {key}: {attempts} conflicting writes")
+
+
+def publish_partial(job, result):
+    """
+    Make one converted file visible before the job completes.
+
+    Its entry is added to the manifest and its header to metadata.json, both marked
+    incomplete, so the dashboard lists the receivers already published within seconds of
+    the upload. Documents left by another job are reset, except for the manifest entries
+    of outputs that are still published. reduce_job commits the final versions.
+    """
+    if result["manifest_entry"] is None:
+        return
+
+    def add_to_manifest(manifest):
+        if manifest is None or manifest.get("job_id") != job["job_id"]:
+            manifest = {"pipeline_version": PIPELINE_VERSION, "job_id": job["job_id"], "complete": False,
+                        "files": (manifest or {}).get("files", {}), "compact": (manifest or {}).get("compact", {})}
+        manifest["files"][result["file"]] = result["manifest_entry"]
+        return manifest
+
+    def add_to_metadata(metadata):
+        if metadata is None or metadata.get("job_id") != job["job_id"]:
+            metadata = {"processed_files": [], "complete": False, "job_id": job["job_id"]}
+        if result["header"] is not None and result["prefix"] not in metadata:
+            metadata[result["prefix"]] = result["header"]
+        if result["file"] not in metadata["processed_files"]:
+            metadata["processed_files"].append(result["file"])
+        return metadata
+
+    s3 = get_s3()
+    update_json(s3, job["output_prefix"] + "manifest.json", add_to_manifest, job["user_metadata"])
+    update_json(s3, job["output_prefix"] + "metadata.json", add_to_metadata, job["user_metadata"])
+
+
+def compact_outputs(job, results, previous):
+    """
+    Consolidate the published receivers of each template file type into one parquet file.
+
+    The file (public_ds/.../compact/<file type>.parquet) has a receiver column and a footer
+    index of each receiver's row groups (see compaction.py), so the dashboard loads any set
+    of receivers with one read plan. A file type whose receivers are all unchanged keeps
+    its previous consolidated file (`previous`, from the manifest).
+
+    Returns the manifest "compact" entries, by file type name.
+    """
+    s3 = get_s3()
+    by_spec = {}
+    for result in results:
+        if result["manifest_entry"] is not None:
+            by_spec.setdefault(result["spec"], []).append(result)
+
+    entries = {}
+    for spec_index, spec_results in sorted(by_spec.items()):
+        name = job["template"]["files"][spec_index]["name"]
+        sources = sorted(
+            (os.path.splitext(os.path.basename(r["manifest_entry"]["output_key"]))[0], r["manifest_entry"]["output_key"])
+            for r in spec_results
+        )
+        receivers = [receiver for receiver, _ in sources]
+        entry = previous.get(name)
+        if entry is not None and entry["receivers"] == receivers and all(r["unchanged"] for r in spec_results):
+            entries[name] = entry
+            continue
+
+        key = f"{job['output_prefix']}compact/{compaction.compact_name(name)}"
+        output_path = os.path.join(f"/tmp/{job['code_name']}_{job['version']}/", compaction.compact_name(name))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        compaction.compact([(receiver, f"benchmark-vv-data/{output_key}") for receiver, output_key in sources],
+                           output_path, filesystem=get_arrow_s3())
+        s3.upload_file(output_path, "benchmark-vv-data", key, ExtraArgs={"Metadata": job["user_metadata"]})
+        os.remove(output_path)
+        entries[name] = {"key": key, "receivers": receivers}
+    return entries
+
+
+def reduce_job(job, results, profiler=None):
+    """
+    Reduce step: merge the headers of the map results into metadata.json and publish the new manifest.
+
+    Returns a dict with the number of processed and unchanged files.
+    """
+    profiler = profiler or StageProfiler()
+    s3 = get_s3()
+    file_header = {}  # First header per prefix, in zip order
+    file_list = []
+    new_manifest = {"pipeline_version": PIPELINE_VERSION, "files": {}}
+    unchanged = 0
+    for result in sorted(results, key=lambda r: r["index"]):
+        profiler.merge(result.get("stages"))
+        if result["header"] is not None and result["prefix"] not in file_header:
+            file_header[result["prefix"]] = result["header"]
+        if result["manifest_entry"] is not None:
+            file_list.append(result["file"])
+            new_manifest["files"][result["file"]] = result["manifest_entry"]
+            unchanged += result["unchanged"]
+
+    print(f"{len(file_list) - unchanged} file(s) processed, {unchanged} unchanged")
+
+    with profiler.stage("compact"):
+        previous = load_manifest(s3, job["output_prefix"] + "manifest.json").get("compact", {})
+        new_manifest["compact"] = compact_outputs(job, results, previous)
+
+    # Final commit: replaces the partial documents published while the files were processed
+    with profiler.stage("upload"):
+        metadata = {**file_header, "processed_files": file_list, "complete": True}
+        s3.put_object(Bucket="benchmark-vv-data", Key=job["output_prefix"] + "metadata.json",
+                      Body=json.dumps(metadata, indent=4), Metadata=job["user_metadata"])
+
+        # The manifest is written last: an interrupted run leaves a partial one, which only
+        # lists outputs that were fully published
+        new_manifest.update(complete=True, job_id=job["job_id"])
+        s3.put_object(Bucket="benchmark-vv-data", Key=job["output_prefix"] + "manifest.json",
+                      Body=json.dumps(new_manifest, indent=4), Metadata=job["user_metadata"])
+
+    return {"processed": len(file_list) - unchanged, "unchanged": unchanged}
+
+
+def process_zip(bucket_name, zip_key, benchmark_pb, code_name, version, user_metadata=None, profiler=None,
+                on_progress=None, on_preflight=None, executor=None, **kwargs):
+    """
+    Convert every template-matching file of a submission zip to parquet and publish it.
+
+    Runs the plan, map and reduce steps in this process, the map tasks on `executor`
+    (see executors.py; EXECUTOR, serial by default). In production the state machine runs
+    the same steps as separate Lambda invocations instead (see handler).
+
+    Each member is content addressed (see member_digest) and compared against the manifest
+    of the previous upload of the same code and version: only new or changed members are
+    parsed, regridded and uploaded, the outputs of unchanged ones are kept. Each file is
+    published as soon as it is converted (see publish_partial).
+
+    `profiler` (a StageProfiler) collects wall time and peak RSS per stage; `on_progress` is
+    called with the percentage of matching files done after each file, and `on_preflight`
+    with the summary of the pre-flight reports.
+
+    Returns a dict with the number of processed and unchanged files.
+    """
+    profiler = profiler or StageProfiler()
+    executor = executor or executors.get_executor()
+    job, tasks = plan_zip(bucket_name, zip_key, benchmark_pb, code_name, version, user_metadata, profiler,
+                          on_preflight)
+    done = []
+
+    def on_result(result):
+        done.append(result["index"])
+        publish_partial(job, result)
+        if on_progress is not None:
+            on_progress(100 * len(done) // len(tasks))
+
+    results = executor.map(map_member, job, tasks, on_result=on_result)
+    return reduce_job(job, results, profiler)
+
+
+def progress_reporter(table, user_id, file_id):
+    """Return a callback writing the progress percentage on the status item, once per new value."""
+    last = {"percent": None}
+
+    def report(percent):
+        if percent == last["percent"]:
+            return
+        last["percent"] = percent
+        table.update_item(
+            Key={"userId": user_id, "fileId": file_id},
+            UpdateExpression="SET #progress = :progress",
+            ExpressionAttributeNames={"#progress": "progress"},
+            ExpressionAttributeValues={":progress": percent},
+        )
+    return report
+
+
+def preflight_reporter(table, user_id, file_id):
+    """Return a callback writing the pre-flight report on the status item."""
+    def report(summary):
+        table.update_item(
+            Key={"userId": user_id, "fileId": file_id},
+            UpdateExpression="SET #preflight = :preflight",
+            ExpressionAttributeNames={"#preflight": "preflight"},
+            ExpressionAttributeValues={":preflight": summary},
+        )
+    return report
+
+
+def record_failure(table, user_id, file_id, error, profiler):
+    table.update_item(
+        Key={"userId": user_id, "fileId": file_id},
+        UpdateExpression="SET #status = :status, #error = :error, #stages = :stages",
+        ExpressionAttributeNames={
+            "#status": "status",
+            "#error": "error",
+            "#stages": "stages",
+        },
+        ExpressionAttributeValues={
+            ":status": "failed",
+            ":error": str(error),
+            ":stages": profiler.summary(),
+        },
+    )
+
+
+def record_completion(table, user_id, file_id, file_counts, profiler):
+    # Update status to "completed", with the stage timings used to size the Lambda
+    table.update_item(
+        Key={"userId": user_id, "fileId": file_id},
+        UpdateExpression="SET #status = :status, #progress = :progress, #stages = :stages, #files = :files",
+        ExpressionAttributeNames={"#status": "status", "#progress": "progress", "#stages": "stages",
+                                  "#files": "files"},
+        ExpressionAttributeValues={":status": "completed", ":progress": 100, ":stages": profiler.summary(),
+                                   ":files": file_counts},
+    )
+
+
+def parse_submission(event, s3):
+    """Submission described by the S3 event of an upload: location, uploader metadata and zip name parts."""
+    s3_detail = event.get("s3Event", {}).get("detail", {})
+    bucket_name = s3_detail.get("bucket", {}).get("name", "unknown")
+    zip_key = s3_detail.get("object", {}).get("key", "unknown")
+
+    # Extract metadata from the uploaded file
+    response = s3.head_object(Bucket=bucket_name, Key=zip_key)
+    user_metadata = response.get('Metadata', {})
+    print(f'Metadata: {user_metadata}')
+
+    # Extract benchmark_pb, code_name, and version from the zip key
+    parts = zip_key.split('/')
+    zip_name = os.path.basename(zip_key)
+    code_name, version = zip_name.rsplit('.', 1)[0].split('_', 1)
+    return {
+        "bucket_name": bucket_name,
+        "zip_key": zip_key,
+        "user_metadata": user_metadata,
+        "user_id": user_metadata.get("userid"),
+        "file_id": zip_name,
+        "benchmark_pb": parts[1],  # e.g., bp1_qd
+        "code_name": code_name,
+        "version": version,
+    }
+
+
+def start_processing(table, submission):
+    # Write initial status to DynamoDB
+    timestamp = datetime.utcnow().isoformat() + "Z"  # ISO format with UTC timezone
+    table.put_item(
+        Item={
+            "userId": submission["user_id"],
+            "fileId": submission["file_id"],
+            "status": "processing",
+            "progress": 0,
+            "timestamp": timestamp,  # Add timestamp if available
+        }
+    )
+    print(f'Processing benchmark {submission["benchmark_pb"]}, code {submission["code_name"]}, '
+          f'version {submission["version"]}')
+
+
+# The plan and the map results of the Step Functions backend are passed through S3: state
+# payloads must stay under 256 KB, and the Map state reads its items from the plan object
+JOB_RESULTS_PREFIX = "jobs/"
+
+# Jobs loaded by this container, reused by the map iterations of the same job
+_job_cache = {}
+
+
+def _job_key(job_id):
+    return f"{JOB_RESULTS_PREFIX}{job_id}/job.json"
+
 
-                # Upload the Parquet file to the main bucket with the benchmark_pb structure
-                target_key = f"public_ds/{benchmark_pb}/{code_name}_{version}/{os.path.basename(output_path)}"
-                s3.upload_file(output_path, "benchmark-vv-data", target_key, ExtraArgs={"Metadata": user_metadata})
-                file_list.append(file_name)
-                os.remove(output_path)
+def _tasks_key(job_id):
+    return f"{JOB_RESULTS_PREFIX}{job_id}/tasks.json"
 
-    # Save metadata as JSON and upload it
-    metadata = {**file_header, "processed_files": file_list}
-    metadata_path = os.path.join(output_folder, "metadata.json")
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=4)
 
-    s3.upload_file(metadata_path, "benchmark-vv-data", f"public_ds/{benchmark_pb}/{code_name}_{version}/metadata.json",
-                   ExtraArgs={"Metadata": user_metadata})
+def _result_key(job, index):
+    return f"{JOB_RESULTS_PREFIX}{job['job_id']}/results/{index}.json"
+
+
+def load_job(job_id):
+    """Job written by the plan step, read once per container."""
+    if job_id not in _job_cache:
+        _job_cache.clear()
+        body = get_s3().get_object(Bucket="benchmark-vv-data", Key=_job_key(job_id))['Body'].read()
+        _job_cache[job_id] = json.loads(body)
+    return _job_cache[job_id]
+
+
+def plan_step(event):
+    """First state of the state machine: plan the job, or record why the submission is rejected."""
+    s3, table = get_s3(), get_table()
+    submission = parse_submission(event, s3)
+    if not submission["user_id"]:
+        print(f'No userid found for {submission["zip_key"]}')
+        return {"failed": True, "error": "userId not found in S3 object metadata"}
+    start_processing(table, submission)
+    profiler = StageProfiler()
+    try:
+        job, tasks = plan_zip(submission["bucket_name"], submission["zip_key"], submission["benchmark_pb"],
+                              submission["code_name"], submission["version"], submission["user_metadata"],
+                              profiler=profiler,
+                              on_preflight=preflight_reporter(table, submission["user_id"], submission["file_id"]))
+    except Exception as e:
+        print(f"Error planning {submission['zip_key']}: {e}")
+        record_failure(table, submission["user_id"], submission["file_id"], e, profiler)
+        return {"failed": True, "error": str(e)}
+
+    job.update(user_id=submission["user_id"], file_id=submission["file_id"])
+    table.update_item(
+        Key={"userId": submission["user_id"], "fileId": submission["file_id"]},
+        UpdateExpression="SET #total = :total, #done = :zero",
+        ExpressionAttributeNames={"#total": "files_total", "#done": "files_done"},
+        ExpressionAttributeValues={":total": len(tasks), ":zero": 0},
+    )
+    # The Map state reads the tasks from S3 (ItemReader) and each iteration loads the job by
+    # its id, so neither goes through the state payloads
+    s3.put_object(Bucket="benchmark-vv-data", Key=_job_key(job["job_id"]), Body=json.dumps(job))
+    s3.put_object(Bucket="benchmark-vv-data", Key=_tasks_key(job["job_id"]), Body=json.dumps(tasks))
+    return {"failed": False, "job_id": job["job_id"], "tasks_key": _tasks_key(job["job_id"]),
+            "n_tasks": len(tasks), "stages": profiler.as_dict()}
+
+
+def map_step(event):
+    """Iteration of the Map state: one member of the job, its result stored in S3 for the reduce step."""
+    job, task = load_job(event["job_id"]), event["task"]
+    result = map_member(job, task)
+    get_s3().put_object(Bucket="benchmark-vv-data", Key=_result_key(job, task["index"]), Body=json.dumps(result))
+    publish_partial(job, result)
+
+    # Progress, from an atomic counter shared by the concurrent iterations
+    table = get_table()
+    key = {"userId": job["user_id"], "fileId": job["file_id"]}
+    done = table.update_item(
+        Key=key,
+        UpdateExpression="ADD #done :one",
+        ExpressionAttributeNames={"#done": "files_done"},
+        ExpressionAttributeValues={":one": 1},
+        ReturnValues="UPDATED_NEW",
+    )["Attributes"]["files_done"]
+    percent = int(done) * 100 // job["n_tasks"]
+    try:
+        table.update_item(
+            Key=key,
+            UpdateExpression="SET #progress = :progress",
+            ConditionExpression="attribute_not_exists(#progress) OR #progress < :progress",
+            ExpressionAttributeNames={"#progress": "progress"},
+            ExpressionAttributeValues={":progress": percent},
+        )
+    except ClientError as e:
+        # A later iteration already reported more progress
+        if e.response['Error']['Code'] != "ConditionalCheckFailedException":
+            raise
+    return {"index": task["index"]}
+
+
+def reduce_step(event):
+    """Last state of the state machine: gather the map results, publish metadata and manifest."""
+    job = load_job(event["job_id"])
+    s3, table = get_s3(), get_table()
+    profiler = StageProfiler()
+    profiler.merge(event.get("stages"))
+    keys = [_result_key(job, index) for index in range(job["n_tasks"])]
+    results = [json.loads(s3.get_object(Bucket="benchmark-vv-data", Key=key)['Body'].read()) for key in keys]
+    file_counts = reduce_job(job, results, profiler)
+    profiler.report()
+    record_completion(table, job["user_id"], job["file_id"], file_counts, profiler)
+    keys += [_job_key(job["job_id"]), _tasks_key(job["job_id"])]
+    for start in range(0, len(keys), 1000):
+        s3.delete_objects(Bucket="benchmark-vv-data",
+                          Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True})
+    return {"status": "completed"}
+
+
+STEPS = {"plan": plan_step, "map": map_step, "reduce": reduce_step}
 
 
 def handler(event, context):
+    """
+    Entry point of the ingest Lambda.
+
+    With a "step" in the event, runs that step of the Step Functions backend (plan, one
+    map task, or reduce). Without one, processes the whole submission in this invocation.
+    """
     try:
         print(event)
-        # for record in event['Records']:
-        s3_detail = event.get("s3Event", {}).get("detail", {})
-        bucket_name = s3_detail.get("bucket", {}).get("name", "unknown")
-        zip_key = s3_detail.get("object", {}).get("key", "unknown")
-
-        # Extract metadata from the uploaded file
-        response = s3.head_object(Bucket=bucket_name, Key=zip_key)
-        user_metadata = response.get('Metadata', {})
-        print(f'Metadata: {user_metadata}')
-
-        user_id = user_metadata.get("userid")
-        file_id = os.path.basename(zip_key)
+        if "step" in event:
+            return STEPS[event["step"]](event)
+
+        s3 = get_s3()
+        table = get_table()
+        submission = parse_submission(event, s3)
+        user_id, file_id = submission["user_id"], submission["file_id"]
         if not user_id:
-            print(f'No userid found for {zip_key}')
+            print(f'No userid found for {submission["zip_key"]}')
             return {"error": "userId not found in S3 object metadata"}
 
-        # Write initial status to DynamoDB
-        timestamp = datetime.utcnow().isoformat() + "Z"  # ISO format with UTC timezone
-
-        table.put_item(
-            Item={
-                "userId": user_id,
-                "fileId": file_id,
-                "status": "processing",
-                "timestamp": timestamp,  # Add timestamp if available
-            }
-        )
-
-        # Extract benchmark_pb, code_name, and version from the zip key
-        parts = zip_key.split('/')
-        benchmark_pb = parts[1]  # e.g., bp1_qd
-        zip_name = os.path.basename(zip_key)
-        code_name, version = zip_name.rsplit('.', 1)[0].split('_', 1)
-        print(f'Processing benchmark {benchmark_pb}, code {code_name}, version {version}')
+        start_processing(table, submission)
+        profiler = StageProfiler()
         try:
-            process_zip(bucket_name, zip_key, benchmark_pb, code_name, version, user_metadata)
+            file_counts = process_zip(submission["bucket_name"], submission["zip_key"], submission["benchmark_pb"],
+                                      submission["code_name"], submission["version"], submission["user_metadata"],
+                                      profiler=profiler, on_progress=progress_reporter(table, user_id, file_id),
+                                      on_preflight=preflight_reporter(table, user_id, file_id))
         except Exception as e:
-            print(f"Error processing {zip_key}: {e}")
-            if user_id and file_id:
-                table.update_item(
-                    Key={"userId": user_id, "fileId": file_id},
-                    UpdateExpression="SET #status = :status, #error = :error",
-                    ExpressionAttributeNames={
-                        "#status": "status",
-                        "#error": "error",
-                    },
-                    ExpressionAttributeValues={
-                        ":status": "failed",
-                        ":error": str(e),
-                    },
-                )
-            return {"error": f"Error processing {zip_key}: {e}"}
-
-        # Update status to "completed"
-        table.update_item(
-            Key={"userId": user_id, "fileId": file_id},
-            UpdateExpression="SET #status = :status",
-            ExpressionAttributeNames={"#status": "status"},
-            ExpressionAttributeValues={":status": "completed"},
-        )
+            print(f"Error processing {submission['zip_key']}: {e}")
+            profiler.report()
+            record_failure(table, user_id, file_id, e, profiler)
+            return {"error": f"Error processing {submission['zip_key']}: {e}"}
+
+        profiler.report()
+        record_completion(table, user_id, file_id, file_counts, profiler)
         return {"status": "completed"}
 
     except NoCredentialsError:
@@ -0,0 +1,98 @@
+# Bytes read from the start of each member: enough for the header comments, the column
+# line and a sample of data rows
+PREFLIGHT_BYTES = 16 * 1024
+# Per-file reports written on the status item, invalid files first (DynamoDB items are capped at 400 KB)
+REPORT_LIMIT = 200
+
+
+def _decode_head(head):
+    """Decode the first bytes of a member, tolerating a multi-byte character cut at the end."""
+    try:
+        return head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:
+            return head[:e.start].decode("utf-8")
+        raise
+
+
+def inspect_member(zip_obj, file_name, file_spec, n_bytes=PREFLIGHT_BYTES):
+    """
+    Check one zip member against its template entry from its first bytes only.
+
+    Returns a report with the file name, whether it is valid, the error if not, and an
+    estimate of its number of data rows.
+    """
+    info = zip_obj.getinfo(file_name)
+    report = {"file": file_name, "valid": False, "size_bytes": info.file_size}
+    if info.file_size == 0:
+        report["error"] = "empty file"
+        return report
+
+    with zip_obj.open(info) as f:
+        head = f.read(n_bytes)
+    try:
+        text = _decode_head(head)
+    except UnicodeDecodeError:
+        report["error"] = "not a UTF-8 text file"
+        return report
+
+    lines = text.splitlines()
+    if len(head) < info.file_size and lines:
+        # The last line is cut by the read
+        lines = lines[:-1]
+    header_bytes, columns, data_lines = 0, None, []
+    for line in lines:
+        stripped = line.strip()
+        if columns is None:
+            header_bytes += len(line.encode("utf-8")) + 1
+            if stripped.startswith("#") or not stripped:
+                continue
+            columns = stripped.split()
+        elif stripped and not stripped.startswith("#"):
+            data_lines.append(line)
+
+    if columns is None:
+        report["error"] = f"no column line in the first {n_bytes // 1024} KB"
+        return report
+
+    expected = [var["name"].lower() for var in file_spec["var_list"]]
+    found = [column.lower() for column in columns]
+    if found != expected:
+        report["error"] = f"expected columns {expected}, found {found}"
+        return report
+
+    if not data_lines:
+        if len(head) >= info.file_size:
+            report["error"] = "no data rows"
+            return report
+    else:
+        fields = data_lines[0].split()
+        if len(fields) != len(columns):
+            report["error"] = f"first data row has {len(fields)} values for {len(columns)} columns"
+            return report
+        try:
+            [float(field) for field in fields]
+        except ValueError:
+            report["error"] = f"first data row is not numeric: {data_lines[0].strip()[:80]!r}"
+            return report
+        bytes_per_row = sum(len(line.encode("utf-8")) + 1 for line in data_lines) / len(data_lines)
+        report["estimated_rows"] = int((info.file_size - header_bytes) / bytes_per_row)
+
+    report["valid"] = True
+    return report
+
+
+def check_members(zip_obj, matches, n_bytes=PREFLIGHT_BYTES):
+    """Pre-flight report of every (file spec, member name) pair matched by the template."""
+    return [inspect_member(zip_obj, file_name, file_spec, n_bytes) for file_spec, file_name in matches]
+
+
+def summarize(reports, limit=REPORT_LIMIT):
+    """Status item form of the reports: counts, and the per-file reports (invalid first) up to `limit`."""
+    ordered = sorted(reports, key=lambda report: report["valid"])
+    return {
+        "valid": sum(report["valid"] for report in reports),
+        "invalid": sum(not report["valid"] for report in reports),
+        "files": ordered[:limit],
+        "truncated": len(reports) > limit,
+    }
@@ -0,0 +1,79 @@
+import contextlib
+import resource
+import time
+from decimal import Decimal
+
+
+def _reset_peak_rss():
+    """Reset the kernel's RSS high-water mark (VmHWM) so each stage measures its own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Peak resident set size in MB, since the last reset when supported, else since process start."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageProfiler:
+    """
+    Accumulate wall time and peak RSS per ingest stage.
+
+    Stages can be entered many times (e.g. once per file); wall times add up and the
+    peak is the largest seen. Stages must not be nested.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "peak_rss_mb": 0.0, "calls": 0})
+            entry["seconds"] += time.perf_counter() - start
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], _peak_rss_mb())
+            entry["calls"] += 1
+
+    def as_dict(self):
+        """Stages as plain JSON-serializable numbers, to pass them between processes or steps."""
+        return {name: dict(entry) for name, entry in self.stages.items()}
+
+    def merge(self, stages):
+        """Add the stages measured elsewhere (e.g. in a worker, from `as_dict`) to this profiler."""
+        for name, other in (stages or {}).items():
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "peak_rss_mb": 0.0, "calls": 0})
+            entry["seconds"] += float(other["seconds"])
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], float(other["peak_rss_mb"]))
+            entry["calls"] += int(other["calls"])
+
+    def summary(self):
+        """Stages as a DynamoDB-ready map (numbers as Decimal)."""
+        return {
+            name: {
+                "seconds": Decimal(str(round(entry["seconds"], 3))),
+                "peak_rss_mb": Decimal(str(round(entry["peak_rss_mb"], 1))),
+                "calls": entry["calls"],
+            }
+            for name, entry in self.stages.items()
+        }
+
+    def report(self):
+        for name, entry in self.stages.items():
+            print(f"stage {name}: {entry['seconds']:.3f}s over {entry['calls']} call(s), "
+                  f"peak RSS {entry['peak_rss_mb']:.1f} MB")
@@ -0,0 +1,230 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Method used when the template grid has no "method"
+DEFAULT_METHOD = "idw"
+# Options of each method, with their defaults; they can be set in the template grid block, e.g.
+# "grid": {"x": {...}, "y": {...}, "method": "idw", "k": 3, "power": 1.0}
+METHOD_OPTIONS = {
+    "nearest": {},
+    "idw": {"k": 3, "power": 1.0},
+    "linear": {},
+}
+# Search structures (KD-trees, triangulations) kept across files and warm invocations
+INDEX_CACHE_SIZE = 2
+# Grid rows regridded and written at a time when streaming to parquet
+REGRID_BLOCK_ROWS = 100
+
+_indexes = OrderedDict()
+
+
+def method_options(grid_params, **overrides):
+    """Regridding method and options from the template grid block; overrides that are not None win."""
+    method = grid_params.get("method", DEFAULT_METHOD)
+    if method not in METHOD_OPTIONS:
+        raise ValueError(f"Unknown regridding method {method!r}, expected one of {sorted(METHOD_OPTIONS)}")
+    options = {name: grid_params.get(name, default) for name, default in METHOD_OPTIONS[method].items()}
+    options.update({name: value for name, value in overrides.items() if name in options and value is not None})
+    return method, options
+
+
+def average_duplicates(df, tolerance=0.0):
+    """
+    Average the numeric columns of rows sharing the same (x, y) point.
+
+    Unstructured meshes repeat shared nodes once per element. Coordinates are quantized
+    to `tolerance` (exact matches when 0), sorted, and every variable is averaged at once
+    with np.add.reduceat over the runs of equal points. NaN values are ignored like in a
+    groupby mean; rows without coordinates are dropped. The result is sorted by x, then y.
+    """
+    columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    columns = ["x", "y"] + [c for c in columns if c not in ("x", "y")]
+    values = df[columns].to_numpy(dtype=float)
+    values = values[~np.isnan(values[:, :2]).any(axis=1)]
+    if len(values) == 0:
+        return pd.DataFrame(values, columns=columns)
+
+    if tolerance:
+        keys = np.floor(values[:, :2] / tolerance + 0.5)
+    else:
+        keys = values[:, :2]
+    order = np.lexsort((keys[:, 1], keys[:, 0]))
+    keys, values = keys[order], values[order]
+    new_point = np.any(keys[1:] != keys[:-1], axis=1)
+    starts = np.concatenate([[0], np.flatnonzero(new_point) + 1])
+    if len(starts) == len(values):
+        return pd.DataFrame(values, columns=columns)
+
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    print(f"Averaged {len(values) - len(starts)} duplicated point(s)")
+    return pd.DataFrame(means, columns=columns)
+
+
+def _kdtree(points):
+    # scipy's KDTree instead of scikit-learn's: same results, a fraction of the import time
+    from scipy.spatial import cKDTree
+    return cKDTree(points)
+
+
+def _delaunay(points):
+    from scipy.spatial import Delaunay
+    return Delaunay(points)
+
+
+def _nearest_stencil(tree, targets):
+    dist, ind = tree.query(targets, k=1, workers=-1)
+    return ind[:, None], np.ones((len(targets), 1))
+
+
+def _idw_stencil(tree, targets, k, power):
+    k_eff = min(k, tree.n)  # in case dataset smaller than k
+    dist, ind = tree.query(targets, k=k_eff, workers=-1)
+    if k_eff == 1:
+        # cKDTree drops the neighbour axis for k=1
+        dist, ind = dist[:, None], ind[:, None]
+
+    if power == 0:
+        # uniform weights across k neighbors
+        return ind, np.full_like(dist, 1.0 / dist.shape[1], dtype=float)
+
+    # IDW weights; handle exact matches by setting that weight to 1
+    with np.errstate(divide='ignore'):
+        w = 1.0 / (np.power(dist, power) + 1e-12)
+    # If any distance is effectively zero for a row, make that neighbor carry full weight
+    zero_rows = np.any(dist < 1e-12, axis=1)
+    if np.any(zero_rows):
+        # Rows with zeros share the weight among their zero-distance neighbors
+        zero_mask = dist[zero_rows] < 1e-12
+        w[zero_rows] = zero_mask / zero_mask.sum(axis=1, keepdims=True)
+    row_sums = w.sum(axis=1, keepdims=True)
+    # Safeguard in case of any weird numerical issue
+    row_sums[row_sums == 0] = 1.0
+    return ind, w / row_sums
+
+
+def _linear_stencil(tri, targets):
+    """Barycentric weights in the Delaunay triangle containing each target; NaN outside the convex hull."""
+    simplex = tri.find_simplex(targets)
+    inside = simplex >= 0
+    transform = tri.transform[simplex[inside]]
+    b = np.einsum("ijk,ik->ij", transform[:, :2], targets[inside] - transform[:, 2])
+    weights = np.full((len(targets), 3), np.nan)
+    weights[inside] = np.column_stack([b, 1.0 - b.sum(axis=1)])
+    ind = np.zeros((len(targets), 3), dtype=np.intp)
+    ind[inside] = tri.simplices[simplex[inside]]
+    return ind, weights
+
+
+# Per method: the search structure built on the source points, and the stencil computed from it
+METHODS = {
+    "nearest": (_kdtree, _nearest_stencil),
+    "idw": (_kdtree, _idw_stencil),
+    "linear": (_delaunay, _linear_stencil),
+}
+
+
+def source_index(points, method):
+    """
+    KD-tree or Delaunay triangulation of the source points.
+
+    Building it is the expensive part of regridding, so it is cached on the points and
+    reused for every block of the grid, every variable, and every file sharing the same
+    mesh (also across warm invocations).
+    """
+    build = METHODS[method][0]
+    digest = hashlib.sha1(np.ascontiguousarray(points).tobytes()).hexdigest()
+    key = (build.__name__, digest)
+    if key in _indexes:
+        _indexes.move_to_end(key)
+        print(f"Reusing the {build.__name__.lstrip('_')} of the source points")
+        return _indexes[key]
+
+    index = build(points)
+    _indexes[key] = index
+    while len(_indexes) > INDEX_CACHE_SIZE:
+        _indexes.popitem(last=False)
+    return index
+
+
+def apply_stencil(stencil_, values):
+    """Interpolated values of one variable on the grid."""
+    ind, weights = stencil_
+    return np.sum(weights * values[ind], axis=1)
+
+
+def iter_blocks(df, grid_params, block_rows=None, **overrides):
+    """
+    Regrid every numeric variable of df (besides x and y), `block_rows` grid rows at a time.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Must contain 'x' and 'y' columns, without duplicated points.
+    grid_params : dict
+        Template grid block: "x" and "y" ranges, plus the optional "method" and its options.
+    block_rows : int
+        Grid rows (constant y) per block; the whole grid by default. Memory used by the
+        stencil and the outputs is proportional to the block size.
+    overrides :
+        Method options taking precedence over the template (None values are ignored).
+
+    Yields flat DataFrames with the variables, x and y on the grid nodes of each block.
+    """
+    method, options = method_options(grid_params, **overrides)
+    print(f"Applying interpolation with {method} {options}")
+    points = df[["x", "y"]].to_numpy(dtype=float)
+    if len(points) == 0:
+        raise ValueError("No input points to interpolate.")
+
+    variables = [c for c in df.select_dtypes(include=[np.number]).columns if c not in ("x", "y")]
+    if not variables:
+        raise ValueError("No numeric variables (besides x,y) found to interpolate.")
+    values = {var: df[var].to_numpy() for var in variables}
+
+    index = source_index(points, method)
+    xi = np.linspace(grid_params["x"]["min"], grid_params["x"]["max"], grid_params["x"]["n"])
+    yi = np.linspace(grid_params["y"]["min"], grid_params["y"]["max"], grid_params["y"]["n"])
+    block_rows = block_rows or len(yi)
+    for start in range(0, len(yi), block_rows):
+        X, Y = np.meshgrid(xi, yi[start:start + block_rows], indexing="xy")
+        targets = np.column_stack([X.ravel(), Y.ravel()])
+        stencil_ = METHODS[method][1](index, targets, **options)
+        out = {var: apply_stencil(stencil_, values[var]) for var in variables}
+        out["x"] = targets[:, 0]
+        out["y"] = targets[:, 1]
+        yield pd.DataFrame(out)
+
+
+def regrid(df, grid_params, **overrides):
+    """Regrid every numeric variable of df on the template grid, in memory (see iter_blocks)."""
+    return next(iter_blocks(df, grid_params, **overrides))
+
+
+def regrid_to_parquet(df, grid_params, output_path, block_rows=None, **overrides):
+    """
+    Regrid df straight into a parquet file, one row group per block of grid rows.
+
+    Only one block is in memory at a time, so the peak memory is set by `block_rows`
+    (the template "block_rows", else REGRID_BLOCK_ROWS) rather than by the grid size.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    block_rows = block_rows or grid_params.get("block_rows", REGRID_BLOCK_ROWS)
+    writer = None
+    try:
+        for block in iter_blocks(df, grid_params, block_rows, **overrides):
+            table = pa.Table.from_pandas(block, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table, row_group_size=len(block))
+    finally:
+        if writer is not None:
+            writer.close()
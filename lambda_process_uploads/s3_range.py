@@ -0,0 +1,66 @@
+import io
+
+# Objects smaller than this are downloaded in one request; larger ones are read with ranged GETs
+RANGE_READ_MIN_BYTES = 64 * 1024 * 1024
+# Read-ahead of ranged reads: a zip directory or member header costs one request
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable, read-only file object over an S3 object, backed by ranged GET requests.
+
+    Wrap it in an io.BufferedReader (see open_object) so small reads share a request.
+    zipfile only needs the central directory and the members it opens, so a large
+    submission is never downloaded in full.
+    """
+
+    def __init__(self, s3, bucket_name, key, size=None):
+        super().__init__()
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.key = key
+        self.size = size if size is not None else s3.head_object(Bucket=bucket_name, Key=key)["ContentLength"]
+        self.position = 0
+        self.requests = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size:
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        response = self.s3.get_object(Bucket=self.bucket_name, Key=self.key, Range=f"bytes={self.position}-{end}")
+        data = response["Body"].read()
+        self.requests += 1
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def open_object(s3, bucket_name, key, size=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                min_range_bytes=RANGE_READ_MIN_BYTES):
+    """Binary file object over an S3 object: in memory when small, ranged reads otherwise."""
+    if size is None:
+        size = s3.head_object(Bucket=bucket_name, Key=key)["ContentLength"]
+    if size < min_range_bytes:
+        return io.BytesIO(s3.get_object(Bucket=bucket_name, Key=key)["Body"].read())
+    return io.BufferedReader(S3RangeReader(s3, bucket_name, key, size), buffer_size=buffer_size)
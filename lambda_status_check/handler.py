@@ -1,23 +1,132 @@
 import os
 import json
+import time
+import hashlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+
 import boto3
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
 # Initialize the DynamoDB resource outside of the handler for better performance.
 # This allows the connection to be reused across multiple Lambda invocations.
-dynamodb = boto3.resource('dynamodb')
+# DYNAMODB_ENDPOINT_URL points the handler at a local DynamoDB stand-in (e.g. DynamoDB Local) for testing.
+dynamodb = boto3.resource('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'))
+
+
+def _json_default(value):
+    """Serialize DynamoDB numbers (Decimal), e.g. the progress and stage timings of an upload."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Upper bounds for the batched modes: BatchGetItem accepts 100 keys per call
+MAX_FILE_IDS = 100
+MAX_RECENT = 100
+DEFAULT_RECENT = 20
+# Attempts of a BatchGetItem call while DynamoDB returns unprocessed (throttled) keys
+BATCH_GET_ATTEMPTS = 5
+
+# Global secondary index of the status table used by the recent mode: partition key userId,
+# sort key timestamp (the ISO 8601 string written when processing starts), all attributes projected
+RECENT_INDEX_NAME = os.environ.get('RECENT_INDEX_NAME', 'userId-timestamp-index')
+# Uploads older than this are not listed by the recent mode
+RECENT_WINDOW_DAYS = int(os.environ.get('RECENT_WINDOW_DAYS', 365))
+
+
+class UnprocessedKeysError(Exception):
+    """DynamoDB still returned unprocessed keys after BATCH_GET_ATTEMPTS attempts."""
+
+
+def _batch_get_items(table, user_id, file_ids):
+    """
+    Fetch many items of one user with BatchGetItem, retrying unprocessed keys.
+
+    Raises UnprocessedKeysError when keys are still unprocessed after the last attempt, so
+    throttled files are not reported as missing.
+    """
+    items = []
+    for i in range(0, len(file_ids), MAX_FILE_IDS):
+        request = {table.name: {'Keys': [{'userId': user_id, 'fileId': file_id}
+                                         for file_id in file_ids[i:i + MAX_FILE_IDS]]}}
+        for attempt in range(BATCH_GET_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(table.name, []))
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                break
+            if attempt < BATCH_GET_ATTEMPTS - 1:
+                # Throttled keys come back unprocessed, back off before retrying them
+                time.sleep(0.05 * 2 ** attempt)
+        if request:
+            raise UnprocessedKeysError(f"{len(request[table.name]['Keys'])} key(s) still unprocessed "
+                                       f"after {BATCH_GET_ATTEMPTS} attempts")
+    return items
+
+
+def _query_recent_items(table, user_id, limit):
+    """
+    Fetch the `limit` most recent items of a user, newest first.
+
+    Queries the timestamp index backwards from now, bounded to RECENT_WINDOW_DAYS, and reads
+    only `limit` items instead of the whole partition.
+    """
+    since = (datetime.utcnow() - timedelta(days=RECENT_WINDOW_DAYS)).isoformat() + "Z"
+    items = []
+    kwargs = {
+        'IndexName': RECENT_INDEX_NAME,
+        'KeyConditionExpression': Key('userId').eq(user_id) & Key('timestamp').gte(since),
+        'ScanIndexForward': False,
+    }
+    while len(items) < limit:
+        # A page also ends at 1 MB, before the limit is reached
+        response = table.query(Limit=limit - len(items), **kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
+
+
+def _respond(payload, cors_headers, request_headers):
+    """
+    Build a 200 response with an ETag, or an empty 304 when the client already has this payload.
+
+    Pollers send back the ETag of their last response in If-None-Match, unchanged statuses then
+    cost no body transfer.
+    """
+    body = json.dumps(payload, default=_json_default, sort_keys=True)
+    etag = '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+    headers = {**cors_headers, 'ETag': etag}
+    # API Gateway does not normalize the case of header names
+    if_none_match = {k.lower(): v for k, v in (request_headers or {}).items()}.get('if-none-match')
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
+
 
 def lambda_handler(event, context):
     """
     Handles API Gateway requests to check the processing status of a file.
 
-    This function supports three main operations:
+    This function supports the following operations:
     1.  CORS preflight (OPTIONS): Responds to browser preflight requests.
     2.  Health Check (GET /status): A simple, unauthenticated check to verify
         that the API and Lambda are operational. Triggered by a GET request
         with no query string parameters.
     3.  Status Lookup (GET /status?userId=...&fileId=...): Fetches and returns
-        the status of a specific file for a given user from DynamoDB.
+        the status of a specific file for a given user from DynamoDB, including
+        the ingest progress (percent) and per-stage wall time and peak memory.
+    4.  Batched Lookup (GET /status?userId=...&fileIds=a,b,c): Fetches up to 100
+        files of a user in one BatchGetItem call. Returns {"items": [...], "missing": [...]},
+        or a 503 when DynamoDB keeps throttling some of the keys.
+    5.  Recent Files (GET /status?userId=...&recent=N): Returns the N (default 20,
+        at most 100) most recent files of a user, from a limited query on the
+        timestamp index (RECENT_INDEX_NAME).
+
+    Every lookup response carries an ETag; requests sending it back in If-None-Match
+    get an empty 304 when nothing changed.
 
     Args:
         event (dict): The event dict from API Gateway, containing the HTTP method,
@@ -32,8 +141,9 @@ def lambda_handler(event, context):
     # Define standard CORS headers for all responses to ensure browser compatibility.
     cors_headers = {
         'Access-Control-Allow-Origin': '*',  # Best practice: Restrict to your frontend's domain in production.
-        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,OPTIONS',
+        'Access-Control-Expose-Headers': 'ETag',
         'Content-Type': 'application/json'
     }
 
@@ -61,12 +171,41 @@ def lambda_handler(event, context):
         # Validate that the required parameters are present in the request.
         user_id = params.get('userId')
         file_id = params.get('fileId')
-        if not user_id or not file_id:
+        file_ids = [f for f in (params.get('fileIds') or '').split(',') if f]
+        recent = params.get('recent')
+        if not user_id or not (file_id or file_ids or recent is not None):
             return {
                 'statusCode': 400,
                 'headers': cors_headers,
-                'body': json.dumps({'error': 'Missing required query parameters: userId and fileId'})
+                'body': json.dumps({'error': 'Missing required query parameters: userId and one of fileId, '
+                                             'fileIds or recent'})
+            }
+
+        if file_ids:
+            # Deduplicate while keeping the requested order
+            file_ids = list(dict.fromkeys(file_ids))
+            if len(file_ids) > MAX_FILE_IDS:
+                return {
+                    'statusCode': 400,
+                    'headers': cors_headers,
+                    'body': json.dumps({'error': f'At most {MAX_FILE_IDS} fileIds per request'})
+                }
+            found = {item['fileId']: item for item in _batch_get_items(table, user_id, file_ids)}
+            print(f"Successfully fetched {len(found)}/{len(file_ids)} statuses for userId: {user_id}")
+            payload = {
+                'items': [found[f] for f in file_ids if f in found],
+                'missing': [f for f in file_ids if f not in found],
             }
+            return _respond(payload, cors_headers, event.get('headers'))
+
+        if recent is not None and not file_id:
+            try:
+                limit = min(int(recent or DEFAULT_RECENT), MAX_RECENT)
+            except ValueError:
+                limit = DEFAULT_RECENT
+            items = _query_recent_items(table, user_id, limit)
+            print(f"Successfully fetched {len(items)} recent statuses for userId: {user_id}")
+            return _respond({'items': items}, cors_headers, event.get('headers'))
 
         # Fetch the item from the DynamoDB table using the provided keys.
         response = table.get_item(
@@ -79,12 +218,16 @@ def lambda_handler(event, context):
         print(f"Successfully fetched status for userId: {user_id}, fileId: {file_id}")
 
         # Return the DynamoDB item, or an empty object if not found.
+        return _respond(response.get('Item', {}), cors_headers, event.get('headers'))
+
+    except UnprocessedKeysError as e:
+        # Throttled: the client retries rather than seeing the files as missing
+        print(f"DynamoDB throttling: {e}")
         return {
-            'statusCode': 200,
-            'headers': cors_headers,
-            'body': json.dumps(response.get('Item', {}))
+            'statusCode': 503,
+            'headers': {**cors_headers, 'Retry-After': '1'},
+            'body': json.dumps({'error': 'The status table is busy, retry shortly.'})
         }
-
     except ClientError as e:
         # Handle potential errors from the DynamoDB service itself.
         error_message = e.response['Error']['Message']
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The dashboard is imported from the repository root, the ingest Lambda's modules are top level
+sys.path[:0] = [ROOT, os.path.join(ROOT, "lambda_process_uploads")]
+
+
+class DictCache:
+    """In-memory stand-in for the Flask-Caching object given to callbacks.utils.set_cache."""
+
+    def __init__(self):
+        self.data = {}
+        self.timeouts = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+        self.timeouts[key] = timeout
+
+
+@pytest.fixture
+def memo_cache(tmp_path, monkeypatch):
+    """Initialize the cache used by callbacks.utils.memoize, with lock files under tmp_path."""
+    pytest.importorskip("pandas")
+    pytest.importorskip("dash")
+    from callbacks import utils
+
+    cache = DictCache()
+    monkeypatch.setattr(utils, "cache", cache)
+    monkeypatch.setattr(utils, "SINGLE_FLIGHT_DIR", str(tmp_path / "locks"))
+    return cache
+
+
+def load_template(name):
+    import json
+    with open(os.path.join(ROOT, "resources", "benchmark_templates", f"{name}.json")) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def local_s3(monkeypatch):
+    """
+    The ingest Lambda against a local S3 and DynamoDB (moto's server, as in the benchmarks).
+
+    Yields an S3 client on the bucket; the status table exists and the Lambda's clients
+    and per-container caches are reset.
+    """
+    pytest.importorskip("moto.server")
+    pytest.importorskip("pandas")
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    try:
+        import fixtures
+    finally:
+        sys.path.remove(os.path.join(ROOT, "benchmarks"))
+    import boto3
+    import lambda_function
+
+    for name in ("_s3", "_table", "_arrow_s3"):
+        monkeypatch.setattr(lambda_function, name, None)
+    monkeypatch.setattr(lambda_function, "_zip_cache", {})
+    monkeypatch.setattr(lambda_function, "_job_cache", {})
+    with fixtures.local_s3() as s3:
+        boto3.client("dynamodb").create_table(
+            TableName=os.environ["TABLE_NAME"],
+            KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}, {"AttributeName": "fileId", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"},
+                                  {"AttributeName": "fileId", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        try:
+            yield s3
+        finally:
+            # moto's state is per Python process, not per server
+            import urllib.request
+            urllib.request.urlopen(urllib.request.Request(f"{os.environ['AWS_ENDPOINT_URL']}/moto-api/reset",
+                                                          method="POST"))
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("dash")
+
+from pyarrow import fs  # noqa: E402
+
+from compaction import RECEIVER_INDEX_KEY, compact, compact_name  # noqa: E402
+from callbacks import utils  # noqa: E402
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Three receivers; slip is int64 in the first file only, and the last one has two row groups."""
+    frames = {
+        "r1": pd.DataFrame({"t": [0.0, 1.0], "slip": [0, 1]}),
+        "r2": pd.DataFrame({"t": [0.0, 1.0], "slip": [0.5, 1.5]}),
+        "r3": pd.DataFrame({"t": [0.0, 1.0, 2.0, 3.0], "slip": [2.0, 3.0, 4.0, 5.0]}),
+    }
+    paths = []
+    for receiver, df in frames.items():
+        path = tmp_path / f"{receiver}.parquet"
+        df.to_parquet(path, index=False, row_group_size=2)
+        paths.append((receiver, str(path)))
+    return paths
+
+
+def test_compact_name():
+    assert compact_name("Body: elastic (seafloor)") == "body_elastic_seafloor.parquet"
+
+
+def test_mixed_dtypes_are_promoted_to_float(sources, tmp_path):
+    output = tmp_path / "compact.parquet"
+    compact(sources, str(output))
+    table = pq.read_table(output)
+    assert str(table.schema.field("slip").type) == "double"
+    assert table.column("slip").to_pylist() == [0.0, 1.0, 0.5, 1.5, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_receiver_footer_index(sources, tmp_path):
+    output = tmp_path / "compact.parquet"
+    index = compact(sources, str(output))
+    assert index == {"r1": [0], "r2": [1], "r3": [2, 3]}
+    parquet_file = pq.ParquetFile(output)
+    assert json.loads(parquet_file.schema_arrow.metadata[RECEIVER_INDEX_KEY]) == index
+    assert parquet_file.read_row_group(3).column("receiver").to_pylist() == ["r3", "r3"]
+
+
+def test_get_receivers_reads_the_compact_file(sources, tmp_path, monkeypatch, memo_cache):
+    folder = tmp_path / "public_ds" / "bp1-qd" / "codeA_v1" / "compact"
+    folder.mkdir(parents=True)
+    compact(sources, str(folder / compact_name("Time series")))
+    monkeypatch.setattr(utils, "get_arrow_s3", lambda: fs.LocalFileSystem())
+
+    frames = utils.get_receivers(str(tmp_path), "bp1-qd", "codeA_v1", "Time series", ["r3", "r*", "missing"])
+    assert sorted(frames) == ["r*", "r3"]
+    assert frames["r3"]["slip"].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert list(frames["r3"].columns) == ["t", "slip"]
+    # A pattern gets the rows of every receiver it matches
+    assert len(frames["r*"]) == 8
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from conftest import load_template
+
+pytest.importorskip("pandas")
+pytest.importorskip("dash")
+
+from callbacks import utils  # noqa: E402
+
+BP1_QD = load_template("bp1-qd")
+
+
+def test_catalog_of_a_wildcard_receiver_is_read_from_the_published_name(memo_cache, monkeypatch):
+    file_spec = next(file for file in BP1_QD["files"] if "events" in file)
+    receiver = file_spec["list_of_receivers"][0]
+    published = receiver.replace("*", "codeA_")
+    read = []
+
+    def read_s3_object(bucket_name, s3_key):
+        read.append(s3_key)
+        return json.dumps({"events": []}).encode("utf-8")
+
+    monkeypatch.setattr(utils, "get_available_receivers", lambda bucket_name, benchmark_pb, dataset_name: [published])
+    monkeypatch.setattr(utils, "read_s3_object", read_s3_object)
+
+    assert utils.get_event_catalog("?benchmark_id=bp1-qd", "codeA_v1", receiver) == {"events": []}
+    assert read == [f"public_ds/bp1-qd/codeA_v1/events/{published}.json"]
@@ -0,0 +1,38 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from events import detect_events  # noqa: E402
+
+
+def test_events_with_their_peaks():
+    t = np.arange(10.0)
+    values = [0, 2, 5, 3, 0, 0, 4, 4, 1, 0]
+    assert detect_events(t, values, threshold=2) == [
+        {"onset": 1.0, "end": 3.0, "duration": 2.0, "peak_time": 2.0, "peak": 5.0},
+        # Ties: the first sample reaching the peak
+        {"onset": 6.0, "end": 7.0, "duration": 1.0, "peak_time": 6.0, "peak": 4.0},
+    ]
+
+
+def test_no_event_and_min_duration():
+    t = np.arange(6.0)
+    assert detect_events(t, [0, 1, 0, 1, 0, 0], threshold=2) == []
+    events = detect_events(t, [3, 0, 3, 3, 3, 0], threshold=2, min_duration=1.5)
+    assert [(e["onset"], e["end"]) for e in events] == [(2.0, 4.0)]
+
+
+def test_event_running_to_the_last_sample():
+    events = detect_events(np.arange(4.0), [0, 0, 3, 5], threshold=2)
+    assert [(e["onset"], e["end"], e["peak"]) for e in events] == [(2.0, 3.0, 5.0)]
+
+
+def test_nan_samples_between_and_inside_events():
+    t = np.arange(10.0)
+    values = [3, 4, np.nan, np.nan, 0, 6, np.nan, 5, 7, np.nan]
+    events = detect_events(t, values, threshold=2)
+    assert [(e["onset"], e["end"], e["peak_time"], e["peak"]) for e in events] == [
+        (0.0, 1.0, 1.0, 4.0),
+        (5.0, 5.0, 5.0, 6.0),
+        (7.0, 8.0, 8.0, 7.0),
+    ]
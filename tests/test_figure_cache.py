@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("dash")
+diskcache = pytest.importorskip("diskcache")
+
+from callbacks import figure_cache, utils  # noqa: E402
+
+
+@pytest.fixture
+def versions(tmp_path, monkeypatch):
+    """A figure store on disk, and the published version of each dataset."""
+    store = diskcache.Cache(str(tmp_path / "figures"))
+    figure_cache.set_store(store)
+    versions = {"codeA_v1": '"a1"', "codeB_v1": '"b1"'}
+    monkeypatch.setattr(utils, "get_dataset_version", lambda benchmark_pb, name: versions.get(name))
+    yield versions
+    figure_cache.set_store(None)
+    store.close()
+
+
+def spec(**options):
+    return figure_cache.view_spec("?benchmark_id=bp1-qd", "template:bp1-qd:abc", "Time series", "time",
+                                  ["codeA_v1", "codeB_v1"], "rcv1", **options)
+
+
+def test_round_trip(versions):
+    import plotly.graph_objects as go
+
+    outputs = [go.Figure(go.Scatter(x=[0, 1], y=[2, 3])).to_dict(), {"display": "block"}]
+    assert figure_cache.get(spec()) is None
+    figure_cache.put(spec(), outputs)
+    cached = figure_cache.get(spec())
+    assert cached[0]["data"][0]["y"] == [2, 3] and cached[1] == {"display": "block"}
+
+
+def test_republished_dataset_misses(versions):
+    figure_cache.put(spec(), [{}])
+    versions["codeB_v1"] = '"b2"'
+    assert figure_cache.get(spec()) is None
+
+
+def test_new_template_token_misses(versions):
+    figure_cache.put(spec(), [{}])
+    other = figure_cache.view_spec("?benchmark_id=bp1-qd", "template:bp1-qd:def", "Time series", "time",
+                                   ["codeA_v1", "codeB_v1"], "rcv1")
+    assert figure_cache.get(other) is None
+
+
+def test_options_are_normalized(versions):
+    # Options that do not apply are passed as None and dropped
+    assert spec(slider=None, colorbar_min=None) == spec()
+    # Floats are rounded, so the same view reached through different paths shares its key
+    figure_cache.put(spec(slider=1500.0000001), [{}])
+    assert figure_cache.get(spec(slider=1500.0)) == [{}]
+    assert figure_cache.get(spec(slider=1500.1)) is None
+
+
+def test_dataset_order_is_part_of_the_key(versions):
+    reordered = figure_cache.view_spec("?benchmark_id=bp1-qd", "template:bp1-qd:abc", "Time series", "time",
+                                       ["codeB_v1", "codeA_v1"], "rcv1")
+    assert figure_cache._key(reordered) != figure_cache._key(spec())
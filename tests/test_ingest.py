@@ -0,0 +1,172 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("boto3")
+
+import lambda_function  # noqa: E402
+
+BUCKET = "benchmark-vv-data"
+ZIP_KEY = "upload/bp9/codeA_v1.zip"
+GRID = {"x": {"min": 0.0, "max": 3.0, "n": 4}, "y": {"min": 0.0, "max": 3.0, "n": 4}, "method": "nearest"}
+TEMPLATE = {
+    "files": [
+        {"name": "Time series", "prefix": "rec", "file_type": "dat", "graph_type": "timeseries",
+         "var_list": [{"name": "t"}, {"name": "slip"}]},
+        {"name": "Sea surface", "prefix": "surf", "file_type": "dat", "graph_type": "surface",
+         "var_list": [{"name": "x"}, {"name": "y"}, {"name": "eta"}], "grid": GRID},
+    ],
+}
+
+
+def time_series(scale):
+    return "# code = codeA\nt slip\n" + "".join(f"{t} {t * scale}\n" for t in range(50))
+
+
+def surface(scale):
+    return "x y eta\n" + "".join(f"{x} {y} {(x + y) * scale}\n" for x in range(4) for y in range(4))
+
+
+MEMBERS = {"out/rec_a.dat": time_series(1.0), "out/rec_b.dat": time_series(2.0), "out/surf_1.dat": surface(1.0)}
+
+
+def upload(s3, members=MEMBERS, template=TEMPLATE):
+    s3.put_object(Bucket=BUCKET, Key="benchmark_templates/bp9.json", Body=json.dumps(template))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_obj:
+        for name, text in members.items():
+            zip_obj.writestr(name, text)
+    s3.put_object(Bucket=BUCKET, Key=ZIP_KEY, Body=buffer.getvalue(), Metadata={"userid": "user-1"})
+
+
+def process(**kwargs):
+    return lambda_function.process_zip(BUCKET, ZIP_KEY, "bp9", "codeA", "v1", **kwargs)
+
+
+def read_json(s3, key):
+    return json.loads(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read())
+
+
+def read_parquet(s3, key):
+    return pd.read_parquet(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()))
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(lambda_function.time, "sleep", lambda seconds: None)
+
+
+def test_conditional_update_retries_after_a_concurrent_write(local_s3, no_backoff):
+    key = "public_ds/bp9/codeA_v1/manifest.json"
+    local_s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"files": {}}))
+    calls = []
+
+    def add(document):
+        calls.append(dict(document["files"]))
+        if len(calls) == 1:
+            # Another map task publishes its file between our read and our write
+            local_s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"files": {"b": 2}}))
+        document["files"]["a"] = 1
+        return document
+
+    lambda_function.update_json(local_s3, key, add)
+    assert calls == [{}, {"b": 2}]
+    assert read_json(local_s3, key) == {"files": {"a": 1, "b": 2}}
+
+
+def test_conditional_create_retries_when_the_object_appears(local_s3, no_backoff):
+    key = "public_ds/bp9/codeA_v1/metadata.json"
+    seen = []
+
+    def add(document):
+        seen.append(document)
+        if document is None:
+            local_s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"processed_files": ["b"]}))
+            return {"processed_files": ["a"]}
+        return {"processed_files": document["processed_files"] + ["a"]}
+
+    lambda_function.update_json(local_s3, key, add)
+    assert seen == [None, {"processed_files": ["b"]}]
+    assert read_json(local_s3, key) == {"processed_files": ["b", "a"]}
+
+
+def test_conditional_update_gives_up_after_its_attempts(local_s3, no_backoff):
+    key = "public_ds/bp9/codeA_v1/manifest.json"
+    local_s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"n": 0}))
+
+    def always_conflicting(document):
+        local_s3.put_object(Bucket=BUCKET, Key=key, Body=json.dumps({"n": document["n"] + 1}))
+        return document
+
+    with pytest.raises(RuntimeError, match="3 conflicting writes"):
+        lambda_function.update_json(local_s3, key, always_conflicting, attempts=3)
+    # Only the concurrent writer's updates landed
+    assert read_json(local_s3, key) == {"n": 3}
+
+
+def test_files_are_published_before_the_job_completes(local_s3):
+    upload(local_s3)
+    published = []
+
+    def on_progress(percent):
+        manifest = read_json(local_s3, "public_ds/bp9/codeA_v1/manifest.json")
+        metadata = read_json(local_s3, "public_ds/bp9/codeA_v1/metadata.json")
+        published.append((percent, manifest["complete"], sorted(manifest["files"]),
+                          sorted(metadata["processed_files"])))
+
+    process(on_progress=on_progress)
+    assert published[0] == (33, False, ["out/rec_a.dat"], ["out/rec_a.dat"])
+    assert published[-1] == (100, False, sorted(MEMBERS), sorted(MEMBERS))
+    manifest = read_json(local_s3, "public_ds/bp9/codeA_v1/manifest.json")
+    assert manifest["complete"] and sorted(manifest["files"]) == sorted(MEMBERS)
+    assert read_json(local_s3, "public_ds/bp9/codeA_v1/metadata.json")["rec"] == {"code": "codeA"}
+
+
+def test_partial_documents_of_another_job_are_reset(local_s3):
+    prefix = "public_ds/bp9/codeA_v1/"
+    local_s3.put_object(Bucket=BUCKET, Key=prefix + "manifest.json", Body=json.dumps(
+        {"job_id": "old", "complete": True, "files": {"out/rec_b.dat": {"hash": "h"}}, "compact": {}}))
+    local_s3.put_object(Bucket=BUCKET, Key=prefix + "metadata.json", Body=json.dumps(
+        {"job_id": "old", "processed_files": ["out/rec_b.dat", "out/gone.dat"]}))
+    job = {"job_id": "new", "output_prefix": prefix, "user_metadata": {}}
+    result = {"file": "out/rec_a.dat", "prefix": "rec", "header": {"code": "codeA"},
+              "manifest_entry": {"hash": "a"}}
+
+    lambda_function.publish_partial(job, result)
+    manifest = read_json(local_s3, prefix + "manifest.json")
+    assert (manifest["job_id"], manifest["complete"]) == ("new", False)
+    # Entries of outputs still published are kept
+    assert manifest["files"] == {"out/rec_b.dat": {"hash": "h"}, "out/rec_a.dat": {"hash": "a"}}
+    assert read_json(local_s3, prefix + "metadata.json") == {
+        "processed_files": ["out/rec_a.dat"], "complete": False, "job_id": "new", "rec": {"code": "codeA"}}
+
+
+def test_unchanged_members_are_skipped(local_s3):
+    upload(local_s3)
+    assert process() == {"processed": 3, "unchanged": 0}
+    assert process() == {"processed": 0, "unchanged": 3}
+
+    # A changed member is converted again, the others are kept
+    upload(local_s3, {**MEMBERS, "out/rec_b.dat": time_series(3.0)})
+    assert process() == {"processed": 1, "unchanged": 2}
+    assert read_parquet(local_s3, "public_ds/bp9/codeA_v1/rec_b.parquet")["slip"].iloc[1] == 3.0
+
+
+def test_changed_template_grid_is_regridded(local_s3):
+    upload(local_s3)
+    process()
+    template = json.loads(json.dumps(TEMPLATE))
+    template["files"][1]["grid"]["x"]["n"] = 7
+    upload(local_s3, template=template)
+    assert process() == {"processed": 1, "unchanged": 2}
+    assert len(read_parquet(local_s3, "public_ds/bp9/codeA_v1/surf_1.parquet")) == 7 * 4
+
+
+def test_new_pipeline_version_reprocesses_everything(local_s3, monkeypatch):
+    upload(local_s3)
+    process()
+    monkeypatch.setattr(lambda_function, "PIPELINE_VERSION", lambda_function.PIPELINE_VERSION + ".test")
+    assert process() == {"processed": 3, "unchanged": 0}
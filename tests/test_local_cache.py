@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import DictCache
+
+pytest.importorskip("pandas")
+pytest.importorskip("dash")
+
+from callbacks import utils  # noqa: E402
+
+
+class CountingCache(DictCache):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+def test_hits_are_served_from_memory():
+    shared = CountingCache()
+    cache = utils.LocalCache(shared, max_entries=2)
+    cache.set("a", [1])
+    assert cache.get("a") == [1]
+    assert shared.gets == 0
+    assert shared.timeouts["a"] == 3600
+
+
+def test_entries_of_other_processes_are_found():
+    shared = CountingCache()
+    utils.LocalCache(shared).set("a", [1], timeout=60)
+    cache = utils.LocalCache(shared)
+    assert cache.get("a") == [1]
+    assert cache.get("a") == [1]
+    assert shared.gets == 1
+    # Written without the layer: a miss rather than a wrongly unpacked value
+    shared.set("b", (1, 2))
+    assert cache.get("b") is None
+
+
+def test_memory_copies_expire_with_the_shared_entry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "time", lambda: now[0])
+    shared = CountingCache()
+    writer = utils.LocalCache(shared)
+    writer.set("a", [1], timeout=60)
+    now[0] += 30
+    reader = utils.LocalCache(shared)
+    assert reader.get("a") == [1]
+    now[0] += 31
+    # Expired in memory: looked up again in the shared cache (which would have dropped it)
+    shared.data.clear()
+    assert reader.get("a") is None and writer.get("a") is None
+
+
+def test_least_recently_used_entries_are_dropped():
+    shared = CountingCache()
+    cache = utils.LocalCache(shared, max_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+    assert list(cache._items) == ["b", "c"]
+    assert cache.get("a") == "a" and shared.gets == 1
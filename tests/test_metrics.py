@@ -0,0 +1,28 @@
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from callbacks import metrics  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    server = flask.Flask(__name__)
+    metrics.register_metrics(server)
+    return server.test_client()
+
+
+def test_direct_scrapes_are_answered(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+
+
+def test_requests_through_the_load_balancer_need_the_token(client, monkeypatch):
+    forwarded = {"X-Forwarded-For": "203.0.113.7"}
+    assert client.get("/metrics", headers=forwarded).status_code == 404
+    assert client.get("/metrics", headers={**forwarded, "Authorization": "Bearer wrong"}).status_code == 404
+    assert client.get("/metrics", headers={**forwarded, "Authorization": "Bearer s3cret"}).status_code == 200
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    assert client.get("/metrics", headers={**forwarded, "Authorization": "Bearer None"}).status_code == 404
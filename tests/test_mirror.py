@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("flask")
+
+from callbacks import mirror  # noqa: E402
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """An S3 object as seen by read_through: its current data and ETag, and the calls made."""
+    monkeypatch.setattr(mirror, "LOCAL_MIRROR_DIR", str(tmp_path / "mirror"))
+    monkeypatch.setattr(mirror, "LOCAL_MIRROR_VALIDATE_SECONDS", 60)
+
+    class Source:
+        df, etag, loads, heads = pd.DataFrame({"t": [0.0, 1.0], "slip": [1.0, 2.0]}), '"v1"', 0, 0
+
+        def load(self):
+            self.loads += 1
+            return self.df.copy()
+
+        def head_etag(self):
+            self.heads += 1
+            return self.etag
+
+        def read(self, key="public_ds/bp1-qd/a/r.parquet"):
+            return mirror.read_through("bucket", key, self.load, self.head_etag)
+
+    return Source()
+
+
+def _age(key, seconds):
+    """Make the last validation of a mirrored file `seconds` old."""
+    meta = mirror._base_path("bucket", key) + mirror.META_SUFFIX
+    os.utime(meta, (os.path.getmtime(meta) - seconds,) * 2)
+
+
+def test_hit_within_the_validation_period(source):
+    pd.testing.assert_frame_equal(source.read(), source.df)
+    pd.testing.assert_frame_equal(source.read(), source.df)
+    assert (source.loads, source.heads) == (1, 1)
+
+
+def test_unchanged_object_is_revalidated_with_its_etag(source):
+    source.read()
+    _age("public_ds/bp1-qd/a/r.parquet", 120)
+    pd.testing.assert_frame_equal(source.read(), source.df)
+    assert (source.loads, source.heads) == (1, 2)
+    # Validated again: served without a HEAD request for another period
+    source.read()
+    assert source.heads == 2
+
+
+def test_changed_object_is_reloaded(source):
+    source.read()
+    _age("public_ds/bp1-qd/a/r.parquet", 120)
+    source.df, source.etag = pd.DataFrame({"t": [0.0], "slip": [5.0]}), '"v2"'
+    pd.testing.assert_frame_equal(source.read(), source.df)
+    assert source.loads == 2
+    # The ETag is stored with the data it was loaded with
+    table = mirror._open(mirror._base_path("bucket", "public_ds/bp1-qd/a/r.parquet"))
+    assert table.schema.metadata[mirror.ETAG_KEY] == b'"v2"'
+
+
+def test_evict_removes_the_least_recently_read(source):
+    keys = [f"public_ds/bp1-qd/a/r{i}.parquet" for i in range(3)]
+    for i, key in enumerate(keys):
+        source.read(key)
+        os.utime(mirror._base_path("bucket", key) + mirror.DATA_SUFFIX, (1000 + i,) * 2)
+    # Read again: most recently used
+    source.read(keys[0])
+    size = os.path.getsize(mirror._base_path("bucket", keys[0]) + mirror.DATA_SUFFIX)
+
+    mirror.evict(max_bytes=2 * size)
+    present = [os.path.exists(mirror._base_path("bucket", key) + mirror.DATA_SUFFIX) for key in keys]
+    assert present == [True, False, True]
+    assert not os.path.exists(mirror._base_path("bucket", keys[1]) + mirror.META_SUFFIX)
+
+
+def test_disabled_mirror_always_loads(source, monkeypatch):
+    monkeypatch.setattr(mirror, "LOCAL_MIRROR_DIR", "")
+    source.read()
+    source.read()
+    assert (source.loads, source.heads) == (2, 0)
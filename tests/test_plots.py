@@ -0,0 +1,30 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("plotly")
+pytest.importorskip("matplotlib")
+
+
+def surface_df(n, dataset_name):
+    x, y = np.meshgrid(np.linspace(0.0, 1.0e3, n), np.linspace(-5.0e2, 5.0e2, n))
+    return pd.DataFrame({"x": x.ravel(), "y": y.ravel(), "eta": (x + 2 * y).ravel(), "dataset_name": dataset_name})
+
+
+def test_raster_hover_mesh_carries_the_grid_values():
+    import plotly.graph_objects as go
+    from callbacks import plots
+
+    # Indexed per dataset, like get_df
+    df = pd.concat([surface_df(301, "codeA_v1_rec1"), surface_df(51, "codeB_v1_rec1")])
+    variable = {"name": "eta", "unit": "m", "description": "Sea surface"}
+    fig, _ = plots.main_surface_plot_dynamic_v2(df, go.Figure(), variable, "raster", 0, False, -1.0e3, 1.0e3)
+
+    meshes = [trace for trace in fig.data if isinstance(trace, go.Heatmap)]
+    assert [mesh.name for mesh in meshes] == ["codeA_v1_rec1", "codeB_v1_rec1"]
+    for mesh in meshes:
+        x, y, z = np.asarray(mesh.x), np.asarray(mesh.y), np.asarray(mesh.z)
+        assert len(x) <= plots.RASTER_HOVER_CELLS and len(y) <= plots.RASTER_HOVER_CELLS
+        # Each cell holds the value of the grid node it is centred on
+        np.testing.assert_allclose(z, x[None, :] + 2 * y[:, None], rtol=1e-6)
+        assert "%{z" in mesh.hovertemplate
@@ -0,0 +1,57 @@
+import io
+import zipfile
+
+from preflight import check_members, inspect_member, summarize
+
+SPEC = {"var_list": [{"name": "Time"}, {"name": "u"}, {"name": "v"}]}
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_obj:
+        for name, data in members.items():
+            zip_obj.writestr(name, data)
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+
+def test_valid_file_with_a_row_estimate():
+    rows = "".join(f"{i}.0 1.5 -2.5\n" for i in range(1000))
+    zip_obj = _zip({"a.dat": "# header\n\nTime u v\n" + rows})
+    report = inspect_member(zip_obj, "a.dat", SPEC, n_bytes=1024)
+    assert report["valid"] and "error" not in report
+    # Estimated from the rows of the first KB only
+    assert abs(report["estimated_rows"] - 1000) < 100
+
+
+def test_invalid_files():
+    zip_obj = _zip({
+        "empty.dat": "",
+        "columns.dat": "Time u w\n0 1 2\n",
+        "count.dat": "Time u v\n0 1\n",
+        "text.dat": "Time u v\n0 one 2\n",
+        "no_rows.dat": "# only a header\nTime u v\n",
+        "binary.dat": b"\xff\xfe\x00\x01",
+    })
+    errors = {name: inspect_member(zip_obj, name, SPEC)["error"] for name in zip_obj.namelist()}
+    assert errors["empty.dat"] == "empty file"
+    assert errors["columns.dat"] == "expected columns ['time', 'u', 'v'], found ['time', 'u', 'w']"
+    assert errors["count.dat"] == "first data row has 2 values for 3 columns"
+    assert errors["text.dat"].startswith("first data row is not numeric")
+    assert errors["no_rows.dat"] == "no data rows"
+    assert errors["binary.dat"] == "not a UTF-8 text file"
+
+
+def test_multibyte_character_cut_by_the_read():
+    # "é" is two bytes, the read stops between them
+    zip_obj = _zip({"a.dat": ("# é\n" * 3 + "Time u v\n0 1 2\n").encode("utf-8")})
+    assert inspect_member(zip_obj, "a.dat", SPEC, n_bytes=3)["error"] == "no column line in the first 0 KB"
+    assert inspect_member(zip_obj, "a.dat", SPEC)["valid"]
+
+
+def test_summary_lists_invalid_files_first():
+    zip_obj = _zip({"good.dat": "Time u v\n0 1 2\n", "bad.dat": ""})
+    reports = check_members(zip_obj, [(SPEC, "good.dat"), (SPEC, "bad.dat")])
+    summary = summarize(reports, limit=1)
+    assert (summary["valid"], summary["invalid"], summary["truncated"]) == (1, 1, True)
+    assert [report["file"] for report in summary["files"]] == ["bad.dat"]
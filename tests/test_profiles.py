@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def source(memo_cache, monkeypatch):
+    """Dataset versions and grid loads seen by callbacks.profiles, with every grid a plane."""
+    from callbacks import profiles, utils
+
+    versions = {"codeA_v1": '"a1"', "codeB_v1": '"b1"'}
+    loads = []
+
+    def get_surface_grid(benchmark_id, file_name, receiver, variable):
+        loads.append(file_name)
+        return plane_grid()
+
+    monkeypatch.setattr(utils, "get_dataset_version", lambda benchmark_pb, name: versions.get(name))
+    monkeypatch.setattr(utils, "get_surface_grid", get_surface_grid)
+    monkeypatch.setattr(profiles, "_recent_grids", type(profiles._recent_grids)())
+    return SimpleNamespace(versions=versions, loads=loads)
+
+
+def plane_grid():
+    x = np.linspace(0.0, 10.0, 11)
+    y = np.linspace(0.0, 5.0, 6)
+    X, Y = np.meshgrid(x, y)
+    return x, y, 2.0 * X - Y + 1.0
+
+
+def test_bilinear_is_exact_on_a_plane_and_nan_outside():
+    from callbacks.profiles import bilinear
+
+    x, y, z = plane_grid()
+    xs = np.array([0.0, 2.5, 9.99, 10.0, 11.0])
+    ys = np.array([0.0, 1.25, 4.5, 5.0, 1.0])
+    values = bilinear(x, y, np.stack([z, 2 * z]), xs, ys)
+    expected = 2.0 * xs - ys + 1.0
+    np.testing.assert_allclose(values[0, :4], expected[:4])
+    np.testing.assert_allclose(values[1, :4], 2 * expected[:4])
+    assert np.isnan(values[:, 4]).all()
+
+
+def test_polyline_samples_follow_the_vertices():
+    from callbacks.profiles import line_samples, normalize_line
+
+    x, y, _ = plane_grid()
+    line = normalize_line("polyline", points=[(0.4, 0.0), (3.0, 0.0), (3.0, 4.0)])
+    assert line == ("polyline", ((0.0, 0.0), (3.0, 0.0), (3.0, 4.0)))
+    distance, xs, ys = line_samples(line, x, y, n_samples=8)
+    np.testing.assert_allclose(distance, np.linspace(0.0, 7.0, 8))
+    np.testing.assert_allclose(xs, [0, 1, 2, 3, 3, 3, 3, 3])
+    np.testing.assert_allclose(ys, [0, 0, 0, 0, 1, 2, 3, 4])
+
+
+def test_one_cache_entry_per_request(source, memo_cache):
+    from callbacks import profiles
+
+    line = profiles.normalize_line("x", value=2.0)
+    result = profiles.get_profiles("?benchmark_id=ttpv1", ["codeA_v1", "codeB_v1"], 1, "eta", line)
+    assert list(result) == ["codeA_v1", "codeB_v1"]
+    np.testing.assert_allclose(result["codeA_v1"][1], 5.0 - np.linspace(0.0, 5.0, 6))
+    assert len([key for key in memo_cache.data if key.startswith("profiles_")]) == 1
+
+    profiles.get_profiles("?benchmark_id=ttpv1", ["codeA_v1", "codeB_v1"], 1, "eta", line)
+    assert source.loads == ["codeA_v1", "codeB_v1"]
+
+
+def test_republished_dataset_is_sampled_again(source):
+    from callbacks import profiles
+
+    line = profiles.normalize_line("y", value=1.0)
+    profiles.get_profiles("?benchmark_id=ttpv1", ["codeA_v1"], 1, "eta", line)
+    source.versions["codeA_v1"] = '"a2"'
+    profiles.get_profiles("?benchmark_id=ttpv1", ["codeA_v1"], 1, "eta", line)
+    assert source.loads == ["codeA_v1", "codeA_v1"]
@@ -0,0 +1,84 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+import regrid  # noqa: E402
+
+
+def test_average_duplicates_matches_groupby_mean():
+    df = pd.DataFrame({
+        "x": [1.0, 0.0, 1.0, 0.0, 2.0],
+        "y": [0.0, 0.0, 0.0, 0.0, 1.0],
+        "u": [1.0, 2.0, 3.0, np.nan, 5.0],
+        "v": [10.0, 20.0, 30.0, 40.0, 50.0],
+        "name": ["a", "b", "c", "d", "e"],
+    })
+    result = regrid.average_duplicates(df)
+    expected = df.drop(columns="name").groupby(["x", "y"], as_index=False).mean()
+    assert list(result.columns) == ["x", "y", "u", "v"]
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_average_duplicates_with_tolerance():
+    df = pd.DataFrame({"x": [0.0, 0.001, 1.0], "y": [0.0, -0.001, 0.0], "u": [1.0, 3.0, 5.0]})
+    result = regrid.average_duplicates(df, tolerance=0.01)
+    assert len(result) == 2
+    assert result["u"].tolist() == [2.0, 5.0]
+
+
+def test_average_duplicates_drops_rows_without_coordinates():
+    df = pd.DataFrame({"x": [0.0, np.nan], "y": [0.0, 1.0], "u": [1.0, 2.0]})
+    result = regrid.average_duplicates(df)
+    assert result.to_dict("list") == {"x": [0.0], "y": [0.0], "u": [1.0]}
+
+
+def test_average_duplicates_without_duplicates_is_sorted():
+    df = pd.DataFrame({"x": [1.0, 0.0], "y": [0.0, 0.0], "u": [1.0, 2.0]})
+    result = regrid.average_duplicates(df)
+    assert result["x"].tolist() == [0.0, 1.0]
+    assert result["u"].tolist() == [2.0, 1.0]
+
+
+GRID = {"x": {"min": 0.0, "max": 1.0, "n": 5}, "y": {"min": 0.0, "max": 1.0, "n": 4}}
+
+
+def plane_points():
+    xs, ys = np.meshgrid(np.linspace(-0.5, 1.5, 9), np.linspace(-0.5, 1.5, 9))
+    df = pd.DataFrame({"x": xs.ravel(), "y": ys.ravel()})
+    df["u"] = 2.0 * df["x"] - 3.0 * df["y"] + 1.0
+    return df
+
+
+def test_linear_regrid_is_exact_on_a_plane():
+    pytest.importorskip("scipy")
+    result = regrid.regrid(plane_points(), dict(GRID, method="linear"))
+    assert len(result) == 20
+    np.testing.assert_allclose(result["u"], 2.0 * result["x"] - 3.0 * result["y"] + 1.0, atol=1e-9)
+
+
+def test_idw_regrid_on_source_points_returns_their_values():
+    pytest.importorskip("scipy")
+    df = plane_points()
+    grid = {"x": {"min": -0.5, "max": 1.5, "n": 9}, "y": {"min": -0.5, "max": 1.5, "n": 9}}
+    result = regrid.regrid(df, grid)
+    merged = result.merge(df, on=["x", "y"], suffixes=("", "_source"))
+    assert len(merged) == len(df)
+    np.testing.assert_allclose(merged["u"], merged["u_source"], atol=1e-9)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError, match="Unknown regridding method"):
+        regrid.method_options({"method": "cubic"})
+
+
+def test_streamed_parquet_matches_in_memory_regrid(tmp_path):
+    pytest.importorskip("scipy")
+    pq = pytest.importorskip("pyarrow.parquet")
+    df = plane_points()
+    path = str(tmp_path / "grid.parquet")
+    regrid.regrid_to_parquet(df, GRID, path, block_rows=3)
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.num_row_groups == 2
+    pd.testing.assert_frame_equal(parquet_file.read().to_pandas(), regrid.regrid(df, GRID))
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture
+def utils(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("dash")
+    from callbacks import utils
+
+    if utils.fcntl is None:
+        pytest.skip("fcntl is not available")
+    monkeypatch.setattr(utils, "SINGLE_FLIGHT_DIR", str(tmp_path / "locks"))
+    return utils
+
+
+def test_nested_keys_do_not_block_each_other(utils):
+    # get_surface_grid holds its key while get_s3_dataset locks its own
+    start = time.monotonic()
+    with utils.single_flight("get_surface_grid:a", wait=2) as outer:
+        with utils.single_flight("get_s3_dataset:b", wait=2) as inner:
+            assert outer and inner
+    assert time.monotonic() - start < 1
+
+
+def test_held_key_times_out(utils):
+    with utils.single_flight("key", wait=1):
+        # Another process holding the key, seen through a second open file
+        assert utils._lock_file("key", time.monotonic() + 0.2) is None
+
+
+def test_prune_lock_files_keeps_recent_and_held(utils):
+    old = utils._lock_file("old", time.monotonic())
+    old.close()
+    os.utime(utils._lock_path("old"), (0, 0))
+    held = utils._lock_file("held", time.monotonic())
+    os.utime(utils._lock_path("held"), (0, 0))
+    recent = utils._lock_file("recent", time.monotonic())
+    recent.close()
+
+    assert utils.prune_lock_files(max_age=60) == 1
+    assert not os.path.exists(utils._lock_path("old"))
+    assert os.path.exists(utils._lock_path("held"))
+    assert os.path.exists(utils._lock_path("recent"))
+    held.close()
+
+
+def test_failed_fetch_is_shared_with_the_waiters(utils, memo_cache):
+    import threading
+
+    calls = []
+
+    @utils.memoize(timeout=3600)
+    def get_s3_dataset(key):
+        calls.append(key)
+        time.sleep(0.2)
+        return None  # The fetch failed
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_s3_dataset("a"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [None] * 4
+    assert calls == ["a"]
+    # Kept for a short time only
+    key = "get_s3_dataset_('a',)_{}"
+    assert isinstance(memo_cache.data[key], utils._NoResult)
+    assert memo_cache.timeouts[key] == utils.FAILURE_CACHE_SECONDS
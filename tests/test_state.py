@@ -0,0 +1,41 @@
+from callbacks import state
+
+
+def test_token_changes_with_the_value():
+    first = state.put("kind", "key", {"a": 1})
+    assert state.put("kind", "key", {"a": 1}) == first
+    second = state.put("kind", "key", {"a": 2})
+    assert second != first
+    assert state.get(first) == {"a": 1} and state.get(second) == {"a": 2}
+
+
+def test_values_not_held_are_reloaded(monkeypatch):
+    monkeypatch.setattr(state, "_objects", type(state._objects)())
+    monkeypatch.setattr(state, "STATE_STORE_SIZE", 2)
+    loaded = []
+    monkeypatch.setitem(state._loaders, "kind", lambda key: loaded.append(key) or {"key": key})
+
+    tokens = [state.put("kind", key, {"key": key}) for key in ["x:1", "y", "z"]]
+    # The least recently used token was evicted, and is rebuilt from its key
+    assert list(state._objects) == tokens[1:]
+    assert state.get(tokens[0]) == {"key": "x:1"}
+    assert loaded == ["x:1"]
+    assert state.get(tokens[0]) == {"key": "x:1"} and loaded == ["x:1"]
+    assert state.get(None) is None
+
+
+def test_changed_or_failed_reloads_read_as_not_loaded(monkeypatch):
+    monkeypatch.setattr(state, "_objects", type(state._objects)())
+    token = state.put("kind", "key", {"v": 1})
+    state._objects.clear()
+
+    # Republished since the token was issued
+    monkeypatch.setitem(state._loaders, "kind", lambda key: {"v": 2})
+    assert state.get(token) is None
+    assert token not in state._objects
+
+    def fail(key):
+        raise ValueError("Error loading benchmark params: NoSuchKey")
+
+    monkeypatch.setitem(state._loaders, "kind", fail)
+    assert state.get(token) is None
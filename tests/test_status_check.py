@@ -0,0 +1,105 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from conftest import ROOT  # noqa: E402
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-west-2")
+    monkeypatch.setenv("TABLE_NAME", "status")
+    # Loaded from its path: the ingest Lambda's modules are on sys.path under other names
+    spec = importlib.util.spec_from_file_location(
+        "status_handler", os.path.join(ROOT, "lambda_status_check", "handler.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module.time, "sleep", lambda seconds: None)
+    return module
+
+
+class FakeTable:
+    name = "status"
+
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+
+    def get_item(self, Key):
+        item = self.items.get(Key["fileId"])
+        return {"Item": item} if item else {}
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        items = sorted(self.items.values(), key=lambda item: item["timestamp"], reverse=True)
+        return {"Items": items[:kwargs["Limit"]]}
+
+
+class FakeDynamoDB:
+    def __init__(self, table, throttled_calls=0):
+        self.table, self.throttled_calls, self.calls = table, throttled_calls, 0
+
+    def Table(self, name):
+        return self.table
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        keys = RequestItems[self.table.name]["Keys"]
+        if self.calls <= self.throttled_calls:
+            return {"Responses": {}, "UnprocessedKeys": RequestItems}
+        found = [self.table.items[k["fileId"]] for k in keys if k["fileId"] in self.table.items]
+        return {"Responses": {self.table.name: found}}
+
+
+ITEMS = {
+    "codeA_v1.zip": {"userId": "u", "fileId": "codeA_v1.zip", "status": "completed", "timestamp": "2026-01-02T00:00:00Z"},
+    "codeB_v1.zip": {"userId": "u", "fileId": "codeB_v1.zip", "status": "processing", "timestamp": "2026-01-03T00:00:00Z"},
+}
+
+
+def get(handler, params, headers=None):
+    return handler.lambda_handler({"httpMethod": "GET", "queryStringParameters": params, "headers": headers}, None)
+
+
+def test_etag_round_trip(handler, monkeypatch):
+    monkeypatch.setattr(handler, "dynamodb", FakeDynamoDB(FakeTable(dict(ITEMS))))
+    first = get(handler, {"userId": "u", "fileId": "codeA_v1.zip"})
+    assert first["statusCode"] == 200
+    assert json.loads(first["body"])["status"] == "completed"
+
+    etag = first["headers"]["ETag"]
+    again = get(handler, {"userId": "u", "fileId": "codeA_v1.zip"}, {"If-None-Match": etag})
+    assert again["statusCode"] == 304 and again["body"] == ""
+    # Header names are not normalized by API Gateway, and a changed payload gets a new ETag
+    other = get(handler, {"userId": "u", "fileId": "codeB_v1.zip"}, {"if-none-match": etag})
+    assert other["statusCode"] == 200 and other["headers"]["ETag"] != etag
+
+
+def test_batched_lookup_reports_missing_files(handler, monkeypatch):
+    monkeypatch.setattr(handler, "dynamodb", FakeDynamoDB(FakeTable(dict(ITEMS)), throttled_calls=2))
+    response = get(handler, {"userId": "u", "fileIds": "codeB_v1.zip,nope.zip,codeA_v1.zip"})
+    body = json.loads(response["body"])
+    assert [item["fileId"] for item in body["items"]] == ["codeB_v1.zip", "codeA_v1.zip"]
+    assert body["missing"] == ["nope.zip"]
+
+
+def test_keys_still_throttled_are_not_reported_missing(handler, monkeypatch):
+    monkeypatch.setattr(handler, "dynamodb", FakeDynamoDB(FakeTable(dict(ITEMS)), throttled_calls=99))
+    response = get(handler, {"userId": "u", "fileIds": "codeA_v1.zip"})
+    assert response["statusCode"] == 503
+    assert "missing" not in json.loads(response["body"])
+
+
+def test_recent_reads_a_bounded_page_of_the_timestamp_index(handler, monkeypatch):
+    table = FakeTable(dict(ITEMS))
+    monkeypatch.setattr(handler, "dynamodb", FakeDynamoDB(table))
+    response = get(handler, {"userId": "u", "recent": "1"})
+    assert [item["fileId"] for item in json.loads(response["body"])["items"]] == ["codeB_v1.zip"]
+
+    (query,) = table.queries
+    assert query["IndexName"] == handler.RECENT_INDEX_NAME
+    assert query["Limit"] == 1 and query["ScanIndexForward"] is False
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+pytest.importorskip("boto3")
+pd = pytest.importorskip("pandas")
+
+import executors  # noqa: E402
+import lambda_function  # noqa: E402
+from test_ingest import BUCKET, MEMBERS, ZIP_KEY, process, read_json, read_parquet, upload  # noqa: E402
+
+
+class FakeS3:
+    """Objects of the bucket in a dict, with the calls of the step handlers."""
+
+    def __init__(self):
+        self.objects, self.gets = {}, 0
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def get_object(self, Bucket, Key):
+        import io
+        self.gets += 1
+        return {"Body": io.BytesIO(self.objects[Key].encode("utf-8"))}
+
+
+def test_map_iterations_load_the_job_once_per_container(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setattr(lambda_function, "_s3", s3)
+    monkeypatch.setattr(lambda_function, "_job_cache", {})
+    job = {"job_id": "bp1_qd/codeA_v1.zip/abc", "n_tasks": 2}
+    s3.put_object("benchmark-vv-data", lambda_function._job_key(job["job_id"]), json.dumps(job))
+
+    assert lambda_function.load_job(job["job_id"]) == job
+    assert lambda_function.load_job(job["job_id"]) == job
+    assert s3.gets == 1
+
+
+def test_plan_objects_live_under_the_job_prefix():
+    job_id = "bp1_qd/codeA_v1.zip/abc"
+    assert lambda_function._job_key(job_id) == "jobs/bp1_qd/codeA_v1.zip/abc/job.json"
+    assert lambda_function._tasks_key(job_id) == "jobs/bp1_qd/codeA_v1.zip/abc/tasks.json"
+    assert lambda_function._result_key({"job_id": job_id}, 3) == "jobs/bp1_qd/codeA_v1.zip/abc/results/3.json"
+
+
+def test_step_functions_handlers(local_s3):
+    upload(local_s3)
+    s3_event = {"detail": {"bucket": {"name": BUCKET}, "object": {"key": ZIP_KEY}}}
+
+    plan = lambda_function.handler({"step": "plan", "s3Event": s3_event}, None)
+    assert not plan["failed"] and plan["n_tasks"] == 3
+    # What the Distributed Map reads, and the items its selector builds
+    tasks = read_json(local_s3, plan["tasks_key"])
+    for task in tasks:
+        item = {"step": "map", "job_id": plan["job_id"], "task": task}
+        assert lambda_function.handler(item, None) == {"index": task["index"]}
+    reduced = lambda_function.handler({"step": "reduce", "job_id": plan["job_id"], "stages": plan["stages"]}, None)
+    assert reduced == {"status": "completed"}
+
+    status = lambda_function.get_table().get_item(Key={"userId": "user-1", "fileId": "codeA_v1.zip"})["Item"]
+    assert (status["status"], status["progress"], status["files_done"]) == ("completed", 100, 3)
+    assert status["files"] == {"processed": 3, "unchanged": 0}
+    manifest = read_json(local_s3, "public_ds/bp9/codeA_v1/manifest.json")
+    assert manifest["complete"] and sorted(manifest["files"]) == sorted(MEMBERS)
+    # The plan and the map results are removed
+    assert local_s3.list_objects_v2(Bucket=BUCKET, Prefix="jobs/")["KeyCount"] == 0
+
+
+def test_rejected_submission_fails_in_the_plan_step(local_s3):
+    upload(local_s3, {"out/rec_a.dat": "t wrong\n0 1\n"})
+    s3_event = {"detail": {"bucket": {"name": BUCKET}, "object": {"key": ZIP_KEY}}}
+    with pytest.warns(UserWarning, match="rec_a.dat skipped"):
+        plan = lambda_function.handler({"step": "plan", "s3Event": s3_event}, None)
+    assert plan["failed"] and "No valid file" in plan["error"]
+    status = lambda_function.get_table().get_item(Key={"userId": "user-1", "fileId": "codeA_v1.zip"})["Item"]
+    assert status["status"] == "failed"
+
+
+def test_serial_and_process_executors_give_the_same_outputs(local_s3):
+    upload(local_s3)
+    outputs = {}
+    for name, executor in (("serial", executors.SerialExecutor()), ("process", executors.ProcessPoolExecutor(2))):
+        local_s3.delete_object(Bucket=BUCKET, Key="public_ds/bp9/codeA_v1/manifest.json")
+        assert process(executor=executor) == {"processed": 3, "unchanged": 0}
+        manifest = read_json(local_s3, "public_ds/bp9/codeA_v1/manifest.json")
+        outputs[name] = (manifest["files"], manifest["compact"],
+                         {key: read_parquet(local_s3, key) for key in
+                          (entry["output_key"] for entry in manifest["files"].values())})
+    serial, process_pool = outputs["serial"], outputs["process"]
+    assert serial[0] == process_pool[0] and serial[1] == process_pool[1]
+    for key, df in serial[2].items():
+        pd.testing.assert_frame_equal(df, process_pool[2][key])
@@ -0,0 +1,67 @@
+import pytest
+
+from conftest import load_template
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("dash")
+
+from pyarrow import fs  # noqa: E402
+
+from callbacks import utils  # noqa: E402
+
+BP1_QD = load_template("bp1-qd")
+TIME_SERIES = next(file for file in BP1_QD["files"] if file["graph_type"] == "timeseries")
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch, memo_cache):
+    """A local "bucket" where one code published every bp1-qd receiver, as the ingest names them."""
+    folder = tmp_path / "public_ds" / "bp1-qd" / "codeA_v1"
+    folder.mkdir(parents=True)
+    t = np.arange(0.0, 1000.0, 1.0)
+    for i, receiver in enumerate(TIME_SERIES["list_of_receivers"]):
+        df = pd.DataFrame({var["name"]: t if var["name"] == "t" else t * 0 + i for var in TIME_SERIES["var_list"]})
+        df.to_parquet(folder / f"{receiver.replace('*', 'codeA_')}.parquet", index=False, row_group_size=100,
+                      write_statistics=True)
+
+    def list_receivers(bucket_name, benchmark_pb, dataset_name):
+        return sorted(path.stem for path in (tmp_path / "public_ds" / benchmark_pb / dataset_name).glob("*.parquet"))
+
+    monkeypatch.setattr(utils, "get_arrow_s3", lambda: fs.LocalFileSystem())
+    monkeypatch.setattr(utils, "get_available_receivers", list_receivers)
+    return str(tmp_path)
+
+
+def test_template_receivers_are_wildcards():
+    # The case this module guards: bp1-qd receivers are patterns, not object names
+    assert all(utils.is_receiver_pattern(receiver) for receiver in TIME_SERIES["list_of_receivers"])
+
+
+def test_wildcard_receivers_resolve_to_the_published_object(bucket):
+    for receiver in TIME_SERIES["list_of_receivers"]:
+        keys = utils.resolve_receiver_keys(bucket, f"public_ds/bp1-qd/codeA_v1/{receiver}.parquet")
+        assert keys == [f"public_ds/bp1-qd/codeA_v1/{receiver.replace('*', 'codeA_')}.parquet"]
+
+
+def test_window_read_of_a_wildcard_receiver(bucket):
+    receiver = TIME_SERIES["list_of_receivers"][3]
+    df = utils.get_s3_dataset_window(bucket, f"public_ds/bp1-qd/codeA_v1/{receiver}.parquet", 250.0, 420.0)
+    assert df is not None
+    assert df["t"].min() == 250.0 and df["t"].max() == 420.0
+    assert (df["slip"] == 3).all()
+
+
+def test_unmatched_wildcard_reads_nothing(bucket):
+    assert utils.get_s3_dataset_window(bucket, "public_ds/bp1-qd/codeA_v1/*nothing.parquet", 0.0, 10.0) is None
+
+
+def test_select_row_groups(tmp_path):
+    path = tmp_path / "series.parquet"
+    pd.DataFrame({"t": np.arange(0.0, 1000.0), "v": np.zeros(1000)}).to_parquet(path, row_group_size=100)
+    metadata = pq.ParquetFile(path).metadata
+    assert utils.select_row_groups(metadata, "t", 250.0, 420.0) == [2, 3, 4]
+    assert utils.select_row_groups(metadata, "t", 2000.0, 3000.0) == []
+    # Without the column, every row group is read
+    assert utils.select_row_groups(metadata, "missing", 0.0, 1.0) == list(range(10))
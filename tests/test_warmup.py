@@ -0,0 +1,96 @@
+import pytest
+
+
+@pytest.fixture
+def warmup(memo_cache, tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    from callbacks import utils, warmup
+
+    monkeypatch.setattr(warmup, "ACCESS_LOG_PATH", str(tmp_path / "warmup" / "access_log.pickle"))
+    monkeypatch.setattr(utils, "memoized_functions", {})
+    utils.pop_access_counts()
+    return warmup
+
+
+def test_only_replayable_calls_are_counted(warmup):
+    from callbacks import utils
+
+    @utils.memoize(timeout=3600, replay=True)
+    def dataset(key):
+        return key
+
+    @utils.memoize(timeout=30)
+    def listing(key):
+        return key
+
+    dataset("a")
+    dataset("a")
+    listing("b")
+    warmup.flush_access_log()
+    assert warmup.most_requested(10) == [(("dataset", ("a",), ()), {"count": 2, "bytes": None})]
+
+
+def test_access_log_is_bounded(warmup, monkeypatch):
+    from callbacks import utils
+
+    monkeypatch.setattr(warmup, "ACCESS_LOG_MAX_ENTRIES", 3)
+    for i in range(5):
+        for _ in range(i + 1):
+            utils.record_access("dataset", (str(i),), {})
+    warmup.flush_access_log()
+    assert [call[1] for call, _ in warmup.most_requested(10)] == [("4",), ("3",), ("2",)]
+
+
+def test_budget_is_checked_before_each_fetch(warmup):
+    np = pytest.importorskip("numpy")
+    from callbacks import utils
+
+    fetched = []
+
+    @utils.memoize(timeout=3600, replay=True)
+    def grid(name):
+        fetched.append(name)
+        return np.zeros(1024 * 1024 // 8)  # 1 MB
+
+    for name, count in (("a", 3), ("b", 2), ("c", 1)):
+        for _ in range(count):
+            utils.record_access("grid", (name,), {})
+    warmup.flush_access_log()
+
+    # First round: sizes are unknown, the round stops once the budget is used
+    assert warmup.warm_up_once(benchmarks=[], memory_budget_mb=1) == {"prefetched": 1, "bytes": 1024 * 1024}
+    assert fetched == ["a"]
+    # Counts are halved at each round, and the sizes measured are kept for the next one
+    entries = dict(warmup.most_requested(10))
+    assert entries[("grid", ("a",), ())] == {"count": 1.5, "bytes": 1024 * 1024}
+
+
+def test_one_process_per_round_and_every_round_runs(warmup, monkeypatch):
+    rounds = []
+    monkeypatch.setattr(warmup, "warm_up_once", lambda: rounds.append(1) or {"prefetched": 0, "bytes": 0})
+    now = [1000.0]
+    monkeypatch.setattr(warmup.time, "time", lambda: now[0])
+
+    assert warmup.run_round(interval=60)
+    # Another worker in the same round
+    assert not warmup.run_round(interval=60)
+    # Next round, after the lock of the first one would have expired
+    now[0] += 60
+    assert warmup.run_round(interval=60)
+    assert len(rounds) == 2
+    # While a round runs the lock is held, whatever the time of the last one
+    with warmup.round_lock(0) as claimed, warmup.round_lock(0) as other:
+        assert claimed and not other
+
+
+def test_traced_callbacks_flush_their_access_counts(warmup):
+    from callbacks import metrics, utils
+
+    @utils.memoize(timeout=3600, replay=True)
+    def dataset(key):
+        return key
+
+    # A background callback's job process: the warm-up loop does not run there
+    with metrics.trace("display_plots"):
+        dataset("a")
+    assert warmup.most_requested(10) == [(("dataset", ("a",), ()), {"count": 1, "bytes": None})]